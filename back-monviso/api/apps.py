@@ -4,3 +4,26 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from budget.models import Category, Expense, Income, SavingsGoal, Transaction, TransactionArchive, UserProfile
+        from .authentication import on_user_changed
+        from .cache import check_cache_backend, on_user_data_changed
+        from .metrics import on_connection_created
+
+        check_cache_backend()
+
+        # Toute écriture sur les données d'un utilisateur invalide ses réponses en cache
+        for model in (Transaction, TransactionArchive, Category, Income, Expense, SavingsGoal, UserProfile):
+            post_save.connect(on_user_data_changed, sender=model, dispatch_uid=f'cache_version_save_{model.__name__}')
+            post_delete.connect(on_user_data_changed, sender=model, dispatch_uid=f'cache_version_delete_{model.__name__}')
+
+        # Utilisateur modifié ou supprimé : retiré du cache d'authentification du processus
+        post_save.connect(on_user_changed, sender=User, dispatch_uid='auth_user_cache_save')
+        post_delete.connect(on_user_changed, sender=User, dispatch_uid='auth_user_cache_delete')
+
+        # Connexions établies (churn) pour api/metrics/
+        connection_created.connect(on_connection_created, dispatch_uid='metrics_connection_created')
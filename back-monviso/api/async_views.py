@@ -0,0 +1,149 @@
+"""
+Variantes async des lectures lourdes (tableau de bord, synthèse), servies sous ASGI.
+
+Une vue synchrone enchaîne ses requêtes SQL : sa latence est la somme des allers-retours
+vers la base. Ici les lectures indépendantes d'api/dashboard.py sont lancées en parallèle,
+chacune dans un thread du pool (sync_to_async(thread_sensitive=False)) avec sa propre
+connexion : la latence devient celle de la plus lente. Les réponses, le cache par
+utilisateur et l'ETag sont identiques aux vues synchrones.
+
+Les vues synchrones continuent de fonctionner sous ASGI (Django les exécute dans un thread).
+Lancement : gunicorn monviso.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from . import cache, dashboard, metrics
+from .db.router import cacheable, replica_reads
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    # Même rendu que les vues DRF (décimaux en chaînes, dates ISO)
+    return HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json', headers=headers)
+
+
+def authenticate(request):
+    """Authentification DRF (JWT avec cache d'utilisateurs) ; renvoie l'utilisateur ou lève une APIException"""
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authenticator().authenticate(request)
+        if result is not None:
+            return result[0]
+    raise exceptions.NotAuthenticated()
+
+
+def authenticated(view):
+    """Vue async en lecture (GET) réservée aux utilisateurs authentifiés : request.user est renseigné"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ('GET', 'HEAD'):
+                raise exceptions.MethodNotAllowed(request.method)
+            request.user = await sync_to_async(authenticate)(request)
+        except exceptions.APIException as exc:
+            headers = {'WWW-Authenticate': 'Bearer realm="api"'} if exc.status_code == status.HTTP_401_UNAUTHORIZED else None
+            # Même corps que le gestionnaire d'exceptions de DRF
+            data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            return json_response(data, exc.status_code, headers)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def cached_per_user(view_name, vary_on_today=False):
+    """
+    Version async de cache.cache_per_user : ETag / 304, puis réponse servie depuis le cache ou stockée.
+    Les entrées et l'ETag sont partagés avec la vue synchrone `view_name` (réponse identique,
+    même option vary_on_today).
+    """
+    endpoint = f'{view_name}:'
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            user_id = request.user.pk
+            version = await sync_to_async(cache.get_data_version)(user_id)
+            params = cache.params_fingerprint(request.GET, timezone.localdate() if vary_on_today else None)
+            etag = cache.compute_etag(user_id, endpoint, version, params)
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+            if_none_match = request.headers.get('If-None-Match')
+            if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+                cache.stats['not_modified'] += 1
+                return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            ttl = cache.get_ttl()
+            if not ttl:
+                return json_response(await view(request, *args, **kwargs), headers=headers)
+
+            key = cache.RESPONSE_KEY.format(user_id=user_id, endpoint=endpoint, version=version, params=params)
+            backend = cache.get_cache()
+            data = await backend.aget(key)
+            if data is not None:
+                cache.stats['hits'] += 1
+                return json_response(data, headers={**headers, 'X-Cache': 'HIT'})
+
+            cache.stats['misses'] += 1
+            data = await view(request, *args, **kwargs)
+            if await sync_to_async(cacheable)(request):
+                await backend.aset(key, data, timeout=ttl)
+            return json_response(data, headers={**headers, 'X-Cache': 'MISS'})
+        return wrapper
+    return decorator
+
+
+def in_transaction():
+    return connection.in_atomic_block
+
+
+def _isolated(query):
+    """Exécute `query` dans un thread du pool, sur la connexion de ce thread, comptée par les métriques"""
+    @functools.wraps(query)
+    def run(*args):
+        close_old_connections()
+        try:
+            with metrics.record_queries():
+                return query(*args)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(queries, *args):
+    """
+    Lance les lectures en parallèle et renvoie leurs résultats dans l'ordre.
+    Dans une transaction ouverte (tests, ATOMIC_REQUESTS), les autres connexions ne verraient
+    pas ses écritures : les lectures sont alors enchaînées sur la connexion courante.
+    """
+    if await sync_to_async(in_transaction)():
+        return [await sync_to_async(query)(*args) for query in queries]
+    return await asyncio.gather(*(sync_to_async(_isolated(query), thread_sensitive=False)(*args) for query in queries))
+
+
+@authenticated
+@cached_per_user('FinancialDataView')
+@replica_reads
+async def financial_data(request):
+    """Données financières de l'utilisateur (même réponse que financial-data/), lectures parallèles"""
+    user_id = request.user.pk
+    profile, *results = await gather_queries((dashboard.load_profile, *dashboard.FINANCIAL_QUERIES), user_id)
+    if profile is None:
+        return dashboard.EMPTY_FINANCIAL_DATA
+    return dashboard.build_financial_data(profile, *results)
+
+
+@authenticated
+@cached_per_user('SummaryView', vary_on_today=True)
+@replica_reads
+async def summary(request):
+    """Synthèse du mois et de l'année (même réponse que summary/), lectures parallèles"""
+    today = timezone.localdate()
+    results = await gather_queries(dashboard.SUMMARY_QUERIES, request.user.pk, today)
+    return dashboard.build_summary(today, *results)
@@ -0,0 +1,211 @@
+"""
+Vérification des identifiants de connexion et authentification JWT des requêtes.
+
+Un seul SELECT résout email OU nom d'utilisateur (index unique sur username, index
+auth_user_email_idx sur email) et le mot de passe n'est haché qu'une fois. Un identifiant
+inconnu déclenche le même travail de hachage sur un hash factice, pour que le temps de
+réponse ne révèle pas l'existence du compte. Si le hasher courant est plus coûteux que
+celui du hash stocké (itérations relevées, changement d'algorithme), check_password
+réenregistre le mot de passe au nouveau format.
+
+CachedJWTAuthentication évite la lecture de auth_user à chaque requête authentifiée : les
+utilisateurs actifs sont gardés en cache par processus, et le claim de version de token
+(empreinte du hash de mot de passe, CHECK_REVOKE_TOKEN de simplejwt) invalide les tokens
+émis avant un changement de mot de passe. Toute modification d'un utilisateur (désactivation
+comprise) incrémente après commit sa version d'authentification dans le cache partagé
+(api.cache) : chaque processus relit alors l'utilisateur en base à la requête suivante.
+
+Les tokens émis avant l'activation du claim de version n'en ont pas : ils sont refusés, sauf
+jusqu'à settings.JWT_UNVERSIONED_TOKENS_UNTIL (transition, au moins la durée de vie des
+tokens de rafraîchissement après le déploiement).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import get_cache
+
+AUTH_VERSION_KEY = 'monviso:auth_version:{user_id}'
+
+# Hash factice par (algorithme, paramètres) du hasher courant, calculé une fois par processus
+_dummy_hashes = {}
+
+
+def dummy_hash():
+    hasher = get_hasher()
+    key = (hasher.algorithm, getattr(hasher, 'iterations', None))
+    if key not in _dummy_hashes:
+        _dummy_hashes[key] = make_password('monviso-dummy-password')
+    return _dummy_hashes[key]
+
+
+def find_login_user(identifier):
+    """Utilisateur dont l'email, à défaut le username, vaut `identifier` (une requête)"""
+    if not identifier:
+        return None
+    return (
+        User.objects
+        .filter(Q(email=identifier) | Q(username=identifier))
+        .annotate(by_email=Case(When(email=identifier, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by('by_email', 'pk')
+        .first()
+    )
+
+
+def authenticate_credentials(identifier, password):
+    """Renvoie l'utilisateur si les identifiants sont valides, sinon None ; un seul hachage dans tous les cas"""
+    password = password or ''
+    user = find_login_user(identifier)
+    if user is None:
+        check_password(password, dummy_hash())
+        return None
+    # Haché même pour un compte désactivé : même temps de réponse, refus comme ModelBackend
+    if not user.check_password(password) or not user.is_active:
+        return None
+    return user
+
+
+class UserCache:
+    """
+    Cache LRU par processus des utilisateurs actifs, borné en taille et en durée de vie.
+    Chaque entrée garde la version d'authentification (auth_version) lue avant le chargement
+    de l'utilisateur : une entrée d'une autre version n'est plus servie.
+    """
+    ANY_VERSION = object()
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id, version=ANY_VERSION):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            user, entry_version, expires_at = entry
+            if expires_at <= time.monotonic() or (version is not self.ANY_VERSION and version != entry_version):
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user, version=None):
+        if not self.max_size or self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[user_id] = (user, version, time.monotonic() + self.ttl)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def token_version(user):
+    """Version de token d'un utilisateur : change avec son mot de passe (claim REVOKE_TOKEN_CLAIM de simplejwt)"""
+    return get_md5_hash_password(user.password)
+
+
+def accepts_unversioned_tokens():
+    """Transition : tokens sans claim de version acceptés jusqu'à JWT_UNVERSIONED_TOKENS_UNTIL (ISO 8601)"""
+    until = parse_datetime(getattr(settings, 'JWT_UNVERSIONED_TOKENS_UNTIL', '') or '')
+    if until is None:
+        return False
+    if timezone.is_naive(until):
+        until = timezone.make_aware(until, timezone.utc)
+    return timezone.now() < until
+
+
+def get_auth_version(user_id):
+    """Version d'authentification partagée entre processus (None tant que l'utilisateur n'a pas changé)"""
+    return get_cache().get(AUTH_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_auth_version(user_id):
+    def bump():
+        cache = get_cache()
+        key = AUTH_VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def on_user_changed(sender, instance, **kwargs):
+    # Désactivation, changement de mot de passe ou suppression : l'entrée locale est retirée tout de suite,
+    # celles des autres processus dès le commit (version d'authentification partagée)
+    user_cache.evict(instance.pk)
+    bump_auth_version(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication sans requête SQL pour les utilisateurs en cache : l'utilisateur est lu
+    une fois depuis la base puis servi depuis user_cache tant que sa version d'authentification
+    partagée et la version du token correspondent. Un token émis avant un changement de mot de
+    passe est refusé.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token sans identifiant utilisateur')
+
+        # Lue avant la base : une modification concurrente laisse une entrée d'ancienne version, relue ensuite
+        auth_version = get_auth_version(user_id)
+        user = user_cache.get(user_id, auth_version)
+        if user is None or not self.token_matches(validated_token, user):
+            # Chemin base de données ; une version de token différente de l'entrée en cache est revérifiée en base
+            user = self.load_user(user_id)
+            user_cache.set(user_id, user, auth_version)
+            if not self.token_matches(validated_token, user):
+                raise AuthenticationFailed('Mot de passe modifié depuis l\'émission du token', code='password_changed')
+        # Copie par requête : une vue qui modifie request.user ne touche pas l'instance partagée
+        return copy.copy(user)
+
+    def load_user(self, user_id):
+        try:
+            user = self.user_model.objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('Utilisateur introuvable', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('Utilisateur désactivé', code='user_inactive')
+        return user
+
+    def token_matches(self, validated_token, user):
+        if not jwt_settings.CHECK_REVOKE_TOKEN:
+            return True
+        version = validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM)
+        if version is None:
+            return accepts_unversioned_tokens()
+        return version == token_version(user)
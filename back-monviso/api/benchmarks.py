@@ -0,0 +1,294 @@
+"""
+Scénarios de requêtes pour chaque route de api/urls.py et exécution concurrente en processus.
+
+ENDPOINTS décrit une requête représentative par (route, méthode). Il est partagé par la
+commande bench_endpoints (débit et latences p50/p95/p99 en JSON) et par les tests de
+non-régression du nombre de requêtes SQL (api/tests.py).
+"""
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from budget import rollups
+from budget.models import Category, Transaction
+
+_sequence = itertools.count()
+
+
+def unique_suffix():
+    return f'{time.time_ns()}{next(_sequence)}'
+
+
+class Endpoint:
+    def __init__(self, name, method='GET', path='', data=None, setup=None, multipart=False, writes=False, authenticated=True):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.setup = setup
+        self.multipart = multipart
+        self.writes = writes
+        self.authenticated = authenticated
+
+    @property
+    def label(self):
+        return f'{self.method} {self.name}'
+
+    def prepare(self, context):
+        """Chemin et corps de la requête ; setup() s'exécute ici, hors mesure"""
+        if self.setup:
+            context = {**context, **self.setup(context)}
+        data = self.data(context) if callable(self.data) else self.data
+        return self.path.format(**context), data
+
+
+def disposable_transaction(context):
+    item = Transaction.objects.create(
+        user_id=context['user_id'], name='Bench', amount=Decimal('1.00'), type='expense', date=timezone.localdate(),
+    )
+    rollups.record_created(context['user_id'], [item])
+    return {'disposable_id': item.pk}
+
+
+def disposable_category(context):
+    category = Category.objects.create(user_id=context['user_id'], name=f'Bench {unique_suffix()}', type='expense')
+    return {'disposable_id': category.pk}
+
+
+def import_file(context):
+    content = 'date,libelle,montant,categorie\n' + ''.join(
+        f'{timezone.localdate():%Y-%m-%d},Import {unique_suffix()},-{index + 1}.50,Courses\n' for index in range(20)
+    )
+    return {'file': SimpleUploadedFile('import.csv', content.encode(), content_type='text/csv')}
+
+
+def transaction_payload(context):
+    return {'name': 'Bench', 'amount': '12.50', 'type': 'expense', 'category': 'Courses', 'date': f'{timezone.localdate():%Y-%m-%d}'}
+
+
+ENDPOINTS = [
+    Endpoint('test_connection', path='/api/test/', authenticated=False),
+    Endpoint('metrics', path='/api/metrics/', authenticated=False),
+    Endpoint('profile', path='/api/profile/'),
+    Endpoint('login', 'POST', '/api/auth/login/', authenticated=False,
+             data=lambda context: {'email': context['email'], 'password': context['password']}),
+    Endpoint('register', 'POST', '/api/auth/register/', authenticated=False, writes=True,
+             data=lambda context: {
+                 'username': f'bench_{unique_suffix()}', 'email': f'bench_{unique_suffix()}@monviso.local',
+                 'password': context['password'], 'full_name': 'Bench User',
+             }),
+    Endpoint('token_refresh', 'POST', '/api/auth/token/refresh/', authenticated=False,
+             data=lambda context: {'refresh': context['refresh']}),
+    Endpoint('onboarding', 'POST', '/api/onboarding/', writes=True, data={
+        'first_name': 'Bench', 'last_name': 'User', 'monthly_income': '2500.00',
+        'incomes': [{'name': 'Salaire', 'amount': '2500.00', 'type': 'salary', 'is_primary': True}],
+        'fixed_expenses': [{'name': 'Loyer', 'amount': '900.00', 'type': 'fixed'}],
+        'variable_expenses': [{'name': 'Courses', 'amount': '300.00', 'type': 'variable'}],
+        'savings_goals': [{'name': 'Vacances', 'target_amount': '1500.00', 'type': 'vacation'}],
+    }),
+    Endpoint('onboarding_status', path='/api/onboarding/status/'),
+    Endpoint('dashboard_data', path='/api/dashboard/'),
+    Endpoint('financial_data', path='/api/financial-data/'),
+    Endpoint('summary', path='/api/summary/'),
+    Endpoint('dashboard_data_async', path='/api/dashboard/async/'),
+    Endpoint('summary_async', path='/api/summary/async/'),
+    Endpoint('forecast', path='/api/forecast/?months=12'),
+    Endpoint('budgets', path='/api/budgets/?start={month_start}&end={month_end}'),
+    Endpoint('transactions', path='/api/transactions/?limit=50'),
+    Endpoint('transactions', 'POST', '/api/transactions/', writes=True, data=transaction_payload),
+    Endpoint('transaction_search', path='/api/transactions/search/?q=carrefour'),
+    Endpoint('transaction_import', 'POST', '/api/transactions/import/', writes=True, multipart=True, data=import_file),
+    Endpoint('transaction_export', path='/api/transactions/export/?output=ndjson'),
+    Endpoint('transaction_batch', 'POST', '/api/transactions/batch/', writes=True, data=lambda context: {'operations': [
+        {'op': 'create', 'data': transaction_payload(context)},
+        {'op': 'update', 'id': context['transaction_id'], 'data': {'payment_method': 'card'}},
+    ]}),
+    Endpoint('transaction_detail', path='/api/transactions/{transaction_id}/'),
+    Endpoint('transaction_detail', 'PUT', '/api/transactions/{transaction_id}/', writes=True, data=lambda context: context['transaction']),
+    Endpoint('transaction_detail', 'DELETE', '/api/transactions/{disposable_id}/', writes=True, setup=disposable_transaction),
+    Endpoint('history', path='/api/history/?start={history_start}&end={history_end}'),
+    Endpoint('categories', path='/api/categories/'),
+    Endpoint('categories', 'POST', '/api/categories/', writes=True,
+             data=lambda context: {'name': f'Bench {unique_suffix()}', 'type': 'expense', 'monthly_budget': '50.00'}),
+    Endpoint('category_detail', path='/api/categories/{category_id}/'),
+    Endpoint('category_detail', 'PUT', '/api/categories/{category_id}/', writes=True, data={'monthly_budget': '120.00'}),
+    Endpoint('category_detail', 'DELETE', '/api/categories/{disposable_id}/', writes=True, setup=disposable_category),
+]
+
+
+class DatabaseLatency:
+    """execute_wrapper ajoutant un délai fixe à chaque requête SQL (aller-retour réseau simulé)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=None, **kwargs):
+        # En tête de liste : les execute_wrapper() en cours retirent le dernier élément en sortant
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.insert(0, self)
+
+
+@contextmanager
+def simulate_db_latency(seconds):
+    """Applique le délai à toutes les connexions, y compris celles ouvertes ensuite par d'autres threads"""
+    latency = DatabaseLatency(seconds)
+    connection_created.connect(latency.install)
+    for connection in connections.all():
+        latency.install(connection=connection)
+    try:
+        yield latency
+    finally:
+        connection_created.disconnect(latency.install)
+        for connection in connections.all():
+            if latency in connection.execute_wrappers:
+                connection.execute_wrappers.remove(latency)
+
+
+def build_context(user, password):
+    """Identifiants, tokens et objets de référence d'un utilisateur pour les scénarios"""
+    refresh = RefreshToken.for_user(user)
+    today = timezone.localdate()
+    transaction = Transaction.objects.filter(user=user).order_by('-date', '-id').first()
+    category = Category.objects.filter(user=user, type='expense').order_by('pk').first()
+    year_ago = (today.replace(day=1) - timedelta(days=335)).replace(day=1)
+    return {
+        'user_id': user.pk,
+        'email': user.email,
+        'password': password,
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'transaction_id': transaction.pk if transaction else 0,
+        'transaction': {
+            'name': transaction.name, 'amount': str(transaction.amount), 'type': transaction.type,
+            'category': transaction.category, 'date': f'{transaction.date:%Y-%m-%d}',
+        } if transaction else {},
+        'category_id': category.pk if category else 0,
+        'month_start': f'{year_ago:%Y-%m}',
+        'month_end': f'{today:%Y-%m}',
+        'history_start': f'{year_ago:%Y-%m-%d}',
+        'history_end': f'{today:%Y-%m-%d}',
+    }
+
+
+def request_kwargs(endpoint, context, data):
+    kwargs = {}
+    if endpoint.authenticated:
+        kwargs['headers'] = {'Authorization': f"Bearer {context['access']}"}
+    if data is not None:
+        if endpoint.multipart:
+            kwargs['data'] = data
+        else:
+            kwargs['data'] = json.dumps(data)
+            kwargs['content_type'] = 'application/json'
+    return kwargs
+
+
+def consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def send(client, endpoint, context, path, data):
+    """Envoie une requête préparée et lit le corps streamé ; renvoie la réponse"""
+    return consume(getattr(client, endpoint.method.lower())(path, **request_kwargs(endpoint, context, data)))
+
+
+def perform(client, endpoint, context):
+    """Exécute la requête (corps streamé compris) ; renvoie (statut, durée en secondes)"""
+    path, data = endpoint.prepare(context)
+    started = time.perf_counter()
+    response = send(client, endpoint, context, path, data)
+    return response.status_code, time.perf_counter() - started
+
+
+async def perform_async(client, endpoint, context):
+    path, data = await sync_to_async(endpoint.prepare)(context)
+    kwargs = request_kwargs(endpoint, context, data)
+    started = time.perf_counter()
+    response = await getattr(client, endpoint.method.lower())(path, **kwargs)
+    if response.streaming:
+        if hasattr(response.streaming_content, '__aiter__'):
+            async for _ in response.streaming_content:
+                pass
+        else:
+            await sync_to_async(consume)(response)
+    return response.status_code, time.perf_counter() - started
+
+
+def summarize(endpoint, results, elapsed):
+    timings = sorted(duration for _, duration in results)
+    statuses = Counter(str(status_code) for status_code, _ in results)
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {
+        'method': endpoint.method,
+        'route': endpoint.name,
+        'requests': len(results),
+        'errors': sum(count for code, count in statuses.items() if int(code) >= 400),
+        'status_codes': dict(statuses),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p95_ms': round(quantiles[94] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+    }
+
+
+def run_threaded(endpoint, contexts, requests, concurrency):
+    """Mode WSGI : `concurrency` threads, chacun avec son Client de test"""
+    local = threading.local()
+
+    def call(index):
+        if not hasattr(local, 'client'):
+            local.client = Client(raise_request_exception=False)
+        try:
+            return perform(local.client, endpoint, contexts[index % len(contexts)])
+        finally:
+            # Le client de test ne ferme pas les connexions en fin de requête : fait ici comme un serveur
+            close_old_connections()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    return summarize(endpoint, results, time.perf_counter() - started)
+
+
+def run_async(endpoint, contexts, requests, concurrency):
+    """Mode ASGI : requêtes concurrentes sur la boucle asyncio, limitées par un sémaphore"""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient(raise_request_exception=False)
+
+        async def call(index):
+            async with semaphore:
+                try:
+                    return await perform_async(client, endpoint, contexts[index % len(contexts)])
+                finally:
+                    await sync_to_async(close_old_connections)()
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(index) for index in range(requests)))
+        return summarize(endpoint, results, time.perf_counter() - started)
+
+    return asyncio.run(main())
@@ -0,0 +1,198 @@
+"""
+Cache des réponses API par utilisateur, versionné.
+
+Chaque réponse GET est stockée sous la clé (utilisateur, endpoint, paramètres, data_version).
+La data_version d'un utilisateur est incrémentée après commit dès qu'une de ses lignes
+Transaction, Category, Income, Expense, SavingsGoal ou UserProfile change : les anciennes
+entrées ne sont plus jamais lues et sortent du cache par TTL / éviction du backend.
+
+La même data_version sert d'ETag fort : un client qui renvoie If-None-Match reçoit un 304
+sans que la vue ni la sérialisation ne soient exécutées.
+
+Le backend est celui de settings.CACHES[API_CACHE_ALIAS] (locmem par défaut, fichier ou
+Redis partagé via les variables d'environnement CACHE_*). Avec plusieurs workers, un backend
+partagé (file ou redis) est obligatoire pour que tous voient la même data_version :
+check_cache_backend() fait échouer le démarrage sinon.
+"""
+import functools
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .db import router
+
+VERSION_KEY = 'monviso:data_version:{user_id}'
+RESPONSE_KEY = 'monviso:response:{user_id}:{endpoint}:{version}:{params}'
+
+# Backends dont le contenu n'est pas vu par les autres processus
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Compteurs par processus, lus par cache_stats()
+stats = Counter()
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def get_ttl():
+    return getattr(settings, 'API_CACHE_TTL', 300)
+
+
+def is_shared_cache():
+    alias = getattr(settings, 'API_CACHE_ALIAS', 'default')
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def check_cache_backend():
+    """
+    Appelée au démarrage (ApiConfig.ready) : avec plusieurs workers et un cache propre au
+    processus, une écriture n'invaliderait que les réponses du worker qui l'a traitée, et une
+    désactivation que le cache d'authentification de ce worker. Les
+    réplicas exigent toujours un cache partagé : l'épingle au primaire y est stockée.
+    """
+    if is_shared_cache():
+        return
+    workers = getattr(settings, 'SERVER_WORKERS', 1)
+    if get_ttl() and workers > 1:
+        raise ImproperlyConfigured(
+            f'Cache des réponses actif avec {workers} workers sur un backend propre au processus : '
+            'utiliser CACHE_BACKEND=file ou redis, ou API_CACHE_TTL=0'
+        )
+    if getattr(settings, 'AUTH_USER_CACHE_TTL', 60) > 0 and workers > 1:
+        raise ImproperlyConfigured(
+            f'Cache d\'authentification actif avec {workers} workers sur un backend propre au processus : '
+            'une désactivation ne serait pas vue des autres workers ; utiliser CACHE_BACKEND=file ou redis, '
+            'ou AUTH_USER_CACHE_TTL=0'
+        )
+    if router.replicas():
+        raise ImproperlyConfigured('DB_REPLICAS exige un cache partagé (CACHE_BACKEND=file ou redis)')
+
+
+def get_data_version(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Valeur initiale horodatée : une clé de version évincée ne peut pas revenir à une ancienne valeur
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_data_version(user_id):
+    """
+    Invalide toutes les réponses en cache de l'utilisateur (à appeler aussi depuis les chemins bulk)
+    et l'épingle au primaire le temps que les réplicas rattrapent ses écritures.
+    """
+    def bump():
+        router.pin_to_primary(user_id)
+        cache = get_cache()
+        key = VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+        stats['invalidations'] += 1
+
+    transaction.on_commit(bump)
+
+
+def on_user_data_changed(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+def params_fingerprint(query_params, today=None):
+    """Empreinte des paramètres ; `today` (date) pour les réponses calculées par rapport au jour courant"""
+    items = sorted((key, value) for key in query_params for value in query_params.getlist(key))
+    raw = '&'.join(f'{key}={value}' for key, value in items)
+    if today is not None:
+        raw += f'#{today.isoformat()}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compute_etag(user_id, endpoint, version, params):
+    """ETag fort dérivé de la data_version : aucune sérialisation du corps nécessaire"""
+    raw = f'{user_id}:{endpoint}:{version}:{params}'
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cache_per_user(view_method=None, *, vary_on_today=False):
+    """
+    Décorateur pour les méthodes get() d'APIView :
+    - répond 304 sans exécuter la vue si If-None-Match correspond à l'ETag courant ;
+    - sinon sert la réponse depuis le cache ou l'y stocke (réponses 200 uniquement).
+    Avec vary_on_today=True (vues qui dépendent de timezone.localdate()), la date du jour entre
+    dans l'empreinte : la réponse et l'ETag de la veille ne sont plus servis.
+    """
+    if view_method is None:
+        return functools.partial(cache_per_user, vary_on_today=vary_on_today)
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        user_id = request.user.pk
+        if user_id is None:
+            return view_method(view, request, *args, **kwargs)
+
+        endpoint = f'{type(view).__name__}:{":".join(str(value) for value in kwargs.values())}'
+        version = get_data_version(user_id)
+        params = params_fingerprint(request.query_params, timezone.localdate() if vary_on_today else None)
+        etag = compute_etag(user_id, endpoint, version, params)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            stats['not_modified'] += 1
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        ttl = get_ttl()
+        if not ttl:
+            return _with_headers(view_method(view, request, *args, **kwargs), headers)
+
+        key = RESPONSE_KEY.format(user_id=user_id, endpoint=endpoint, version=version, params=params)
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            stats['hits'] += 1
+            return Response(data, headers={**headers, 'X-Cache': 'HIT'})
+
+        stats['misses'] += 1
+        response = view_method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and router.cacheable(request):
+            cache.set(key, response.data, timeout=ttl)
+        response['X-Cache'] = 'MISS'
+        return _with_headers(response, headers)
+
+    return wrapper
+
+
+def _with_headers(response, headers):
+    if response.status_code == status.HTTP_200_OK:
+        for name, value in headers.items():
+            response[name] = value
+    return response
+
+
+def cache_stats():
+    hits, misses = stats['hits'], stats['misses']
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'invalidations': stats['invalidations'],
+        'not_modified': stats['not_modified'],
+        'hit_ratio': hits / lookups if lookups else 0.0,
+    }
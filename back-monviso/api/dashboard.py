@@ -0,0 +1,201 @@
+"""
+Requêtes et mise en forme des réponses du tableau de bord (financial-data/, dashboard/) et de
+la synthèse (summary/).
+
+Chaque lecture est une fonction indépendante de l'utilisateur qui renvoie des données
+matérialisées : les vues synchrones les enchaînent, les variantes async (api/async_views.py)
+les lancent en parallèle sur des connexions distinctes. Les deux produisent la même réponse.
+"""
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Abs
+
+from budget import archive
+from budget.models import Category, Expense, Income, MonthlyRollup, SavingsGoal, Transaction, UserProfile
+
+# Libellé utilisé par le frontend pour les transactions sans catégorie
+UNCATEGORIZED_LABEL = 'Autres'
+TOP_CATEGORIES = 5
+
+EMPTY_FINANCIAL_DATA = {
+    'monthly_income': 0,
+    'total_income': 0,
+    'total_expenses': 0,
+    'total_fixed_expenses': 0,
+    'total_variable_expenses': 0,
+    'remaining_budget': 0,
+    'incomes': [],
+    'fixed_expenses': [],
+    'variable_expenses': [],
+    'transactions': [],
+    'savings_goals': [],
+    'needs_onboarding': True,
+}
+
+
+def load_profile(user_id):
+    """Profil de l'utilisateur (revenu mensuel) ou None si l'onboarding n'est pas fait"""
+    return UserProfile.objects.filter(user_id=user_id).values('monthly_income').first()
+
+
+def load_incomes(user_id):
+    return list(Income.objects.filter(user_id=user_id))
+
+
+def load_expenses(user_id):
+    # Catégorie jointe pour éviter le N+1
+    return list(Expense.objects.filter(user_id=user_id).select_related('category'))
+
+
+def load_transaction_totals(user_id):
+    """Totaux des transactions calculés en base en un seul passage"""
+    return Transaction.objects.filter(user_id=user_id).aggregate(
+        income=Sum(Abs('amount'), filter=Q(type='income')),
+        expenses=Sum(Abs('amount'), filter=Q(type='expense')),
+    )
+
+
+def load_archived_totals(user_id):
+    # Transactions archivées (budget.archive) : hors de la liste mais comptées dans les totaux
+    return archive.archived_totals(user_id)
+
+
+def load_transactions(user_id):
+    # Liste des transactions sans instancier les modèles
+    return list(Transaction.objects.filter(user_id=user_id).values(
+        'id', 'name', 'amount', 'type', 'category', 'date', 'payment_method', 'frequency'
+    ))
+
+
+def load_savings_goals(user_id):
+    return list(SavingsGoal.objects.filter(user_id=user_id))
+
+
+# Lectures indépendantes de financial-data/ hors profil, dans l'ordre des arguments de build_financial_data
+FINANCIAL_QUERIES = (
+    load_incomes, load_expenses, load_transaction_totals, load_archived_totals, load_transactions, load_savings_goals,
+)
+
+
+def serialize_expense(expense):
+    return {
+        'id': expense.id,
+        'name': expense.name,
+        'amount': expense.amount,
+        'frequency': expense.frequency,
+        'type': expense.type,
+        'category_id': expense.category_id,
+        'category_name': expense.category.name if expense.category else None
+    }
+
+
+def build_financial_data(profile, incomes, expenses, transaction_totals, archived_totals, transactions, savings_goals):
+    fixed_expenses = [expense for expense in expenses if expense.type == 'fixed']
+    variable_expenses = [expense for expense in expenses if expense.type == 'variable']
+
+    total_income_onboarding = sum((income.amount for income in incomes), Decimal('0'))
+    total_fixed_expenses = sum((expense.amount for expense in fixed_expenses), Decimal('0'))
+    total_variable_expenses_onboarding = sum((expense.amount for expense in variable_expenses), Decimal('0'))
+
+    # Calculer les totaux en incluant les transactions
+    total_income = total_income_onboarding + sum(
+        (totals['income'] or Decimal('0') for totals in (transaction_totals, archived_totals)), Decimal('0')
+    )
+    total_variable_expenses = total_variable_expenses_onboarding + sum(
+        (totals['expenses'] or Decimal('0') for totals in (transaction_totals, archived_totals)), Decimal('0')
+    )
+    total_expenses = total_fixed_expenses + total_variable_expenses
+
+    return {
+        'monthly_income': profile['monthly_income'],
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'total_fixed_expenses': total_fixed_expenses,
+        'total_variable_expenses': total_variable_expenses,
+        'remaining_budget': total_income - total_expenses,
+        'incomes': [{
+            'id': income.id,
+            'name': income.name,
+            'amount': income.amount,
+            'type': income.type,
+            'frequency': income.frequency,
+            'is_primary': income.is_primary
+        } for income in incomes],
+        'fixed_expenses': [serialize_expense(expense) for expense in fixed_expenses],
+        'variable_expenses': [serialize_expense(expense) for expense in variable_expenses],
+        'transactions': [dict(transaction, amount=abs(transaction['amount'])) for transaction in transactions],
+        'savings_goals': [{
+            'id': goal.id,
+            'name': goal.name,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'target_date': goal.target_date,
+            'type': goal.type,
+            'priority': goal.priority
+        } for goal in savings_goals]
+    }
+
+
+def load_year_rollups(user_id, today):
+    """Lignes MonthlyRollup du 1er janvier au mois en cours (au plus 12 mois pré-agrégés)"""
+    return list(MonthlyRollup.objects.filter(
+        user_id=user_id, month__gte=today.replace(month=1, day=1), month__lte=today.replace(day=1)
+    ).values_list('month', 'type', 'category', 'total'))
+
+
+def load_budgets(user_id, today):
+    return dict(
+        Category.objects.filter(user_id=user_id, type='expense', monthly_budget__isnull=False)
+        .values_list('name', 'monthly_budget')
+    )
+
+
+def load_monthly_income(user_id, today):
+    return UserProfile.objects.filter(user_id=user_id).values_list('monthly_income', flat=True).first()
+
+
+# Lectures indépendantes de summary/, dans l'ordre des arguments de build_summary
+SUMMARY_QUERIES = (load_year_rollups, load_budgets, load_monthly_income)
+
+
+def build_summary(today, rows, budgets, monthly_income):
+    current_month = today.replace(day=1)
+    month_totals = {'income': Decimal('0'), 'expense': Decimal('0')}
+    year_totals = {'income': Decimal('0'), 'expense': Decimal('0')}
+    month_categories = {}
+    for month, transaction_type, category, total in rows:
+        year_totals[transaction_type] += total
+        if month == current_month:
+            month_totals[transaction_type] += total
+            if transaction_type == 'expense':
+                label = category or UNCATEGORIZED_LABEL
+                month_categories[label] = month_categories.get(label, Decimal('0')) + total
+
+    monthly_budget = sum(budgets.values(), Decimal('0'))
+    top_categories = sorted(month_categories.items(), key=lambda item: item[1], reverse=True)[:TOP_CATEGORIES]
+
+    return {
+        'month': current_month.strftime('%Y-%m'),
+        'monthly_income': monthly_income,
+        'current_month': {
+            'income': month_totals['income'],
+            'expenses': month_totals['expense'],
+            'savings': month_totals['income'] - month_totals['expense'],
+        },
+        'year_to_date': {
+            'income': year_totals['income'],
+            'expenses': year_totals['expense'],
+            'savings': year_totals['income'] - year_totals['expense'],
+        },
+        'budget': {
+            'monthly_budget': monthly_budget,
+            'spent': month_totals['expense'],
+            'remaining': monthly_budget - month_totals['expense'],
+        },
+        'top_categories': [{
+            'category': name,
+            'total': total,
+            'monthly_budget': budgets.get(name),
+        } for name, total in top_categories],
+    }
@@ -0,0 +1,187 @@
+"""
+Pool de connexions borné, par processus, pour les backends api.db.postgresql / api.db.sqlite3.
+
+Sans pool, Django garde au mieux une connexion par thread (CONN_MAX_AGE) : avec des workers
+threadés ou les lectures parallèles des vues async, chaque nouveau thread ouvre sa propre
+connexion (poignée de main TLS + authentification) et leur nombre n'est pas borné.
+
+Avec le pool, connect() emprunte une connexion ouverte et close() la rend (transaction annulée)
+au lieu de la fermer :
+- au plus MAX_SIZE connexions par base et par processus ; au-delà, attente jusqu'à TIMEOUT
+  secondes puis OperationalError ;
+- une connexion inactive depuis plus de CHECK_IDLE secondes est vérifiée (SELECT 1) avant
+  d'être prêtée ; une connexion plus vieille que MAX_LIFETIME est remplacée ;
+- compteurs (créations, réutilisations, fermetures, attentes) exposés par api/metrics/.
+
+Utiliser CONN_MAX_AGE=0 : la connexion est rendue au pool à la fin de chaque requête.
+"""
+import threading
+import time
+from collections import Counter, deque
+
+DEFAULT_OPTIONS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10.0,
+    'MAX_LIFETIME': 1800.0,
+    'CHECK_IDLE': 30.0,
+}
+
+STATS = ('created', 'reused', 'closed', 'waits', 'wait_seconds', 'timeouts')
+
+# Pools du processus, par (alias, base)
+pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, name, max_size, timeout, max_lifetime, check_idle):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = deque()  # (connexion, créée à, rendue à), la plus récemment rendue à droite
+        self.created_at = {}
+        self.in_use = 0
+        self.state = {}  # attributs du DatabaseWrapper fixés à la création (ex. isolation_level)
+        self.stats = Counter()
+
+    def acquire(self, connect, ping):
+        """Connexion inactive du pool (vérifiée si besoin) ou nouvelle via connect() ; attend une place si le pool est plein"""
+        if not self.slots.acquire(blocking=False):
+            started = time.monotonic()
+            self.stats['waits'] += 1
+            acquired = self.slots.acquire(timeout=self.timeout)
+            self.stats['wait_seconds'] += time.monotonic() - started
+            if not acquired:
+                self.stats['timeouts'] += 1
+                raise PoolTimeout(f'Pool {self.name} : aucune connexion libre après {self.timeout} s ({self.max_size} en service)')
+        try:
+            connection = self._reuse(ping)
+            if connection is None:
+                connection = connect()
+                with self.lock:
+                    self.created_at[id(connection)] = time.monotonic()
+                    self.stats['created'] += 1
+            with self.lock:
+                self.in_use += 1
+            return connection
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def _reuse(self, ping):
+        now = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, created_at, released_at = self.idle.pop()
+            if now - created_at >= self.max_lifetime or (now - released_at >= self.check_idle and not ping(connection)):
+                self._discard(connection)
+                continue
+            self.stats['reused'] += 1
+            return connection
+
+    def release(self, connection, reusable=True):
+        with self.lock:
+            self.in_use -= 1
+            created_at = self.created_at.get(id(connection), 0.0)
+        if reusable and time.monotonic() - created_at < self.max_lifetime:
+            with self.lock:
+                self.idle.append((connection, created_at, time.monotonic()))
+        else:
+            self._discard(connection)
+        self.slots.release()
+
+    def _discard(self, connection):
+        with self.lock:
+            self.created_at.pop(id(connection), None)
+            self.stats['closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return
+                connection = self.idle.popleft()[0]
+            self._discard(connection)
+
+    def snapshot(self):
+        with self.lock:
+            counters = {stat: self.stats[stat] for stat in STATS}
+            return {**counters, 'idle': len(self.idle), 'in_use': self.in_use, 'max_size': self.max_size}
+
+
+def get_pool(alias, settings_dict):
+    key = (alias, str(settings_dict['NAME']))
+    pool = pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                options = {**DEFAULT_OPTIONS, **settings_dict.get('POOL', {})}
+                pool = pools[key] = ConnectionPool(
+                    alias, int(options['MAX_SIZE']), float(options['TIMEOUT']),
+                    float(options['MAX_LIFETIME']), float(options['CHECK_IDLE']),
+                )
+    return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """À placer avant le DatabaseWrapper du moteur : connect() emprunte au pool, close() y rend"""
+    pool_state = ()
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        try:
+            connection = pool.acquire(lambda: self._pool_connect(pool, conn_params), self._pool_ping)
+        except PoolTimeout as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+        for name, value in pool.state.items():
+            setattr(self, name, value)
+        # Rendue à ce pool même si settings_dict change entre-temps (base de test)
+        self.connection_pool = pool
+        return connection
+
+    def _pool_connect(self, pool, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pool.state.update({name: getattr(self, name) for name in self.pool_state})
+        return connection
+
+    def _pool_ping(self, connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Fermée au milieu d'un atomic ou après une erreur : la connexion n'est pas remise en circulation
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        self.connection_pool.release(self.connection, reusable)
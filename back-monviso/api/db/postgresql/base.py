@@ -0,0 +1,8 @@
+from django.db.backends.postgresql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    # Fixé par get_new_connection() à la création, à reporter sur chaque emprunt
+    pool_state = ('isolation_level',)
@@ -0,0 +1,130 @@
+"""
+Routage des lectures de rapport vers les réplicas (settings.DATABASE_REPLICAS).
+
+Seules les vues désignées lisent sur un réplica : @replica_reads choisit un réplica pour toute
+la durée de la requête (instantané cohérent) et ReplicaRouter y envoie alors les lectures.
+Toutes les écritures, et toutes les autres lectures, vont sur 'default'.
+
+Lecture de ses propres écritures : chaque écriture sur les données d'un utilisateur (voir
+api/cache.py bump_data_version) l'épingle au primaire pendant DB_REPLICA_PIN_SECONDS, le
+temps que la réplication rattrape son retard. L'épingle est stockée dans le cache API, qui doit
+donc être partagé entre workers (vérifié au démarrage par api.cache.check_cache_backend). Pendant
+une seconde période après l'épingle, les réponses lues sur un réplica ne sont pas mises en cache
+(cacheable) : un réplica encore en retard ne fige pas une réponse périmée sous la nouvelle
+data_version.
+
+Les flux (export) sont itérés après la sortie de la vue : les querysets concernés sont
+rattachés explicitement avec .using(read_alias(user)).
+"""
+import contextvars
+import functools
+import inspect
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_KEY = 'monviso:db_pin:{user_id}'
+
+# Alias de lecture choisi par @replica_reads pour la requête en cours
+current_read_alias = contextvars.ContextVar('db_read_alias', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def pin_seconds():
+    return getattr(settings, 'DB_REPLICA_PIN_SECONDS', 5)
+
+
+def pin_to_primary(user_id):
+    """Horodate la dernière écriture de l'utilisateur, conservée deux périodes d'épingle"""
+    seconds = pin_seconds()
+    if replicas() and seconds:
+        pin_cache().set(PIN_KEY.format(user_id=user_id), time.time(), timeout=seconds * 2)
+
+
+def last_write(user_id):
+    return pin_cache().get(PIN_KEY.format(user_id=user_id))
+
+
+def is_pinned(user_id):
+    written = last_write(user_id)
+    return written is not None and time.time() - written < pin_seconds()
+
+
+def cacheable(request):
+    """Faux si la réponse a été lue sur un réplica peu après une écriture de l'utilisateur"""
+    alias = getattr(request, 'read_alias', DEFAULT_DB_ALIAS)
+    return alias == DEFAULT_DB_ALIAS or last_write(request.user.pk) is None
+
+
+def read_alias(user):
+    """Réplica pour les lectures de rapport de `user`, ou 'default' s'il vient d'écrire"""
+    aliases = replicas()
+    if not aliases or user is None or user.pk is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    if is_pinned(user.pk):
+        return DEFAULT_DB_ALIAS
+    return random.choice(aliases)
+
+
+def replica_reads(view_method):
+    """
+    Décorateur de get() (APIView ou vue async) : les lectures de la requête vont sur un réplica.
+    L'alias choisi reste disponible dans request.read_alias (voir cacheable).
+    """
+    if inspect.iscoroutinefunction(view_method):
+        @functools.wraps(view_method)
+        async def async_wrapper(request, *args, **kwargs):
+            request.read_alias = await sync_to_async(read_alias)(request.user)
+            token = current_read_alias.set(request.read_alias)
+            try:
+                return await view_method(request, *args, **kwargs)
+            finally:
+                current_read_alias.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        request.read_alias = read_alias(request.user)
+        token = current_read_alias.set(request.read_alias)
+        try:
+            return view_method(view, request, *args, **kwargs)
+        finally:
+            current_read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = current_read_alias.get()
+        if alias is None or alias == DEFAULT_DB_ALIAS:
+            return None
+        # Transaction ouverte sur le primaire : ses écritures ne sont visibles que là
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le schéma des réplicas vient de la réplication du primaire
+        if db in replicas():
+            return False
+        return None
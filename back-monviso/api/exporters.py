@@ -0,0 +1,86 @@
+"""
+Export des transactions en flux (CSV ou NDJSON, gzip optionnel).
+
+Les lignes sont lues par values_list().iterator(chunk_size=...) — curseur serveur sous
+PostgreSQL — et écrites par paquets : la mémoire reste constante quel que soit le nombre
+de transactions et l'en-tête part immédiatement. Les transactions archivées (budget.archive)
+sont fusionnées au fil de l'eau, dans le même ordre (date puis création décroissantes).
+"""
+import csv
+import heapq
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ('id', 'date', 'name', 'amount', 'type', 'category', 'payment_method', 'frequency', 'created_at')
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class LineBuffer:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne écrite au lieu de la stocker"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def chunked(lines, gzip=False):
+    """
+    Regroupe les lignes en paquets d'environ FLUSH_BYTES, compressés au fil de l'eau si demandé.
+    La première ligne part seule pour que le client reçoive le premier octet sans attendre.
+    """
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31 : format gzip
+
+    def emit(payload, final=False):
+        if compressor is None:
+            return payload
+        return compressor.compress(payload) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+    buffer, size, first = [], 0, True
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if first or size >= FLUSH_BYTES:
+            yield emit(b''.join(buffer))
+            buffer, size, first = [], 0, False
+    tail = emit(b''.join(buffer), final=True)
+    if tail:
+        yield tail
+
+
+def export_rows(queryset):
+    return queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def merge_archived(rows, archived):
+    """Fusionne deux flux triés par (date, created_at) décroissants ; `archived` produit des dicts"""
+    date_index, created_index = EXPORT_FIELDS.index('date'), EXPORT_FIELDS.index('created_at')
+    archived_rows = (tuple(row[field] for field in EXPORT_FIELDS) for row in archived)
+    return heapq.merge(rows, archived_rows, key=lambda row: (row[date_index], row[created_index]), reverse=True)
+
+
+def export_stream(queryset, output='csv', gzip=False, archived=None):
+    rows = export_rows(queryset)
+    if archived is not None:
+        rows = merge_archived(rows, archived)
+    lines = csv_lines(rows) if output == 'csv' else ndjson_lines(rows)
+    return chunked(lines, gzip=gzip)
@@ -0,0 +1,341 @@
+"""
+Import en masse de relevés bancaires (CSV, OFX/QFX, QIF).
+
+Le fichier est lu en flux ligne à ligne : seuls la ligne courante, le lot en cours et le
+décompte des lignes existantes déjà reconnues comme doublons sont en mémoire (borné par les
+données de l'utilisateur, pas par la taille du fichier). Les lignes sont validées sans passer
+par le serializer DRF, les doublons (user, date, montant, libellé) sont détectés avec une
+requête par lot sur l'index (user, date), puis insérées par bulk_create — ou COPY sous PostgreSQL.
+"""
+import csv
+import io
+import re
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from budget import archive, rollups
+from budget.categories import CategoryIndex
+from budget.models import Category, Transaction, TransactionArchive
+from .cache import bump_data_version
+
+DEFAULT_BATCH_SIZE = 2000
+MAX_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y', '%m/%d/%Y', "%m/%d'%y", "%d/%m'%y", '%Y%m%d')
+MAX_AMOUNT = Decimal('99999999.99')  # DecimalField(max_digits=10, decimal_places=2)
+PAYMENT_METHODS = {choice for choice, _ in Transaction.PAYMENT_METHODS}
+TRANSACTION_TYPES = {choice for choice, _ in Transaction.TRANSACTION_TYPES}
+
+# En-têtes CSV acceptés (minuscules) pour chaque champ
+CSV_COLUMNS = {
+    'name': ('name', 'libelle', 'libellé', 'description', 'label', 'payee'),
+    'amount': ('amount', 'montant', 'somme'),
+    'date': ('date', 'date operation', "date d'opération", 'date_operation'),
+    'type': ('type',),
+    'category': ('category', 'categorie', 'catégorie'),
+    'payment_method': ('payment_method', 'moyen de paiement', 'mode'),
+}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(filename, requested=None):
+    file_format = (requested or filename.rsplit('.', 1)[-1]).lower()
+    if file_format == 'qfx':
+        file_format = 'ofx'
+    if file_format not in PARSERS:
+        raise ImportFormatError(f"Format non supporté: {file_format} (csv, ofx, qif)")
+    return file_format
+
+
+# --- Parsers : générateurs de (numéro de ligne, dict brut) -------------------------------------
+
+def parse_csv(lines):
+    lines = iter(lines)
+    header_line = next(lines, '')
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    header = [column.strip().lower() for column in next(csv.reader([header_line], delimiter=delimiter))]
+    mapping = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for index, column in enumerate(header):
+            if column in aliases:
+                mapping[field] = index
+                break
+    missing = {'name', 'amount', 'date'} - set(mapping)
+    if missing:
+        raise ImportFormatError(f"Colonnes manquantes dans l'en-tête CSV: {', '.join(sorted(missing))}")
+
+    for line_number, values in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+        if not values or not any(value.strip() for value in values):
+            continue
+        yield line_number, {
+            field: values[index].strip() if index < len(values) else ''
+            for field, index in mapping.items()
+        }
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+
+def parse_ofx(lines):
+    current = None
+    start_line = 0
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield start_line, {
+                        'name': current.get('NAME') or current.get('MEMO', ''),
+                        'amount': current.get('TRNAMT', ''),
+                        'date': current.get('DTPOSTED', '')[:8],
+                        'category': '',
+                        'payment_method': 'check' if current.get('TRNTYPE') == 'CHECK' else '',
+                    }
+                    current = None
+                elif not closing:
+                    current, start_line = {}, line_number
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def parse_qif(lines):
+    current = {}
+    start_line = None
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('!'):
+            continue
+        if start_line is None:
+            start_line = line_number
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if current:
+                yield start_line, {
+                    'name': current.get('P') or current.get('M', ''),
+                    'amount': current.get('T') or current.get('U', ''),
+                    'date': current.get('D', ''),
+                    'category': current.get('L', '').split(':')[0],
+                    'payment_method': 'check' if current.get('N', '').isdigit() else '',
+                }
+            current, start_line = {}, None
+        elif code in 'DTUPLMN':
+            current[code] = value
+
+
+PARSERS = {'csv': parse_csv, 'ofx': parse_ofx, 'qif': parse_qif}
+
+
+# --- Validation ------------------------------------------------------------------------------
+
+def parse_amount(raw):
+    value = raw.replace(' ', '').replace(' ', '').replace('€', '')
+    if ',' in value and '.' in value:
+        value = value.replace('.', '').replace(',', '.') if value.rfind(',') > value.rfind('.') else value.replace(',', '')
+    else:
+        value = value.replace(',', '.')
+    try:
+        amount = Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'Montant invalide: {raw!r}')
+    if abs(amount) > MAX_AMOUNT:
+        raise RowError(f'Montant trop élevé: {raw!r}')
+    return amount
+
+
+def parse_row_date(raw, formats=DATE_FORMATS):
+    raw = raw.replace(' ', '')
+    for date_format in formats:
+        try:
+            return datetime.strptime(raw, date_format).date(), date_format
+        except ValueError:
+            continue
+    raise RowError(f'Date invalide: {raw!r}')
+
+
+def build_transaction(user, raw, date_formats=DATE_FORMATS):
+    name = raw.get('name', '').strip()[:100]
+    if not name:
+        raise RowError('Libellé manquant')
+    amount = parse_amount(raw.get('amount', ''))
+    if not amount:
+        raise RowError('Montant nul')
+    transaction_type = raw.get('type', '').strip().lower()
+    if transaction_type not in TRANSACTION_TYPES:
+        transaction_type = 'expense' if amount < 0 else 'income'
+    payment_method = raw.get('payment_method', '').strip().lower()
+    date, date_format = parse_row_date(raw.get('date', '').strip(), date_formats)
+    item = Transaction(
+        user=user,
+        name=name,
+        amount=abs(amount),
+        type=transaction_type,
+        category=raw.get('category', '').strip()[:100],
+        date=date,
+        payment_method=payment_method if payment_method in PAYMENT_METHODS else '',
+    )
+    return item, date_format
+
+
+# --- Insertion -------------------------------------------------------------------------------
+
+def duplicate_key(item):
+    return item.date, item.amount, item.name
+
+
+def filter_duplicates(user, batch, consumed=None, archived_until=None, before=None):
+    """
+    Retire du lot les lignes déjà présentes (multiset : deux lignes identiques en base couvrent
+    deux lignes du fichier). Seules comptent les transactions créées avant `before` (début de
+    l'import) : celles insérées par les lots précédents du même fichier ne couvrent pas ses
+    doublons. `consumed` compte les lignes existantes déjà couvertes par les lots précédents.
+    Le résultat ne dépend donc pas du découpage en lots.
+    Les transactions archivées comptent comme présentes lorsque le lot commence avant
+    `archived_until` (dernière date archivée).
+    """
+    dates = [item.date for item in batch]
+    start, end = min(dates), max(dates)
+    names = {item.name for item in batch}
+    rows = Transaction.objects.filter(user=user, date__gte=start, date__lte=end, name__in=names)
+    if before is not None:
+        rows = rows.filter(created_at__lt=before)
+    existing = Counter(rows.values_list('date', 'amount', 'name').order_by())
+    if archived_until and start <= archived_until:
+        existing.update(
+            (row['date'], row['amount'], row['name'])
+            for row in archive.archived_rows(user.pk, start, end) if row['name'] in names
+        )
+    if consumed:
+        existing -= consumed
+    fresh = []
+    for item in batch:
+        key = duplicate_key(item)
+        if existing[key] > 0:
+            existing[key] -= 1
+        else:
+            fresh.append(item)
+    return fresh
+
+
+def copy_supported():
+    return connection.vendor == 'postgresql'
+
+
+def copy_insert(batch):
+    """Chemin rapide PostgreSQL : COPY ... FROM STDIN au format CSV"""
+    now = timezone.now()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for item in batch:
+        writer.writerow([
+            item.user_id, item.name, item.amount, item.type, item.category, item.category_fk_id,
+            item.date.isoformat(), item.payment_method, item.frequency, now.isoformat(), now.isoformat(),
+        ])
+    buffer.seek(0)
+    columns = 'user_id, name, amount, type, category, category_fk_id, date, payment_method, frequency, created_at, updated_at'
+    # En CSV, un champ vide non quoté vaut NULL : category et payment_method sont NOT NULL (blank=True)
+    sql = f'COPY {Transaction._meta.db_table} ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (category, payment_method))'
+    with connection.cursor() as cursor:
+        if hasattr(cursor.cursor, 'copy_expert'):
+            # psycopg2
+            cursor.cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+class TransactionImporter:
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE, use_copy=True):
+        self.user = user
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.use_copy = use_copy and copy_supported()
+        self.total_rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+        # Les transactions créées à partir d'ici viennent de cet import, voir filter_duplicates
+        self.started_at = timezone.now()
+        # Clés (date, montant, libellé) des lignes existantes déjà couvertes par un doublon du fichier
+        self.consumed = Counter()
+        # Un relevé utilise un seul format de date : le dernier format reconnu est essayé en premier
+        self.date_formats = DATE_FORMATS
+        self.categories = CategoryIndex.for_user(Category, user.pk)
+        self.archived_until = TransactionArchive.objects.filter(user=user).aggregate(last=Max('last_date'))['last']
+
+    def run(self, rows):
+        batch = []
+        for line_number, raw in rows:
+            self.total_rows += 1
+            try:
+                item, date_format = build_transaction(self.user, raw, self.date_formats)
+            except RowError as exc:
+                self.add_error(line_number, str(exc))
+            else:
+                item.category_fk_id = self.categories.resolve(item.category, item.type)
+                batch.append(item)
+                if date_format != self.date_formats[0]:
+                    self.date_formats = (date_format,) + tuple(f for f in DATE_FORMATS if f != date_format)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        if self.imported:
+            bump_data_version(self.user.pk)
+        return self.report()
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def flush(self, batch):
+        with transaction.atomic():
+            fresh = filter_duplicates(self.user, batch, self.consumed, self.archived_until, self.started_at)
+            self.consumed += Counter(map(duplicate_key, batch)) - Counter(map(duplicate_key, fresh))
+            self.duplicates += len(batch) - len(fresh)
+            if not fresh:
+                return
+            if self.use_copy:
+                copy_insert(fresh)
+            else:
+                Transaction.objects.bulk_create(fresh, batch_size=self.batch_size)
+            rollups.record_created(self.user.pk, fresh)
+        self.imported += len(fresh)
+
+    def report(self):
+        return {
+            'total_rows': self.total_rows,
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+            'method': 'copy' if self.use_copy else 'bulk_create',
+        }
+
+
+def import_file(user, uploaded_file, file_format=None, encoding='utf-8-sig', batch_size=DEFAULT_BATCH_SIZE, use_copy=True):
+    file_format = detect_format(uploaded_file.name, file_format)
+    uploaded_file.seek(0)
+    lines = io.TextIOWrapper(uploaded_file.file, encoding=encoding, errors='replace', newline='')
+    try:
+        report = TransactionImporter(user, batch_size=batch_size, use_copy=use_copy).run(PARSERS[file_format](lines))
+    finally:
+        lines.detach()
+    report['format'] = file_format
+    return report
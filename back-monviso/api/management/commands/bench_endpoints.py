@@ -0,0 +1,91 @@
+import json
+import platform
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api import metrics
+from api.db import pool as db_pool
+from api.benchmarks import ENDPOINTS, build_context, run_async, run_threaded, simulate_db_latency
+from budget.seeding import DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute chaque route de api/urls.py en concurrence dans le processus (WSGI ou ASGI) sur des "
+        "utilisateurs générés par seed_dataset, et écrit débit et latences p50/p95/p99 en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed_', help="Préfixe des utilisateurs générés par seed_dataset")
+        parser.add_argument('--users', type=int, default=10, help="Nombre d'utilisateurs utilisés en alternance")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Mot de passe des utilisateurs (scénario login)')
+        parser.add_argument('--requests', type=int, default=200, help='Requêtes par route')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requêtes simultanées')
+        parser.add_argument('--mode', choices=('wsgi', 'asgi'), default='wsgi', help='Pile Django utilisée')
+        parser.add_argument('--only', action='append', help='Limiter à ces noms de route (répétable)')
+        parser.add_argument('--writes', action='store_true', help="Inclure les routes d'écriture (modifient les données des utilisateurs)")
+        parser.add_argument('--no-cache', action='store_true', help='Désactiver le cache de réponses API (API_CACHE_TTL=0)')
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help="Délai ajouté à chaque requête SQL, pour simuler l'aller-retour vers une base distante")
+        parser.add_argument('--output', help='Fichier JSON de sortie (stdout par défaut)')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__startswith=options['prefix']).order_by('pk')[:options['users']])
+        if not users:
+            raise CommandError(f"Aucun utilisateur '{options['prefix']}*' : lancer d'abord manage.py seed_dataset")
+        contexts = [build_context(user, options['password']) for user in users]
+
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if (options['writes'] or not endpoint.writes) and (not options['only'] or endpoint.name in options['only'])
+        ]
+        run = run_async if options['mode'] == 'asgi' else run_threaded
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['no_cache']:
+            overrides['API_CACHE_TTL'] = 0
+
+        results = []
+        with override_settings(**overrides), simulate_db_latency(options['db_latency_ms'] / 1000):
+            for endpoint in endpoints:
+                result = run(endpoint, contexts, options['requests'], options['concurrency'])
+                results.append(result)
+                self.stderr.write(
+                    f"{endpoint.label:<32} {result['throughput_rps']:>9} req/s  p50 {result['p50_ms']:>8} ms  "
+                    f"p95 {result['p95_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  erreurs {result['errors']}"
+                )
+
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'mode': options['mode'],
+                'database': connection.vendor,
+                'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                'db_pool': connection.settings_dict.get('POOL'),
+                'users': len(users),
+                'requests_per_route': options['requests'],
+                'concurrency': options['concurrency'],
+                'writes': options['writes'],
+                'response_cache': not options['no_cache'],
+                'db_latency_ms': options['db_latency_ms'],
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+            },
+            'endpoints': results,
+            'connections': {
+                'connects': dict(metrics.registry.connects),
+                'pools': {pool.name: pool.snapshot() for pool in db_pool.pools.values()},
+            },
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Rapport écrit dans {options['output']}"))
+        else:
+            self.stdout.write(payload)
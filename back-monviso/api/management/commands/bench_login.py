@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.views import LoginView
+
+BENCH_USERNAME = 'bench_login'
+BENCH_PASSWORD = 'bench-login-password-42'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le coût d'une connexion (LoginView de bout en bout, JWT compris) "
+        "et en déduit le nombre de connexions par seconde et par cœur."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Nombre de connexions par scénario')
+        parser.add_argument('--keep', action='store_true', help="Conserver l'utilisateur de test après la mesure")
+
+    def handle(self, *args, **options):
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        user = User.objects.create_user(BENCH_USERNAME, f'{BENCH_USERNAME}@monviso.local', BENCH_PASSWORD)
+        hasher = get_hasher()
+        self.stdout.write(f"Hasher : {hasher.algorithm} ({getattr(hasher, 'iterations', '-')} itérations)")
+
+        scenarios = {
+            'succès (email)': {'email': user.email, 'password': BENCH_PASSWORD},
+            'succès (username)': {'email': user.username, 'password': BENCH_PASSWORD},
+            'mauvais mot de passe': {'email': user.email, 'password': 'wrong'},
+            'utilisateur inconnu': {'email': 'nobody@monviso.local', 'password': 'wrong'},
+        }
+        view = LoginView.as_view()
+        factory = APIRequestFactory()
+        try:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{'scénario':<24} {'statut':>6} {'requêtes':>9} {'médiane ms':>11} {'connexions/s/cœur':>18}"))
+            for name, payload in scenarios.items():
+                with CaptureQueriesContext(connection) as queries:
+                    response = view(factory.post('/api/auth/login/', payload, format='json'))
+                query_count = len(queries)
+                timings = []
+                for _ in range(options['repeat']):
+                    request = factory.post('/api/auth/login/', payload, format='json')
+                    started = time.perf_counter()
+                    view(request)
+                    timings.append(time.perf_counter() - started)
+                median = statistics.median(timings)
+                self.stdout.write(
+                    f'{name:<24} {response.status_code:>6} {query_count:>9} {median * 1000:>11.2f} {1 / median:>18.1f}'
+                )
+        finally:
+            if not options['keep']:
+                User.objects.filter(username=BENCH_USERNAME).delete()
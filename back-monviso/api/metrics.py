@@ -0,0 +1,304 @@
+"""
+Métriques des requêtes HTTP au format texte Prometheus.
+
+MetricsMiddleware mesure chaque requête, étiquetée par nom d'URL et méthode :
+- latence (histogramme) ;
+- nombre de requêtes SQL (histogramme) et temps SQL cumulé, via connection.execute_wrapper
+  (fonctionne avec DEBUG=False, y compris pour les lectures parallèles des vues async) ;
+- taille de réponse (histogramme, réponses non streamées) ;
+- codes de statut (compteur) ;
+- connexions établies par alias et, avec DB_POOL, état du pool (attentes, créations, fermetures).
+
+Les buckets sont calculés hors verrou ; le verrou du registre ne protège que quelques
+incréments de dictionnaire. Avec plusieurs workers gunicorn, définir METRICS_MULTIPROC_DIR :
+chaque processus y écrit périodiquement son instantané (metrics_<pid>.json) et api/metrics/
+additionne les fichiers de tous les workers.
+"""
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import cache
+from .db import pool as db_pool
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+HISTOGRAMS = {
+    'duration': {
+        'name': 'monviso_http_request_duration_seconds',
+        'help': 'Durée de traitement des requêtes HTTP (jusqu\'aux en-têtes de réponse).',
+        'buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    },
+    'queries': {
+        'name': 'monviso_db_queries_per_request',
+        'help': 'Nombre de requêtes SQL par requête HTTP.',
+        'buckets': (0, 1, 2, 3, 5, 10, 20, 50, 100),
+    },
+    'size': {
+        'name': 'monviso_http_response_size_bytes',
+        'help': 'Taille des réponses HTTP non streamées.',
+        'buckets': (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    },
+}
+
+# Statistiques de api/db/pool.py : clé -> (métrique, type, description)
+POOL_METRICS = {
+    'created': ('monviso_db_pool_connections_created_total', 'counter', 'Connexions physiques ouvertes par le pool.'),
+    'closed': ('monviso_db_pool_connections_closed_total', 'counter', 'Connexions fermées par le pool (âge, erreur, vérification).'),
+    'reused': ('monviso_db_pool_connections_reused_total', 'counter', 'Emprunts servis par une connexion déjà ouverte.'),
+    'waits': ('monviso_db_pool_waits_total', 'counter', "Emprunts ayant attendu qu'une connexion se libère."),
+    'wait_seconds': ('monviso_db_pool_wait_seconds_total', 'counter', 'Temps cumulé passé à attendre une connexion.'),
+    'timeouts': ('monviso_db_pool_timeouts_total', 'counter', "Emprunts abandonnés après DB_POOL_TIMEOUT."),
+    'max_size': ('monviso_db_pool_max_size', 'gauge', 'Taille maximale du pool.'),
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.db_seconds = Counter()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.connects = Counter()
+        self.last_flush = 0.0
+
+    def observe(self, view, method, status_code, duration, queries, db_seconds, size):
+        key = (view, method)
+        observations = [('duration', duration), ('queries', queries)]
+        if size is not None:
+            observations.append(('size', size))
+        indexes = [(name, bisect_left(HISTOGRAMS[name]['buckets'], value), value) for name, value in observations]
+        with self.lock:
+            self.requests[(view, method, str(status_code))] += 1
+            self.db_seconds[key] += db_seconds
+            for name, index, value in indexes:
+                series = self.histograms[name].get(key)
+                if series is None:
+                    # Comptes par bucket (non cumulés, dernier = +Inf), puis somme
+                    series = self.histograms[name][key] = [0] * (len(HISTOGRAMS[name]['buckets']) + 1) + [0.0]
+                series[index] += 1
+                series[-1] += value
+
+    def connected(self, alias):
+        with self.lock:
+            self.connects[alias] += 1
+
+    def snapshot(self):
+        pool_stats = Counter()
+        for pool in list(db_pool.pools.values()):
+            for stat, value in pool.snapshot().items():
+                pool_stats[(pool.name, stat)] += value
+        with self.lock:
+            return {
+                'requests': [[*key, value] for key, value in self.requests.items()],
+                'db_seconds': [[*key, value] for key, value in self.db_seconds.items()],
+                'connects': [[alias, value] for alias, value in self.connects.items()],
+                'pool': [[*key, value] for key, value in pool_stats.items()],
+                'histograms': {
+                    name: [[*key, list(series)] for key, series in histograms.items()]
+                    for name, histograms in self.histograms.items()
+                },
+                'cache': dict(cache.stats),
+            }
+
+
+registry = Registry()
+
+
+def on_connection_created(sender, connection, **kwargs):
+    registry.connected(connection.alias)
+
+
+def empty_snapshot():
+    return {
+        'requests': [], 'db_seconds': [], 'connects': [], 'pool': [],
+        'histograms': {name: [] for name in HISTOGRAMS}, 'cache': {},
+    }
+
+
+def merge(total, snapshot):
+    """Additionne `snapshot` dans `total` (instantanés de plusieurs processus)"""
+    for field in ('requests', 'db_seconds', 'connects', 'pool'):
+        values = Counter({tuple(row[:-1]): row[-1] for row in total[field]})
+        for row in snapshot.get(field, ()):
+            values[tuple(row[:-1])] += row[-1]
+        total[field] = [[*key, value] for key, value in values.items()]
+    for name in HISTOGRAMS:
+        series = {tuple(row[:2]): row[2] for row in total['histograms'][name]}
+        for view, method, counts in snapshot.get('histograms', {}).get(name, ()):
+            current = series.get((view, method))
+            series[(view, method)] = counts if current is None else [a + b for a, b in zip(current, counts)]
+        total['histograms'][name] = [[*key, counts] for key, counts in series.items()]
+    for event, value in snapshot.get('cache', {}).items():
+        total['cache'][event] = total['cache'].get(event, 0) + value
+    return total
+
+
+def multiproc_dir():
+    return getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+
+
+def flush(force=False):
+    """Écrit l'instantané du processus dans METRICS_MULTIPROC_DIR (au plus toutes les METRICS_FLUSH_INTERVAL s)"""
+    directory = multiproc_dir()
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - registry.last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0):
+        return
+    registry.last_flush = now
+    path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(registry.snapshot(), handle)
+    os.replace(temporary, path)
+
+
+def collect():
+    directory = multiproc_dir()
+    if not directory:
+        return merge(empty_snapshot(), registry.snapshot())
+    flush(force=True)
+    total = empty_snapshot()
+    for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+        try:
+            with open(path) as handle:
+                merge(total, json.load(handle))
+        except (OSError, ValueError):
+            # Fichier d'un worker en cours de remplacement ou supprimé : ignoré pour ce scrape
+            continue
+    return total
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Exposition texte Prometheus de l'ensemble des métriques (tous workers en mode multiprocessus)"""
+    data = collect()
+    lines = [
+        '# HELP monviso_http_requests_total Requêtes HTTP par vue, méthode et statut.',
+        '# TYPE monviso_http_requests_total counter',
+    ]
+    for view, method, status_code, value in sorted(data['requests']):
+        lines.append(f'monviso_http_requests_total{_labels(view=view, method=method, status=status_code)} {value}')
+
+    lines += [
+        '# HELP monviso_db_query_duration_seconds_total Temps cumulé passé dans les requêtes SQL.',
+        '# TYPE monviso_db_query_duration_seconds_total counter',
+    ]
+    for view, method, value in sorted(data['db_seconds']):
+        lines.append(f'monviso_db_query_duration_seconds_total{_labels(view=view, method=method)} {_number(float(value))}')
+
+    for name, spec in HISTOGRAMS.items():
+        lines += [f"# HELP {spec['name']} {spec['help']}", f"# TYPE {spec['name']} histogram"]
+        for view, method, series in sorted(data['histograms'][name]):
+            cumulative = 0
+            for bound, count in zip((*spec['buckets'], '+Inf'), series[:-1]):
+                cumulative += count
+                lines.append(f"{spec['name']}_bucket{_labels(view=view, method=method, le=bound)} {cumulative}")
+            lines.append(f"{spec['name']}_sum{_labels(view=view, method=method)} {_number(series[-1])}")
+            lines.append(f"{spec['name']}_count{_labels(view=view, method=method)} {cumulative}")
+
+    lines += [
+        '# HELP monviso_db_connects_total Connexions établies par Django (emprunts au pool si DB_POOL).',
+        '# TYPE monviso_db_connects_total counter',
+    ]
+    for alias, value in sorted(data['connects']):
+        lines.append(f'monviso_db_connects_total{_labels(alias=alias)} {value}')
+
+    pool = {}
+    for alias, stat, value in data['pool']:
+        pool.setdefault(stat, []).append((alias, value))
+    for stat, (name, kind, help_text) in POOL_METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for alias, value in sorted(pool.get(stat, ())):
+            lines.append(f'{name}{_labels(alias=alias)} {_number(value)}')
+    lines += [
+        '# HELP monviso_db_pool_connections Connexions du pool par état.',
+        '# TYPE monviso_db_pool_connections gauge',
+    ]
+    for state in ('idle', 'in_use'):
+        for alias, value in sorted(pool.get(state, ())):
+            lines.append(f'monviso_db_pool_connections{_labels(alias=alias, state=state)} {value}')
+
+    lines += [
+        '# HELP monviso_api_cache_events_total Événements du cache de réponses API (api/cache.py).',
+        '# TYPE monviso_api_cache_events_total counter',
+    ]
+    for event, value in sorted(data['cache'].items()):
+        lines.append(f'monviso_api_cache_events_total{_labels(event=event)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryRecorder:
+    """execute_wrapper comptant les requêtes SQL et leur durée (partageable entre threads)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.count += 1
+                self.seconds += elapsed
+
+
+# Recorder de la requête HTTP en cours, propagé aux threads lancés par sync_to_async
+current_recorder = contextvars.ContextVar('metrics_query_recorder', default=None)
+
+
+@contextmanager
+def record_queries(recorder=None):
+    """Compte les requêtes des connexions du thread courant dans le recorder de la requête HTTP en cours"""
+    recorder = recorder or current_recorder.get()
+    with ExitStack() as stack:
+        if recorder is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            with record_queries(recorder):
+                response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, duration, recorder.count, recorder.seconds, size)
+        flush()
+        return response
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # auth_user appartient à django.contrib.auth : l'index est ajouté en SQL brut
+    # pour la connexion par email (LoginView)
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS auth_user_email_idx',
+        ),
+    ]
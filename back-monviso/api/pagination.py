@@ -0,0 +1,77 @@
+"""
+Pagination par curseur (keyset) pour les listes de transactions.
+
+Le curseur encode la position (date, created_at, id) de la dernière ligne
+renvoyée : la page suivante est obtenue par une comparaison sur ces colonnes,
+sans OFFSET, ce qui garde un coût constant quelle que soit la page demandée.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Ordre stable : celui du modèle (-date, -created_at) + id comme départage
+KEYSET_ORDERING = ('-date', '-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(transaction):
+    payload = [transaction.date.isoformat(), transaction.created_at.isoformat(), transaction.id]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_str, created_str, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        date = parse_date(date_str)
+        created_at = parse_datetime(created_str)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Curseur invalide')
+    if date is None or created_at is None:
+        raise InvalidCursor('Curseur invalide')
+    return date, created_at, pk
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('Le paramètre limit doit être un entier')
+    if limit < 1:
+        raise ValueError('Le paramètre limit doit être positif')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_keyset(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Renvoie (lignes, curseur_suivant) pour le queryset trié selon KEYSET_ORDERING.
+    Le curseur suivant vaut None lorsqu'il n'y a plus de page.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if cursor:
+        date, created_at, pk = decode_cursor(cursor)
+        # Borne simple redondante avec le OU : élague les partitions postérieures au curseur (budget/partitions.py)
+        queryset = queryset.filter(date__lte=date).filter(
+            Q(date__lt=date)
+            | Q(date=date, created_at__lt=created_at)
+            | Q(date=date, created_at=created_at, id__lt=pk)
+        )
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = list(queryset[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,123 @@
+"""
+Recherche plein texte et approchée sur le libellé et la catégorie des transactions.
+
+- PostgreSQL : tsvector 'simple' (index GIN sur l'expression) en préfixe, complété par la
+  similarité de trigrammes (pg_trgm, index GIN) pour tolérer les fautes de frappe ;
+  classement SearchRank + TrigramWordSimilarity.
+- SQLite (développement, tests) : table FTS5 budget_transaction_fts jointe par l'ORM
+  (TransactionSearchEntry), classement bm25.
+- Autres moteurs : icontains, sans classement.
+
+Les résultats sont triés par (rank, date, id) décroissants et paginés par curseur sur ces trois
+valeurs (keyset) : une page profonde coûte autant que la première, contrairement à OFFSET.
+
+Voir la migration budget 0008 pour les index et la table FTS.
+"""
+import base64
+import json
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Q, Value
+from django.db.models.functions import Greatest
+from django.utils.dateparse import parse_date
+
+from budget.models import TransactionSearchEntry
+from .pagination import InvalidCursor
+
+TOKEN = re.compile(r'\w+')
+MAX_TOKENS = 8
+ORDERING = ('-rank', '-date', '-id')
+
+
+def tokenize(text):
+    return TOKEN.findall((text or '').lower())[:MAX_TOKENS]
+
+
+class SearchDocument(Func):
+    """Identique à l'expression indexée par la migration budget 0008 (colonnes qualifiées par l'ORM)"""
+    template = "to_tsvector('simple', coalesce(%(expressions)s, ''))"
+    arg_joiner = ", '') || ' ' || coalesce("
+
+    def __init__(self, **extra):
+        super().__init__(F('name'), F('category'), **extra)
+
+
+@TransactionSearchEntry._meta.get_field('document').register_lookup
+class Match(Lookup):
+    """Requête FTS5 : <table>.<colonne cachée> MATCH %s"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def search_transactions(queryset, text):
+    """Filtre `queryset` sur `text` et l'annote d'un score `rank` (plus grand = plus pertinent), trié par pertinence"""
+    tokens = tokenize(text)
+    if not tokens:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField, TrigramWordSimilarity
+
+        # Préfixe sur chaque mot : « carr bio » trouve « Carrefour Bio »
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), config='simple', search_type='raw')
+        phrase = ' '.join(tokens)
+        queryset = queryset.annotate(
+            search_document=SearchDocument(output_field=SearchVectorField()),
+        ).filter(
+            Q(search_document=query) | Q(name__trigram_word_similar=phrase) | Q(category__trigram_word_similar=phrase)
+        ).annotate(rank=(
+            SearchRank(F('search_document'), query)
+            + Greatest(TrigramWordSimilarity(phrase, 'name'), TrigramWordSimilarity(phrase, 'category'))
+        ))
+    elif connection.vendor == 'sqlite':
+        fts_query = ' '.join(f'"{token}"*' for token in tokens)
+        queryset = queryset.filter(search_entry__document__match=fts_query).annotate(
+            rank=-Func(F('search_entry__document'), function='bm25', output_field=FloatField()),
+        )
+    else:
+        condition = Q()
+        for token in tokens:
+            condition &= Q(name__icontains=token) | Q(category__icontains=token)
+        queryset = queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by(*ORDERING)
+
+
+def encode_cursor(row):
+    payload = [row.rank, row.date.isoformat(), row.id]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        rank, date_str, pk = json.loads(base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode()))
+        rank, date, pk = float(rank), parse_date(date_str), int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Curseur invalide')
+    if date is None:
+        raise InvalidCursor('Curseur invalide')
+    return rank, date, pk
+
+
+def paginate(queryset, cursor=None, limit=50):
+    """
+    Page de résultats de search_transactions après `cursor` : comparaison sur (rank, date, id)
+    au lieu d'un OFFSET. Renvoie (lignes, curseur_suivant ou None).
+    """
+    if cursor:
+        rank, date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(rank__lt=rank)
+            | Q(rank=rank, date__lt=date)
+            | Q(rank=rank, date=date, id__lt=pk)
+        )
+    rows = list(queryset[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
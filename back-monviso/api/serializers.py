@@ -1,6 +1,13 @@
+import copy
+from django.db import transaction as db_transaction
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.utils import timezone
+from budget import rollups
+from budget.categories import CategoryIndex
+from budget.deletion import delete_rows
 from budget.models import UserProfile, Income, Expense, SavingsGoal, Category, Transaction
+from .cache import bump_data_version
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,15 +57,74 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'monthly_budget': 'Le budget doit être positif.'})
         return data
 
+    def create(self, validated_data):
+        with db_transaction.atomic():
+            instance = super().create(validated_data)
+            # Rattache les transactions déjà saisies avec ce libellé
+            Transaction.objects.filter(
+                user_id=instance.user_id, category=instance.name, type=instance.type, category_fk__isnull=True
+            ).update(category_fk=instance)
+        return instance
+
+    def update(self, instance, validated_data):
+        previous_name = instance.name
+        with db_transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if instance.name != previous_name:
+                # Renommage : le libellé des transactions liées suit, les rollups sont déplacés d'un libellé à l'autre
+                linked = Transaction.objects.filter(user_id=instance.user_id, category_fk=instance)
+                deltas = rollups.add_queryset(rollups.empty_deltas(), linked, sign=-1)
+                linked.update(category=instance.name)
+                rollups.apply_deltas(instance.user_id, rollups.add_queryset(deltas, linked))
+        return instance
+
 class TransactionSerializer(serializers.ModelSerializer):
+    # Transition : la catégorie est acceptée par libellé (`category`) ou par identifiant (`category_id`)
+    category_id = serializers.IntegerField(source='category_fk_id', required=False, allow_null=True)
+
     class Meta:
         model = Transaction
-        fields = ['id', 'name', 'amount', 'type', 'category', 'date', 'payment_method', 'frequency', 'created_at']
+        fields = ['id', 'name', 'amount', 'type', 'category', 'category_id', 'date', 'payment_method', 'frequency', 'created_at']
         read_only_fields = ['id', 'created_at']
 
+    def get_category_index(self):
+        """Catégories de l'utilisateur, chargées une fois et partagées via le contexte (requêtes batch)"""
+        if 'category_index' not in self.context:
+            user = self.context['request'].user if 'request' in self.context else self.instance.user
+            self.context['category_index'] = CategoryIndex.for_user(Category, user.pk)
+        return self.context['category_index']
+
+    def validate(self, data):
+        if 'category_fk_id' in data:
+            category_id = data['category_fk_id']
+            if category_id is not None:
+                index = self.get_category_index()
+                if category_id not in index.names:
+                    raise serializers.ValidationError({'category_id': 'Catégorie introuvable.'})
+                data['category'] = index.names[category_id]
+        elif 'category' in data or 'type' in data:
+            name = data.get('category', getattr(self.instance, 'category', ''))
+            type_ = data.get('type', getattr(self.instance, 'type', None))
+            data['category_fk_id'] = self.get_category_index().resolve(name, type_)
+        return data
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        with db_transaction.atomic():
+            instance = super().create(validated_data)
+            rollups.record_created(instance.user_id, [instance])
+        return instance
+
+    def update(self, instance, validated_data):
+        with db_transaction.atomic():
+            previous = copy.copy(instance)
+            instance = super().update(instance, validated_data)
+            rollups.record_updated(instance.user_id, previous, instance)
+        return instance
+
+class OnboardingExpenseSerializer(ExpenseSerializer):
+    # Identifiant brut : les catégories sont résolues en une seule requête, limitée à l'utilisateur
+    category = serializers.IntegerField(required=False, allow_null=True)
 
 class OnboardingDataSerializer(serializers.Serializer):
     # Personal info
@@ -71,51 +137,99 @@ class OnboardingDataSerializer(serializers.Serializer):
     incomes = IncomeSerializer(many=True, required=False)
     
     # Expenses
-    fixed_expenses = ExpenseSerializer(many=True, required=False)
-    variable_expenses = ExpenseSerializer(many=True, required=False)
+    fixed_expenses = OnboardingExpenseSerializer(many=True, required=False)
+    variable_expenses = OnboardingExpenseSerializer(many=True, required=False)
     
     # Goals
     savings_goals = SavingsGoalSerializer(many=True, required=False)
 
+    def validate(self, attrs):
+        """Résout les catégories des dépenses en une requête ; inexistante ou d'un autre utilisateur : refusée"""
+        expenses = [expense for key in ('fixed_expenses', 'variable_expenses') for expense in attrs.get(key, [])]
+        category_ids = {expense['category'] for expense in expenses if expense.get('category')}
+        categories = {
+            category.pk: category
+            for category in Category.objects.filter(user=self.context['request'].user, pk__in=category_ids)
+        } if category_ids else {}
+        unknown = category_ids - categories.keys()
+        if unknown:
+            raise serializers.ValidationError({'category': f'Catégorie introuvable : {", ".join(map(str, sorted(unknown)))}.'})
+        for expense in expenses:
+            expense['category'] = categories.get(expense.get('category'))
+        return attrs
+
     def create(self, validated_data):
+        """
+        Enregistre l'onboarding en un seul bloc atomique, avec un nombre de requêtes constant.
+        Une nouvelle soumission met à jour les lignes existantes (même nom), crée les nouvelles
+        et supprime celles qui ne figurent plus dans la soumission : le résultat est idempotent.
+        """
         user = self.context['request'].user
         
-        # Update user's first and last name
-        user.first_name = validated_data.get('first_name', user.first_name)
-        user.last_name = validated_data.get('last_name', user.last_name)
-        user.save()
-        
-        # Create or update user profile
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        profile.monthly_income = validated_data.get('monthly_income')
-        profile.currency = validated_data.get('currency', 'EUR')
-        profile.onboarding_completed = True
-        profile.save()
-        
-        # Create incomes
-        incomes_data = validated_data.get('incomes', [])
-        for income_data in incomes_data:
-            Income.objects.create(user=user, **income_data)
-        
-        # Create fixed expenses
-        fixed_expenses_data = validated_data.get('fixed_expenses', [])
-        for expense_data in fixed_expenses_data:
-            expense_data['type'] = 'fixed'
-            Expense.objects.create(user=user, **expense_data)
-        
-        # Create variable expenses
-        variable_expenses_data = validated_data.get('variable_expenses', [])
-        for expense_data in variable_expenses_data:
-            expense_data['type'] = 'variable'
-            Expense.objects.create(user=user, **expense_data)
-        
-        # Create savings goals
-        goals_data = validated_data.get('savings_goals', [])
-        for goal_data in goals_data:
-            SavingsGoal.objects.create(user=user, **goal_data)
+        with db_transaction.atomic():
+            # Update user's first and last name
+            user.first_name = validated_data.get('first_name', user.first_name)
+            user.last_name = validated_data.get('last_name', user.last_name)
+            user.save(update_fields=['first_name', 'last_name'])
+            
+            # Create or update user profile
+            profile, created = UserProfile.objects.update_or_create(user=user, defaults={
+                'monthly_income': validated_data.get('monthly_income'),
+                'currency': validated_data.get('currency', 'EUR'),
+                'onboarding_completed': True,
+            })
+            
+            incomes_data = validated_data.get('incomes', [])
+            
+            expenses_data = []
+            for expense_type, key in (('fixed', 'fixed_expenses'), ('variable', 'variable_expenses')):
+                for expense_data in validated_data.get(key, []):
+                    expenses_data.append(dict(expense_data, type=expense_type))
+            
+            goals_data = validated_data.get('savings_goals', [])
+            
+            sync_user_rows(Income, user, incomes_data, key_fields=['name'])
+            sync_user_rows(Expense, user, expenses_data, key_fields=['type', 'name'])
+            sync_user_rows(SavingsGoal, user, goals_data, key_fields=['name'])
+            
+            # Écritures bulk et DELETE direct : aucun signal d'invalidation par ligne, un seul bump
+            bump_data_version(user.pk)
         
         return {
             'user': user,
             'profile': profile,
             'message': 'Onboarding completed successfully'
         }
+
+def sync_user_rows(model, user, items, key_fields):
+    """
+    Aligne les lignes `model` de l'utilisateur sur `items` en 4 requêtes au plus :
+    SELECT existant, bulk_update des lignes de même clé, bulk_create des nouvelles, DELETE des restantes.
+    """
+    existing = {}
+    for row in model.objects.filter(user=user).order_by('pk'):
+        existing.setdefault(tuple(getattr(row, field) for field in key_fields), []).append(row)
+
+    to_create, to_update, update_fields = [], [], set()
+    for item in items:
+        matches = existing.get(tuple(item.get(field) for field in key_fields))
+        if matches:
+            row = matches.pop(0)
+            for field, value in item.items():
+                setattr(row, field, value)
+            update_fields.update(item)
+            to_update.append(row)
+        else:
+            to_create.append(model(user=user, **item))
+
+    stale = [row.pk for rows in existing.values() for row in rows]
+    if stale:
+        # DELETE direct, sans post_delete par ligne : l'appelant invalide le cache une seule fois
+        delete_rows(model, 'id', stale)
+    if to_update:
+        now = timezone.now()
+        for row in to_update:
+            row.updated_at = now
+        model.objects.bulk_update(to_update, [*update_fields, 'updated_at'])
+    if to_create:
+        model.objects.bulk_create(to_create)
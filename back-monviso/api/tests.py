@@ -1,3 +1,959 @@
-from django.test import TestCase
+"""
+Non-régression des performances de chaque route de api/urls.py.
 
-# Create your tests here.
+Trois utilisateurs (petit, moyen, gros historique) sont générés par budget.seeding ; pour
+chaque scénario de api.benchmarks.ENDPOINTS on vérifie que :
+- le nombre de requêtes SQL est identique quelle que soit la volumétrie (pas de N+1) et ne
+  dépasse pas le budget de la route ;
+- la latence sur le gros jeu de données reste sous le budget de la route, multiplié par
+  API_LATENCY_BUDGET_SCALE (machines lentes, CI partagée). Mesure dépendante de la machine :
+  exécutée seulement avec API_LATENCY_TESTS=1.
+
+Fonctionne sur SQLite (DB_ENGINE=sqlite python manage.py test) comme sur PostgreSQL.
+"""
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import async_views, exporters, importers, metrics, urls
+from api.authentication import bump_auth_version, user_cache
+from api.cache import check_cache_backend, get_cache, stats as cache_stats
+from api.db import router
+from api.db.pool import ConnectionPool, PoolTimeout
+from api.pagination import KEYSET_ORDERING
+from api.serializers import OnboardingDataSerializer
+from api.benchmarks import ENDPOINTS, build_context, send
+from budget import archive, rollups
+from budget.models import Category, Expense, Income, MonthlyRollup, Transaction, UserProfile
+from budget.seeding import DEFAULT_PASSWORD, DatasetGenerator
+
+SIZES = {'small': 20, 'medium': 500, 'large': 5000}
+LATENCY_TESTS = os.getenv('API_LATENCY_TESTS', 'False').lower() in ('1', 'true', 'yes')
+LATENCY_BUDGET_SCALE = float(os.getenv('API_LATENCY_BUDGET_SCALE', 1))
+LATENCY_ATTEMPTS = 3
+
+# Nombre maximal de requêtes SQL par (méthode, route)
+MAX_QUERIES = {
+    ('GET', 'test_connection'): 0,
+    ('GET', 'metrics'): 0,
+    ('GET', 'profile'): 2,
+    ('POST', 'login'): 1,
+    ('POST', 'register'): 3,
+    ('POST', 'token_refresh'): 0,
+    ('POST', 'onboarding'): 21,
+    ('GET', 'onboarding_status'): 2,
+    ('GET', 'dashboard_data'): 8,
+    ('GET', 'financial_data'): 8,
+    ('GET', 'summary'): 4,
+    ('GET', 'dashboard_data_async'): 8,
+    ('GET', 'summary_async'): 4,
+    ('GET', 'forecast'): 6,
+    ('GET', 'budgets'): 3,
+    ('GET', 'transactions'): 2,
+    ('POST', 'transactions'): 9,
+    ('GET', 'transaction_search'): 2,
+    ('POST', 'transaction_import'): 11,
+    ('GET', 'transaction_export'): 3,
+    ('POST', 'transaction_batch'): 11,
+    ('GET', 'transaction_detail'): 2,
+    ('PUT', 'transaction_detail'): 6,
+    ('DELETE', 'transaction_detail'): 9,
+    ('GET', 'history'): 4,
+    ('GET', 'categories'): 2,
+    ('POST', 'categories'): 5,
+    ('GET', 'category_detail'): 2,
+    ('PUT', 'category_detail'): 5,
+    ('DELETE', 'category_detail'): 5,
+}
+
+# Latence maximale en millisecondes (meilleure de LATENCY_ATTEMPTS requêtes, gros jeu de données)
+DEFAULT_LATENCY_MS = 100
+LATENCY_MS = {
+    ('GET', 'dashboard_data'): 250,
+    ('GET', 'financial_data'): 250,
+    ('GET', 'dashboard_data_async'): 250,
+    ('GET', 'history'): 150,
+    # Export complet : linéaire par construction (5000 lignes streamées)
+    ('GET', 'transaction_export'): 500,
+}
+
+
+@override_settings(
+    API_CACHE_TTL=0,
+    # Scénario metrics : client de test local, hors proxy
+    METRICS_ALLOW_LOCAL=True,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class EndpointPerformanceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        generator = DatasetGenerator(seed=20)
+        cls.contexts = {}
+        for size, count in SIZES.items():
+            user, = generator.create_users(f'perf_{size}_', 1)
+            generator.populate(user, count)
+            cls.contexts[size] = build_context(user, DEFAULT_PASSWORD)
+
+    def setUp(self):
+        self.client = Client()
+
+    def request(self, endpoint, size):
+        context = self.contexts[size]
+        path, data = endpoint.prepare(context)
+        # Chaque mesure part du même état : utilisateur absent du cache d'authentification
+        user_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = send(self.client, endpoint, context, path, data)
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 400, f'{endpoint.label} ({size}) : {response.status_code}')
+        return len(queries), elapsed
+
+    def test_every_route_has_a_scenario(self):
+        covered = {(endpoint.method, endpoint.name) for endpoint in ENDPOINTS}
+        for pattern in urls.urlpatterns:
+            self.assertIsInstance(pattern, URLPattern)
+            view = getattr(pattern.callback, 'view_class', None) or getattr(pattern.callback, 'cls', None)
+            # Vues async (fonctions) : lecture seule
+            methods = [method for method in view.http_method_names if hasattr(view, method)] if view else ['get']
+            for method in methods:
+                if method in ('head', 'options'):
+                    continue
+                self.assertIn((method.upper(), pattern.name), covered)
+                self.assertIn((method.upper(), pattern.name), MAX_QUERIES)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.label):
+                counts = {size: self.request(endpoint, size)[0] for size in SIZES}
+                self.assertEqual(len(set(counts.values())), 1, f'{endpoint.label} : {counts}')
+                self.assertLessEqual(counts['large'], MAX_QUERIES[(endpoint.method, endpoint.name)])
+
+    @skipUnless(LATENCY_TESTS, 'Budgets de latence : API_LATENCY_TESTS=1')
+    def test_latency_budget(self):
+        for endpoint in ENDPOINTS:
+            with self.subTest(endpoint.label):
+                best = min(self.request(endpoint, 'large')[1] for _ in range(LATENCY_ATTEMPTS))
+                budget = LATENCY_MS.get((endpoint.method, endpoint.name), DEFAULT_LATENCY_MS) * LATENCY_BUDGET_SCALE
+                self.assertLessEqual(best * 1000, budget, endpoint.label)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def make_pool(self, **options):
+        return ConnectionPool('test', **{'max_size': 2, 'timeout': 0.05, 'max_lifetime': 60, 'check_idle': 60, **options})
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool()
+        first = pool.acquire(FakeConnection, lambda connection: True)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection, lambda connection: True), first)
+        self.assertEqual(pool.snapshot()['created'], 1)
+        self.assertEqual(pool.snapshot()['reused'], 1)
+
+    def test_pool_is_bounded(self):
+        pool = self.make_pool()
+        held = [pool.acquire(FakeConnection, lambda connection: True) for _ in range(2)]
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection, lambda connection: True)
+
+        threading.Timer(0.01, pool.release, args=(held[0],)).start()
+        self.assertIs(pool.acquire(FakeConnection, lambda connection: True), held[0])
+        stats = pool.snapshot()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['in_use']), (2, 1, 2))
+
+    def test_unusable_or_expired_connections_are_replaced(self):
+        pool = self.make_pool(check_idle=0)
+        broken = pool.acquire(FakeConnection, lambda connection: True)
+        pool.release(broken)
+        replacement = pool.acquire(FakeConnection, lambda connection: False)
+        self.assertIsNot(replacement, broken)
+        self.assertTrue(broken.closed)
+
+        pool.release(replacement, reusable=False)
+        self.assertTrue(replacement.closed)
+
+        expiring = self.make_pool(max_lifetime=0)
+        connection = expiring.acquire(FakeConnection, lambda connection: True)
+        expiring.release(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(expiring.snapshot()['idle'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = router.ReplicaRouter()
+        self.user = User(pk=42, username='replica')
+        router.pin_cache().delete(router.PIN_KEY.format(user_id=self.user.pk))
+
+    def read_db(self):
+        class View:
+            @router.replica_reads
+            def get(view, request):
+                return self.router.db_for_read(Transaction)
+        return View().get(type('Request', (), {'user': self.user})())
+
+    def test_designated_reads_go_to_replica(self):
+        self.assertEqual(self.read_db(), 'replica_1')
+        self.assertIsNone(self.router.db_for_read(Transaction))
+        self.assertEqual(self.router.db_for_write(Transaction), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'budget'))
+
+    def test_pin_requires_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_cache_backend()
+
+    def test_replica_reads_after_a_write_are_not_cached(self):
+        request = type('Request', (), {'user': self.user, 'read_alias': 'replica_1'})()
+        self.assertTrue(router.cacheable(request))
+        router.pin_to_primary(self.user.pk)
+        self.assertFalse(router.cacheable(request))
+        request.read_alias = 'default'
+        self.assertTrue(router.cacheable(request))
+        # Fin de l'épingle : lecture de nouveau sur le réplica, mise en cache encore différée
+        with mock.patch('api.db.router.time.time', return_value=time.time() + 5):
+            self.assertFalse(router.is_pinned(self.user.pk))
+
+    def test_writer_is_pinned_to_primary(self):
+        router.pin_to_primary(self.user.pk)
+        self.assertIsNone(self.read_db())  # routage par défaut : 'default'
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(router.read_alias(User(pk=7)), 'default')
+
+
+CSV_STATEMENT = """Date;Libellé;Montant;Catégorie
+02/01/2024;Boulangerie;-4,50;Alimentation
+03/01/2024;Salaire;1 850,00;
+04/01/2024;Boulangerie;-4,50;
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>CHECK
+<DTPOSTED>20240105120000
+<TRNAMT>-120.00
+<NAME>Cheque 1234
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240106
+<TRNAMT>35.10
+<MEMO>Remboursement
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+QIF_STATEMENT = """!Type:Bank
+D07/01/2024
+T-60.00
+PStation service
+LTransport:Carburant
+N1001
+^
+D08/01/2024
+T-12.30
+MCinéma
+^
+"""
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', 'importer@example.com', 'password')
+
+    def import_text(self, filename, content, **options):
+        uploaded = SimpleUploadedFile(filename, content.encode())
+        return importers.import_file(self.user, uploaded, **options)
+
+    def imported(self):
+        return list(
+            Transaction.objects.filter(user=self.user).order_by('date', 'id')
+            .values_list('date', 'name', 'amount', 'type', 'category', 'payment_method')
+        )
+
+    def test_csv_statement(self):
+        rows = list(importers.parse_csv(CSV_STATEMENT.splitlines()))
+        self.assertEqual([line for line, _ in rows], [2, 3, 4])
+        self.assertEqual(rows[1][1], {'date': '03/01/2024', 'name': 'Salaire', 'amount': '1 850,00', 'category': ''})
+
+        report = self.import_text('releve.csv', CSV_STATEMENT, use_copy=False)
+        self.assertEqual((report['format'], report['imported'], report['error_count']), ('csv', 3, 0))
+        self.assertEqual(self.imported(), [
+            (date(2024, 1, 2), 'Boulangerie', Decimal('4.50'), 'expense', 'Alimentation', ''),
+            (date(2024, 1, 3), 'Salaire', Decimal('1850.00'), 'income', '', ''),
+            (date(2024, 1, 4), 'Boulangerie', Decimal('4.50'), 'expense', '', ''),
+        ])
+
+    def test_ofx_statement(self):
+        report = self.import_text('releve.qfx', OFX_STATEMENT, use_copy=False)
+        self.assertEqual((report['format'], report['imported']), ('ofx', 2))
+        self.assertEqual(self.imported(), [
+            (date(2024, 1, 5), 'Cheque 1234', Decimal('120.00'), 'expense', '', 'check'),
+            (date(2024, 1, 6), 'Remboursement', Decimal('35.10'), 'income', '', ''),
+        ])
+
+    def test_qif_statement(self):
+        report = self.import_text('releve.qif', QIF_STATEMENT, use_copy=False)
+        self.assertEqual((report['format'], report['imported']), ('qif', 2))
+        self.assertEqual(self.imported(), [
+            (date(2024, 1, 7), 'Station service', Decimal('60.00'), 'expense', 'Transport', 'check'),
+            (date(2024, 1, 8), 'Cinéma', Decimal('12.30'), 'expense', '', ''),
+        ])
+
+    def test_invalid_rows_are_reported(self):
+        content = 'date,name,amount\n2024-01-02,Loyer,abc\n2024-13-02,Loyer,-700\n,,\n2024-01-03,Loyer,-700\n'
+        report = self.import_text('releve.csv', content, use_copy=False)
+        self.assertEqual((report['total_rows'], report['imported'], report['error_count']), (3, 1, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+
+    def test_duplicates_do_not_depend_on_batches(self):
+        # Une ligne identique en base couvre une seule des trois lignes identiques du fichier
+        existing = Transaction.objects.create(user=self.user, name='Boulangerie', amount=Decimal('4.50'), type='expense', date=date(2024, 1, 2))
+        content = 'date,name,amount\n' + '2024-01-02,Boulangerie,-4.50\n' * 3 + '2024-01-03,Boulangerie,-4.50\n'
+        for batch_size in (1, 2, 1000):
+            with self.subTest(batch_size=batch_size):
+                Transaction.objects.filter(user=self.user).exclude(pk=existing.pk).delete()
+                report = self.import_text('releve.csv', content, batch_size=batch_size, use_copy=False)
+                self.assertEqual((report['imported'], report['duplicates']), (3, 1))
+                # Réimport du même fichier : tout est doublon
+                report = self.import_text('releve.csv', content, batch_size=batch_size, use_copy=False)
+                self.assertEqual((report['imported'], report['duplicates']), (0, 4))
+
+    def test_state_does_not_grow_with_the_file(self):
+        Transaction.objects.create(user=self.user, name='Boulangerie', amount=Decimal('4.50'), type='expense', date=date(2024, 1, 2))
+        rows = [(1, {'date': '2024-01-02', 'name': 'Boulangerie', 'amount': '-4.50'})] + [
+            (line, {'date': f'2024-02-{line % 28 + 1:02d}', 'name': f'Achat {line}', 'amount': '-1.00'}) for line in range(2, 502)
+        ]
+        importer = importers.TransactionImporter(self.user, batch_size=50, use_copy=False)
+        report = importer.run(iter(rows))
+        self.assertEqual((report['imported'], report['duplicates']), (500, 1))
+        # Seule la ligne existante couverte est retenue, pas les 500 lignes insérées
+        self.assertEqual(importer.consumed, Counter({(date(2024, 1, 2), Decimal('4.50'), 'Boulangerie'): 1}))
+
+    def test_archived_transactions_are_duplicates(self):
+        self.import_text('releve.csv', CSV_STATEMENT, use_copy=False)
+        archive.archive_user(self.user.pk, date(2025, 1, 1))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 0)
+
+        report = self.import_text('releve.csv', CSV_STATEMENT, use_copy=False)
+        self.assertEqual((report['imported'], report['duplicates']), (0, 3))
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY FROM STDIN : PostgreSQL uniquement')
+    def test_copy_path(self):
+        report = self.import_text('releve.csv', CSV_STATEMENT, batch_size=2)
+        self.assertEqual((report['method'], report['imported']), ('copy', 3))
+        # Champs vides : chaînes vides (FORCE_NOT_NULL), pas NULL
+        self.assertEqual([row[4:] for row in self.imported()], [('Alimentation', ''), ('', ''), ('', '')])
+
+
+@override_settings(API_CACHE_TTL=300)
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached', 'cached@example.com', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        # JWT plutôt que force_authenticate : les vues async authentifient elles-mêmes
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def get(self, path, today):
+        with mock.patch('django.utils.timezone.localdate', return_value=today):
+            return self.client.get(path)
+
+    def test_day_dependent_views_vary_on_today(self):
+        for path in ('/api/summary/', '/api/summary/async/', '/api/budgets/'):
+            with self.subTest(path):
+                # summary/ et summary/async/ partagent leurs entrées
+                get_cache().clear()
+                first = self.get(path, date(2024, 1, 31))
+                self.assertEqual(self.get(path, date(2024, 1, 31))['ETag'], first['ETag'])
+                next_day = self.get(path, date(2024, 2, 1))
+                self.assertNotEqual(next_day['ETag'], first['ETag'])
+                self.assertEqual(next_day['X-Cache'], 'MISS')
+
+    @override_settings(SERVER_WORKERS=4)
+    def test_several_workers_require_a_shared_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_cache_backend()
+        with override_settings(API_CACHE_TTL=0):
+            with self.assertRaises(ImproperlyConfigured):
+                check_cache_backend()
+        with override_settings(API_CACHE_TTL=0, AUTH_USER_CACHE_TTL=0):
+            check_cache_backend()
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/monviso-test-cache'}}
+        with override_settings(CACHES=file_cache):
+            check_cache_backend()
+
+
+@override_settings(API_CACHE_TTL=0)
+class AsyncViewTests(TransactionTestCase):
+    """
+    Hors transaction de test : gather_queries lance réellement les lectures en parallèle,
+    chacune sur la connexion de son thread.
+    """
+
+    def setUp(self):
+        user, = DatasetGenerator(seed=21).create_users('async_', 1)
+        DatasetGenerator(seed=21).populate(user, 200)
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def query_metrics(self, view):
+        series = metrics.registry.snapshot()['histograms']['queries']
+        counts = next((counts for name, method, counts in series if (name, method) == (view, 'GET')), None)
+        # Nombre d'observations, nombre total de requêtes SQL
+        return (sum(counts[:-1]), counts[-1]) if counts else (0, 0)
+
+    def test_async_views_match_sync_views(self):
+        for sync_path, async_path in (('/api/dashboard/', '/api/dashboard/async/'), ('/api/summary/', '/api/summary/async/')):
+            with self.subTest(async_path):
+                self.assertFalse(async_views.in_transaction())
+                sync_view, async_view = resolve(sync_path).url_name, resolve(async_path).url_name
+                sync_before, async_before = self.query_metrics(sync_view), self.query_metrics(async_view)
+                # Même point de départ : utilisateur absent du cache d'authentification
+                user_cache.clear()
+                expected = self.client.get(sync_path)
+                user_cache.clear()
+                connects = metrics.registry.connects['default']
+                response = self.client.get(async_path)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+                self.assertEqual(response['ETag'], expected['ETag'])
+                # Lectures parallèles : connexions ouvertes par les threads du pool
+                self.assertGreater(metrics.registry.connects['default'], connects)
+                # Requêtes des threads du pool comptées dans les métriques de la vue, comme en synchrone
+                sync_queries = self.query_metrics(sync_view)[1] - sync_before[1]
+                observations, queries = self.query_metrics(async_view)
+                self.assertGreater(sync_queries, 0)
+                self.assertEqual((observations, queries), (async_before[0] + 1, async_before[1] + sync_queries))
+
+
+class MetricsAccessTests(TestCase):
+
+    def get(self, address, **headers):
+        return Client(REMOTE_ADDR=address).get('/api/metrics/', headers=headers).status_code
+
+    def bearer(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def test_denied_by_default_except_staff(self):
+        # Derrière le proxy, toutes les requêtes viennent de loopback
+        self.assertEqual(self.get('127.0.0.1'), 403)
+        self.assertEqual(self.get('::1'), 403)
+        self.assertEqual(self.get('203.0.113.7'), 403)
+        self.assertEqual(self.get('203.0.113.7', **self.bearer(User.objects.create_user('member'))), 403)
+        self.assertEqual(self.get('203.0.113.7', **self.bearer(User.objects.create_user('ops', is_staff=True))), 200)
+        self.assertEqual(self.get('203.0.113.7', Authorization='Bearer invalide'), 403)
+
+    @override_settings(METRICS_ALLOW_LOCAL=True)
+    def test_local_access_is_opt_in(self):
+        self.assertEqual(self.get('127.0.0.1'), 200)
+        self.assertEqual(self.get('::1'), 200)
+        self.assertEqual(self.get('203.0.113.7'), 403)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOW_LOCAL=True)
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.get('127.0.0.1'), 403)
+        self.assertEqual(self.get('203.0.113.7', Authorization='Bearer secret'), 200)
+
+
+class ForecastViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('forecast', 'forecast@example.com', 'password'))
+
+    def test_balance_must_be_finite(self):
+        for balance in ('NaN', 'sNaN', 'Infinity', '-inf', 'abc'):
+            with self.subTest(balance):
+                self.assertEqual(self.client.get('/api/forecast/', {'balance': balance}).status_code, 400)
+        self.assertEqual(self.client.get('/api/forecast/', {'balance': '1250.50'}).status_code, 200)
+
+
+@override_settings(API_CACHE_TTL=0)
+class HistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('history', 'history@example.com', 'password')
+        cls.category = Category.objects.create(user=cls.user, name='Courses', type='expense')
+        items = [
+            Transaction(user=cls.user, name='A', amount=Decimal('10.00'), type='expense', category='Courses', category_fk=cls.category, date=date(2026, 1, 5)),
+            # Libellé divergent mais même catégorie liée
+            Transaction(user=cls.user, name='B', amount=Decimal('5.00'), type='expense', category='Supermarché', category_fk=cls.category, date=date(2026, 1, 9)),
+            Transaction(user=cls.user, name='C', amount=Decimal('7.00'), type='expense', category='Divers', date=date(2026, 1, 12)),
+        ]
+        Transaction.objects.bulk_create(items)
+        rollups.rebuild(cls.user.pk)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_categories_are_grouped_by_category_id(self):
+        # Période hors mois entiers : calcul depuis les transactions, regroupées par category_fk
+        response = self.client.get('/api/history/', {'start': '2026-01-02', 'end': '2026-01-31'})
+        self.assertEqual(response.status_code, 200)
+        categories = [(row['category_id'], row['category'], row['count']) for row in response.json()['categories']]
+        self.assertEqual(categories, [(self.category.pk, 'Courses', 2), (None, 'Divers', 1)])
+
+        # Mois entier : lu depuis MonthlyRollup, rattaché à la catégorie par son nom
+        response = self.client.get('/api/history/', {'start': '2026-01-01', 'end': '2026-01-31'})
+        categories = {row['category']: row['category_id'] for row in response.json()['categories']}
+        self.assertEqual(categories['Courses'], self.category.pk)
+        self.assertIsNone(categories['Divers'])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('search', 'search@example.com', 'password')
+        items = [
+            Transaction(user=cls.user, name=f'Carrefour {i}', amount=Decimal('10.00'), type='expense', category='Courses', date=date(2026, 1, 1 + i % 3))
+            for i in range(12)
+        ]
+        items.append(Transaction(user=cls.user, name='Loyer', amount=Decimal('700.00'), type='expense', category='Logement', date=date(2026, 1, 2)))
+        Transaction.objects.bulk_create(items)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_do_not_overlap_or_skip(self):
+        seen, cursor = [], None
+        while True:
+            params = {'q': 'carr', 'limit': 5}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/transactions/search/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        expected = Transaction.objects.filter(user=self.user, name__startswith='Carrefour').values_list('id', flat=True)
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(set(seen), set(expected))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/transactions/search/', {'q': 'carr', 'cursor': 'invalide'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OnboardingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('onboarding', 'onboarding@example.com', 'password')
+        cls.own = Category.objects.create(user=cls.user, name='Logement', type='expense')
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        cls.foreign = Category.objects.create(user=other, name='Logement', type='expense')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, category):
+        return self.client.post('/api/onboarding/', {
+            'first_name': 'Onboarding', 'last_name': 'User', 'monthly_income': '2500.00',
+            'fixed_expenses': [{'name': 'Loyer', 'amount': '900.00', 'type': 'fixed', 'category': category}],
+        }, format='json')
+
+    def test_unknown_or_foreign_category_is_rejected(self):
+        for category in (self.foreign.pk, 999999):
+            with self.subTest(category=category):
+                response = self.submit(category)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('category', response.data)
+                self.assertFalse(Expense.objects.filter(user=self.user).exists())
+                self.assertFalse(UserProfile.objects.filter(user=self.user).exists())
+
+        self.assertEqual(self.submit(self.own.pk).status_code, 201)
+        self.assertEqual(Expense.objects.get(user=self.user).category, self.own)
+
+    def test_category_is_checked_by_is_valid(self):
+        request = mock.Mock(user=self.user)
+        serializer = OnboardingDataSerializer(data={
+            'first_name': 'Onboarding', 'last_name': 'User', 'monthly_income': '2500.00',
+            'variable_expenses': [{'name': 'Courses', 'amount': '300.00', 'type': 'variable', 'category': self.foreign.pk}],
+        }, context={'request': request})
+        with mock.patch('api.serializers.db_transaction.atomic') as atomic:
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('category', serializer.errors)
+        atomic.assert_not_called()
+
+    def test_resubmission_invalidates_the_cache_once(self):
+        response = self.client.post('/api/onboarding/', {
+            'first_name': 'Onboarding', 'last_name': 'User', 'monthly_income': '2500.00',
+            'incomes': [{'name': f'Revenu {i}', 'amount': '10.00', 'type': 'other'} for i in range(20)],
+            'fixed_expenses': [{'name': f'Charge {i}', 'amount': '10.00', 'type': 'fixed'} for i in range(20)],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        before = cache_stats['invalidations']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit(self.own.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Income.objects.filter(user=self.user).exists())
+        self.assertEqual(list(Expense.objects.filter(user=self.user).values_list('name', flat=True)), ['Loyer'])
+        # Lignes supprimées sans signal : le bump explicite et le post_save du profil
+        self.assertEqual(cache_stats['invalidations'] - before, 2)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('keyset', 'keyset@example.com', 'password')
+        Transaction.objects.bulk_create([
+            Transaction(user=cls.user, name=f'T{i}', amount=Decimal('1.00'), type='expense', category='Divers', date=date(2026, 3, 1 + i % 2))
+            for i in range(11)
+        ])
+        # Mêmes date et created_at pour toutes les lignes d'un jour : seul l'id départage
+        Transaction.objects.filter(user=cls.user).update(created_at=timezone.now())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_are_stable_across_equal_dates(self):
+        expected = list(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', '-id').values_list('id', flat=True)
+        )
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get('/api/transactions/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+            # Ligne insérée entre deux pages avec la même date : aucune ligne déjà servie ne revient
+            Transaction.objects.create(user=self.user, name='Nouvelle', amount=Decimal('1.00'), type='expense', category='Divers', date=date(2026, 3, 2))
+        self.assertEqual(seen, expected)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('export', 'export@example.com', 'password')
+        for day, name in ((date(2020, 5, 1), 'Ancienne'), (date(2026, 2, 3), 'Loyer'), (date(2026, 2, 3), 'Café, "serré"'), (date(2026, 1, 9), 'Salaire')):
+            Transaction.objects.create(
+                user=cls.user, name=name, amount=Decimal('12.50'), type='income' if name == 'Salaire' else 'expense',
+                category='Divers', payment_method='card', date=day,
+            )
+        # La plus ancienne part en archive : l'export la fusionne à sa place
+        archive.archive_user(cls.user.pk, date(2021, 1, 1))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, output):
+        response = self.client.get('/api/transactions/export/', {'output': output})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_and_ndjson_content_and_order(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], list(exporters.EXPORT_FIELDS))
+        # Date puis création décroissantes, ligne archivée comprise ; guillemets et virgules échappés
+        self.assertEqual([row[2] for row in rows[1:]], ['Café, "serré"', 'Loyer', 'Salaire', 'Ancienne'])
+        self.assertEqual(rows[1][1:8], ['2026-02-03', 'Café, "serré"', '12.50', 'expense', 'Divers', 'card', 'unique'])
+
+        lines = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual([line['id'] for line in lines], [int(row[0]) for row in rows[1:]])
+        self.assertEqual(set(lines[-1]), set(exporters.EXPORT_FIELDS))
+        self.assertEqual((lines[-1]['name'], lines[-1]['amount'], lines[-1]['date']), ('Ancienne', '12.50', '2020-05-01'))
+
+
+class TransactionBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('batch', 'batch@example.com', 'password')
+        cls.kept = Transaction.objects.create(user=cls.user, name='Loyer', amount=Decimal('700.00'), type='expense', category='Logement', date=date(2026, 2, 1))
+        cls.removed = Transaction.objects.create(user=cls.user, name='Café', amount=Decimal('3.00'), type='expense', category='Divers', date=date(2026, 2, 2))
+        other = User.objects.create_user('batch_other', 'batch_other@example.com', 'password')
+        cls.foreign = Transaction.objects.create(user=other, name='Autre', amount=Decimal('1.00'), type='expense', category='Divers', date=date(2026, 2, 3))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def snapshot(self):
+        return (
+            list(Transaction.objects.filter(user=self.user).order_by('pk').values_list('pk', 'name', 'amount')),
+            list(MonthlyRollup.objects.filter(user=self.user).order_by('pk').values_list('category', 'total', 'count')),
+        )
+
+    def operations(self, *extra):
+        return {'operations': [
+            {'op': 'create', 'data': {'name': 'Courses', 'amount': '42.00', 'type': 'expense', 'category': 'Courses', 'date': '2026-02-04'}},
+            {'op': 'update', 'id': self.kept.pk, 'data': {'amount': '750.00'}},
+            {'op': 'delete', 'id': self.removed.pk},
+            *extra,
+        ]}
+
+    def test_one_invalid_operation_applies_nothing(self):
+        before = self.snapshot()
+        for invalid in ({'op': 'delete', 'id': self.foreign.pk}, {'op': 'create', 'data': {'name': 'Sans montant'}}):
+            with self.subTest(invalid=invalid):
+                response = self.client.post('/api/transactions/batch/', self.operations(invalid), format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.data['applied'])
+                self.assertEqual([error['index'] for error in response.data['errors']], [3])
+                self.assertEqual(self.snapshot(), before)
+        self.assertTrue(Transaction.objects.filter(pk=self.foreign.pk).exists())
+
+    def test_failure_while_writing_rolls_back(self):
+        before = self.snapshot()
+        with mock.patch('api.views.rollups.apply_deltas', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/api/transactions/batch/', self.operations(), format='json')
+        self.assertEqual(self.snapshot(), before)
+
+        response = self.client.post('/api/transactions/batch/', self.operations(), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['applied'])
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'updated', 'deleted'])
+        self.assertNotEqual(self.snapshot(), before)
+
+    def test_deletes_invalidate_the_cache_once(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, name=f'T{i}', amount=Decimal('1.00'), type='expense', category='Divers', date=date(2026, 2, 5))
+            for i in range(150)
+        ])
+        rollups.rebuild(self.user.pk)
+        ids = list(Transaction.objects.filter(user=self.user, name__startswith='T').values_list('pk', flat=True))
+        before = cache_stats['invalidations']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/transactions/batch/', {'operations': [{'op': 'delete', 'id': pk} for pk in ids]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache_stats['invalidations'] - before, 1)
+        self.assertFalse(Transaction.objects.filter(pk__in=ids).exists())
+        self.assertEqual(rollups.current_rollups(self.user.pk), rollups.expected_rollups(self.user.pk))
+
+
+class LoginTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('login', 'login@example.com', 'password')
+
+    def login(self, identifier, password):
+        return APIClient().post('/api/auth/login/', {'email': identifier, 'password': password}, format='json')
+
+    def test_valid_credentials_by_email_or_username(self):
+        for identifier in ('login@example.com', 'login'):
+            with self.subTest(identifier=identifier):
+                response = self.login(identifier, 'password')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['user']['id'], self.user.pk)
+                self.assertIn('access', response.data)
+
+    def test_bad_password_unknown_user_and_inactive_user_are_refused(self):
+        User.objects.create_user('inactive', 'inactive@example.com', 'password', is_active=False)
+        for identifier, password in (('login@example.com', 'wrong'), ('unknown@example.com', 'password'), ('inactive@example.com', 'password')):
+            with self.subTest(identifier=identifier):
+                response = self.login(identifier, password)
+                self.assertEqual(response.status_code, 401)
+                self.assertNotIn('access', response.data)
+
+
+@override_settings(API_CACHE_TTL=0)
+class UserCacheTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user('jwt', 'jwt@example.com', 'password')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_user_save_evicts_the_cached_user(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        self.assertIsNotNone(user_cache.get(self.user.pk))
+
+        self.user.first_name = 'Renommé'
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_cache.get(self.user.pk).first_name, 'Renommé')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def test_deactivation_in_another_worker_is_seen(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        # Autre worker : écriture sans signal local, seule la version partagée change au commit
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            bump_auth_version(self.user.pk)
+        self.assertIsNotNone(user_cache.get(self.user.pk))
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def test_tokens_without_version_claim_need_a_transition_window(self):
+        token = RefreshToken.for_user(self.user).access_token
+        del token[jwt_settings.REVOKE_TOKEN_CLAIM]
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+        with override_settings(JWT_UNVERSIONED_TOKENS_UNTIL='2999-01-01T00:00:00+00:00'):
+            self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        with override_settings(JWT_UNVERSIONED_TOKENS_UNTIL='2000-01-01T00:00:00+00:00'):
+            self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def test_password_change_revokes_previous_tokens(self):
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        self.user.set_password('nouveau')
+        self.user.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+
+
+@override_settings(API_CACHE_TTL=0)
+class ReportingTests(TestCase):
+    TODAY = date(2026, 2, 15)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reporting', 'reporting@example.com', 'password')
+        UserProfile.objects.create(user=cls.user, monthly_income=Decimal('2500.00'), onboarding_completed=True)
+        Income.objects.create(user=cls.user, name='Salaire', amount=Decimal('2000.00'), type='salary')
+        Expense.objects.create(user=cls.user, name='Loyer', amount=Decimal('800.00'), type='fixed')
+        Expense.objects.create(user=cls.user, name='Sorties', amount=Decimal('200.00'), type='variable')
+        Category.objects.create(user=cls.user, name='Courses', type='expense', monthly_budget=Decimal('300.00'))
+        Transaction.objects.bulk_create([
+            Transaction(user=cls.user, name=name, amount=Decimal(amount), type=kind, category=category, date=day)
+            for day, name, amount, kind, category in (
+                (date(2025, 12, 15), 'Marché', '50.00', 'expense', 'Courses'),
+                (date(2026, 1, 5), 'Épicerie', '10.00', 'expense', 'Courses'),
+                (date(2026, 1, 20), 'Prime', '100.00', 'income', 'Salaire'),
+                (date(2026, 2, 3), 'Boulangerie', '4.50', 'expense', 'Courses'),
+                (date(2026, 2, 9), 'Cinéma', '6.00', 'expense', 'Divers'),
+            )
+        ])
+        rollups.rebuild(cls.user.pk)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, params=None):
+        with mock.patch('django.utils.timezone.localdate', return_value=self.TODAY):
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_history_monthly_totals(self):
+        def months(data):
+            return [(row['month'], row['income'], row['expenses'], row['count']) for row in data['months']]
+
+        # Mois entiers (MonthlyRollup)
+        data = self.get('/api/history/', {'start': '2025-12-01', 'end': '2026-02-28'})
+        self.assertEqual(months(data), [('2025-12', 0, 50, 1), ('2026-01', 100, 10, 2), ('2026-02', 0, 10.5, 2)])
+        self.assertEqual(data['totals'], {'income': 100, 'expenses': 70.5, 'savings': 29.5})
+        # Début en cours de mois : agrégation depuis les transactions, mêmes totaux par mois
+        data = self.get('/api/history/', {'start': '2026-01-05', 'end': '2026-02-28'})
+        self.assertEqual(months(data), [('2026-01', 100, 10, 2), ('2026-02', 0, 10.5, 2)])
+
+        # Une écriture par l'API est reflétée par les rollups
+        response = self.client.post('/api/transactions/', {
+            'name': 'Primeur', 'amount': '3.50', 'type': 'expense', 'category': 'Courses', 'date': '2026-02-10',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        data = self.get('/api/history/', {'start': '2026-02-01', 'end': '2026-02-28'})
+        self.assertEqual(months(data), [('2026-02', 0, 14, 3)])
+
+    def test_financial_data_totals(self):
+        data = self.get('/api/dashboard/')
+        self.assertEqual(self.get('/api/financial-data/'), data)
+        # Onboarding (2000 / 800 / 200) + transactions (100 / 70.50)
+        self.assertEqual(
+            (data['total_income'], data['total_fixed_expenses'], data['total_variable_expenses'], data['total_expenses'], data['remaining_budget']),
+            (2100, 800, 270.5, 1070.5, 1029.5),
+        )
+        self.assertEqual([row['name'] for row in data['transactions']], ['Cinéma', 'Boulangerie', 'Prime', 'Épicerie', 'Marché'])
+
+        # Les transactions archivées restent comptées dans les totaux
+        archive.archive_user(self.user.pk, date(2026, 1, 1))
+        archived = self.get('/api/dashboard/')
+        self.assertEqual((archived['total_income'], archived['total_expenses']), (2100, 1070.5))
+        self.assertNotIn('Marché', [row['name'] for row in archived['transactions']])
+
+    def test_summary_from_rollups(self):
+        data = self.get('/api/summary/')
+        self.assertEqual(data['month'], '2026-02')
+        self.assertEqual(data['current_month'], {'income': 0, 'expenses': 10.5, 'savings': -10.5})
+        # Cumul annuel : décembre 2025 exclu
+        self.assertEqual(data['year_to_date'], {'income': 100, 'expenses': 20.5, 'savings': 79.5})
+        self.assertEqual(data['budget'], {'monthly_budget': 300, 'spent': 10.5, 'remaining': 289.5})
+        self.assertEqual(data['top_categories'], [
+            {'category': 'Divers', 'total': 6, 'monthly_budget': None},
+            {'category': 'Courses', 'total': 4.5, 'monthly_budget': 300},
+        ])
+
+
+class TransactionIndexTests(TestCase):
+
+    def test_model_indexes_exist_in_database(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Transaction._meta.db_table)
+        for index in Transaction._meta.indexes:
+            with self.subTest(index.name):
+                self.assertIn(index.name, constraints)
+                columns = [Transaction._meta.get_field(field.lstrip('-')).column for field in index.fields]
+                self.assertEqual(constraints[index.name]['columns'], columns)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plan de requête SQLite')
+    def test_transaction_page_is_read_in_index_order(self):
+        queryset = Transaction.objects.filter(user_id=1, date__lte=date(2026, 1, 1)).order_by(*KEYSET_ORDERING)[:51]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('txn_user_date_created_idx', plan)
+        # Ni tri temporaire ni lecture de toute la table
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -1,9 +1,11 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import LoginView, RegisterView, TestConnectionView, ProfileView, OnboardingView, OnboardingStatusView, FinancialDataView, TransactionListCreateView, TransactionDetailView, CategoryListCreateView, CategoryDetailView
+from . import async_views
+from .views import MetricsView, LoginView, RegisterView, TestConnectionView, ProfileView, OnboardingView, OnboardingStatusView, FinancialDataView, SummaryView, ForecastView, BudgetView, TransactionListCreateView, TransactionSearchView, TransactionImportView, TransactionExportView, TransactionBatchView, TransactionDetailView, HistoryView, CategoryListCreateView, CategoryDetailView
 
 urlpatterns = [
     path('test/', TestConnectionView.as_view(), name='test_connection'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/register/', RegisterView.as_view(), name='register'),
@@ -12,8 +14,19 @@ urlpatterns = [
     path('onboarding/status/', OnboardingStatusView.as_view(), name='onboarding_status'),
     path('dashboard/', FinancialDataView.as_view(), name='dashboard_data'),
     path('financial-data/', FinancialDataView.as_view(), name='financial_data'),
+    path('summary/', SummaryView.as_view(), name='summary'),
+    # Variantes async (ASGI) : lectures SQL indépendantes lancées en parallèle
+    path('dashboard/async/', async_views.financial_data, name='dashboard_data_async'),
+    path('summary/async/', async_views.summary, name='summary_async'),
+    path('forecast/', ForecastView.as_view(), name='forecast'),
+    path('budgets/', BudgetView.as_view(), name='budgets'),
     path('transactions/', TransactionListCreateView.as_view(), name='transactions'),
+    path('transactions/search/', TransactionSearchView.as_view(), name='transaction_search'),
+    path('transactions/import/', TransactionImportView.as_view(), name='transaction_import'),
+    path('transactions/export/', TransactionExportView.as_view(), name='transaction_export'),
+    path('transactions/batch/', TransactionBatchView.as_view(), name='transaction_batch'),
     path('transactions/<int:pk>/', TransactionDetailView.as_view(), name='transaction_detail'),
+    path('history/', HistoryView.as_view(), name='history'),
     path('categories/', CategoryListCreateView.as_view(), name='categories'),
     path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category_detail'),
 ]
@@ -1,15 +1,159 @@
+import copy
+import ipaddress
+import itertools
+import logging
+from collections import OrderedDict
+from decimal import Decimal
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.contrib.auth.models import User
-from rest_framework import status, permissions
+from django.db import transaction as db_transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Abs, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import exceptions, status, permissions
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
+from . import dashboard, exporters, importers, metrics, search
+from .dashboard import UNCATEGORIZED_LABEL
+from .authentication import authenticate_credentials
+from .cache import bump_data_version, cache_per_user
+from .db.router import read_alias, replica_reads
+from .pagination import paginate_keyset, parse_limit
 from .serializers import OnboardingDataSerializer, UserProfileSerializer, IncomeSerializer, ExpenseSerializer, SavingsGoalSerializer, TransactionSerializer, CategorySerializer
-from budget.models import UserProfile, Income, Expense, SavingsGoal, Transaction, Category
+from budget import archive, budgets, forecast, rollups
+from budget.categories import CategoryIndex
+from budget.deletion import delete_rows
+from budget.models import UserProfile, Income, Expense, SavingsGoal, Transaction, Category, MonthlyRollup
 
 # Create your views here.
 
+logger = logging.getLogger(__name__)
+
+def parse_date_range(params):
+    """Lit les paramètres `start` / `end` (AAAA-MM-JJ) et lève ValueError s'ils sont invalides"""
+    dates = []
+    for key in ('start', 'end'):
+        value = params.get(key)
+        parsed = parse_date(value) if value else None
+        if value and parsed is None:
+            raise ValueError(f"Date invalide pour '{key}': {value}")
+        dates.append(parsed)
+    return tuple(dates)
+
+def filter_transactions(queryset, params):
+    """Applique les filtres communs (type, category, category_id, payment_method, start, end) à un queryset de transactions"""
+    start_date, end_date = parse_date_range(params)
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+
+    category_ids = [int(value) for value in params.getlist('category_id') if value.isdigit()]
+    if category_ids:
+        queryset = queryset.filter(category_fk__in=category_ids)
+
+    categories = [name for name in params.getlist('category') if name]
+    if categories:
+        category_filter = Q(category__in=categories)
+        if UNCATEGORIZED_LABEL in categories:
+            category_filter |= Q(category='')
+        queryset = queryset.filter(category_filter)
+
+    for field in ('type', 'payment_method'):
+        value = params.get(field)
+        if value:
+            queryset = queryset.filter(**{field: value})
+    return queryset
+
+def archived_filter(params):
+    """Équivalent de filter_transactions (hors dates) pour les lignes archivées de budget.archive"""
+    category_ids = {int(value) for value in params.getlist('category_id') if value.isdigit()}
+    categories = {name for name in params.getlist('category') if name}
+    if UNCATEGORIZED_LABEL in categories:
+        categories.add('')
+    exact = {field: params.get(field) for field in ('type', 'payment_method') if params.get(field)}
+
+    def matches(row):
+        return (
+            (not category_ids or row['category_fk_id'] in category_ids)
+            and (not categories or row['category'] in categories)
+            and all(row[field] == value for field, value in exact.items())
+        )
+    return matches
+
+def group_history(rows, categories):
+    """
+    Regroupe les lignes (mois, type, category_fk, libellé, total, count) par catégorie liée : le
+    nom affiché est celui de la Category, le libellé ne distingue que les transactions non rattachées.
+    """
+    groups = {}
+    for row in rows:
+        category_id = row['category_fk'] if row['category_fk'] in categories.names else None
+        key = (row['month'], row['type'], category_id, '' if category_id else row['category'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'month': row['month'],
+                'type': row['type'],
+                'category_id': category_id,
+                'category': categories.names[category_id] if category_id else row['category'],
+                'total': Decimal('0'),
+                'count': 0,
+            }
+        group['total'] += row['total']
+        group['count'] += row['count']
+    return sorted(groups.values(), key=lambda row: (row['month'], row['type'], row['category']))
+
+def archived_history(rows):
+    """Transactions archivées au format des lignes de group_history"""
+    for item in rows:
+        yield {
+            'month': rollups.month_start(item['date']), 'type': item['type'], 'category_fk': item['category_fk_id'],
+            'category': item['category'], 'total': abs(item['amount']), 'count': 1,
+        }
+
+class MetricsView(APIView):
+    """
+    Endpoint d'exposition des métriques au format texte Prometheus
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """
+        Métriques de tous les workers : avec METRICS_TOKEN, réservées au porteur du jeton
+        (Authorization: Bearer) ; sans jeton, aux comptes staff, et aux appels locaux (loopback)
+        si METRICS_ALLOW_LOCAL : derrière le proxy nginx, toutes les requêtes arrivent de 127.0.0.1.
+        """
+        if not self.allowed(request):
+            return Response({'error': 'Accès refusé'}, status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+    def allowed(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if token:
+            return request.META.get('HTTP_AUTHORIZATION') == f'Bearer {token}'
+        if getattr(settings, 'METRICS_ALLOW_LOCAL', False):
+            try:
+                if ipaddress.ip_address(request.META.get('REMOTE_ADDR', '')).is_loopback:
+                    return True
+            except ValueError:
+                pass
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            try:
+                result = authenticator().authenticate(request)
+            except exceptions.APIException:
+                return False
+            if result is not None:
+                return result[0].is_staff
+        return False
+
 class TestConnectionView(APIView):
     """
     Endpoint simple pour tester la connexion API
@@ -49,31 +193,11 @@ class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
-        email_or_username = request.data.get('email')
-        password = request.data.get('password')
-        
-        print(f" [DEBUG] LoginView - Données reçues: email={email_or_username}, password={'***' if password else 'None'}")
-        
-        # Chercher l'utilisateur par email OU par username
-        user = User.objects.filter(email=email_or_username).first()
-        print(f" [DEBUG] Recherche par email '{email_or_username}': {'Trouvé' if user else 'Non trouvé'}")
-        
-        if not user:
-            user = User.objects.filter(username=email_or_username).first()
-            print(f" [DEBUG] Recherche par username '{email_or_username}': {'Trouvé' if user else 'Non trouvé'}")
-        
-        if user:
-            print(f" [DEBUG] Utilisateur trouvé: {user.username} ({user.email})")
-            password_valid = user.check_password(password)
-            print(f" [DEBUG] Mot de passe valide: {password_valid}")
-        else:
-            print(" [DEBUG] Aucun utilisateur trouvé")
-        
-        if user is None or not user.check_password(password):
-            print(" [DEBUG] Authentification échouée - Retour 401")
+        """Connexion par email ou nom d'utilisateur : une requête, un seul hachage du mot de passe"""
+        user = authenticate_credentials(request.data.get('email'), request.data.get('password'))
+        if user is None:
             return Response({'error': 'Identifiants incorrects'}, status=status.HTTP_401_UNAUTHORIZED)
-        
-        print(" [DEBUG] Authentification réussie - Génération des tokens")
+
         refresh = RefreshToken.for_user(user)
         
         return Response({
@@ -145,13 +269,12 @@ class OnboardingView(APIView):
     
     def post(self, request):
         """Complete user onboarding with all financial data"""
-        print(f"[ONBOARDING] User {request.user.username} submitting onboarding data")
-        print(f"[ONBOARDING] Data received: {request.data}")
-        
+        logger.debug('event=onboarding.received user=%s data=%s', request.user.pk, request.data)
+
         serializer = OnboardingDataSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             result = serializer.save()
-            print(f"[ONBOARDING] Onboarding completed successfully for user {request.user.username}")
+            logger.info('event=onboarding.completed user=%s', request.user.pk)
             return Response({
                 'message': result['message'],
                 'onboarding_completed': True,
@@ -164,7 +287,7 @@ class OnboardingView(APIView):
                 }
             }, status=status.HTTP_201_CREATED)
         else:
-            print(f"[ONBOARDING] Validation errors: {serializer.errors}")
+            logger.info('event=onboarding.invalid user=%s errors=%s', request.user.pk, serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class OnboardingStatusView(APIView):
@@ -212,111 +335,80 @@ class FinancialDataView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @cache_per_user
+    @replica_reads
     def get(self, request):
         user = request.user
-        try:
-            profile = UserProfile.objects.get(user=user)
-            
-            # Récupérer les revenus d'onboarding
-            incomes = Income.objects.filter(user=user)
-            total_income_onboarding = sum(income.amount for income in incomes)
-            
-            # Récupérer les dépenses fixes d'onboarding
-            fixed_expenses = Expense.objects.filter(user=user, type='fixed')
-            total_fixed_expenses_onboarding = sum(expense.amount for expense in fixed_expenses)
-            
-            # Récupérer les dépenses variables d'onboarding
-            variable_expenses = Expense.objects.filter(user=user, type='variable')
-            total_variable_expenses_onboarding = sum(expense.amount for expense in variable_expenses)
-            
-            # Récupérer les transactions
-            transactions = Transaction.objects.filter(user=user)
-            
-            # Calculer les revenus et dépenses des transactions
-            transactions_income = sum(abs(t.amount) for t in transactions if t.type == 'income')
-            transactions_expenses = sum(abs(t.amount) for t in transactions if t.type == 'expense')
-            
-            # Calculer les totaux en incluant les transactions
-            total_income = total_income_onboarding + transactions_income
-            total_fixed_expenses = total_fixed_expenses_onboarding
-            total_variable_expenses = total_variable_expenses_onboarding + transactions_expenses
-            
-            total_expenses = total_fixed_expenses + total_variable_expenses
-            remaining_budget = total_income - total_expenses
-            
-            # Récupérer les objectifs d'épargne
-            savings_goals = SavingsGoal.objects.filter(user=user)
-            
-            return Response({
-                'monthly_income': profile.monthly_income,
-                'total_income': total_income,
-                'total_expenses': total_expenses,
-                'total_fixed_expenses': total_fixed_expenses,
-                'total_variable_expenses': total_variable_expenses,
-                'remaining_budget': remaining_budget,
-                'incomes': [{
-                    'id': income.id,
-                    'name': income.name,
-                    'amount': income.amount,
-                    'type': income.type,
-                    'frequency': income.frequency,
-                    'is_primary': income.is_primary
-                } for income in incomes],
-                'fixed_expenses': [{
-                    'id': expense.id,
-                    'name': expense.name,
-                    'amount': expense.amount,
-                    'frequency': expense.frequency,
-                    'type': expense.type,
-                    'category_id': expense.category.id if expense.category else None,
-                    'category_name': expense.category.name if expense.category else None
-                } for expense in fixed_expenses],
-                'variable_expenses': [{
-                    'id': expense.id,
-                    'name': expense.name,
-                    'amount': expense.amount,
-                    'frequency': expense.frequency,
-                    'type': expense.type,
-                    'category_id': expense.category.id if expense.category else None,
-                    'category_name': expense.category.name if expense.category else None
-                } for expense in variable_expenses],
-                'transactions': [{
-                    'id': transaction.id,
-                    'name': transaction.name,
-                    'amount': abs(transaction.amount),
-                    'type': transaction.type,
-                    'category': transaction.category,
-                    'date': transaction.date,
-                    'payment_method': transaction.payment_method,
-                    'frequency': transaction.frequency
-                } for transaction in transactions],
-                'savings_goals': [{
-                    'id': goal.id,
-                    'name': goal.name,
-                    'target_amount': goal.target_amount,
-                    'current_amount': goal.current_amount,
-                    'target_date': goal.target_date,
-                    'type': goal.type,
-                    'priority': goal.priority
-                } for goal in savings_goals]
-            })
-            
-        except UserProfile.DoesNotExist:
+        profile = dashboard.load_profile(user.pk)
+        if profile is None:
             # Retourner des données vides si l'utilisateur n'a pas encore complété l'onboarding
-            return Response({
-                'monthly_income': 0,
-                'total_income': 0,
-                'total_expenses': 0,
-                'total_fixed_expenses': 0,
-                'total_variable_expenses': 0,
-                'remaining_budget': 0,
-                'incomes': [],
-                'fixed_expenses': [],
-                'variable_expenses': [],
-                'transactions': [],
-                'savings_goals': [],
-                'needs_onboarding': True
-            })
+            return Response(dashboard.EMPTY_FINANCIAL_DATA)
+        results = [query(user.pk) for query in dashboard.FINANCIAL_QUERIES]
+        return Response(dashboard.build_financial_data(profile, *results))
+
+class SummaryView(APIView):
+    """
+    Endpoint de synthèse léger : mois en cours, cumul annuel, budget restant et catégories principales
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @cache_per_user(vary_on_today=True)
+    @replica_reads
+    def get(self, request):
+        """Résumé calculé depuis MonthlyRollup (au plus 12 mois de lignes pré-agrégées)"""
+        today = timezone.localdate()
+        results = [query(request.user.pk, today) for query in dashboard.SUMMARY_QUERIES]
+        return Response(dashboard.build_summary(today, *results))
+
+class ForecastView(APIView):
+    """
+    Endpoint de prévision de trésorerie à partir des éléments récurrents
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @replica_reads
+    def get(self, request):
+        """Solde projeté ; options : months (1-120, défaut 12), granularity=monthly|daily, balance (solde de départ)"""
+        params = request.query_params
+        granularity = params.get('granularity', 'monthly')
+        if granularity not in forecast.GRANULARITIES:
+            return Response({'error': 'Granularité invalide (monthly, daily)'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            months = int(params.get('months', 12))
+            start_balance = Decimal(params['balance']) if params.get('balance') else None
+        except (ValueError, ArithmeticError):
+            return Response({'error': 'Paramètres months ou balance invalides'}, status=status.HTTP_400_BAD_REQUEST)
+        if start_balance is not None and not start_balance.is_finite():
+            return Response({'error': 'Le solde de départ doit être un nombre fini'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= months <= forecast.MAX_HORIZON_MONTHS:
+            return Response({'error': f'months doit être compris entre 1 et {forecast.MAX_HORIZON_MONTHS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(forecast.forecast(
+            request.user, timezone.localdate(), months=months, granularity=granularity, start_balance=start_balance
+        ))
+
+class BudgetView(APIView):
+    """
+    Endpoint de suivi budget / réalisé par catégorie de dépense et par mois
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @cache_per_user(vary_on_today=True)
+    @replica_reads
+    def get(self, request):
+        """Budget, dépensé, restant et dépassement par mois ; options : start / end (AAAA-MM, défaut mois en cours)"""
+        current_month = timezone.localdate().replace(day=1)
+        try:
+            start = budgets.parse_month(request.query_params['start']) if request.query_params.get('start') else current_month
+            end = budgets.parse_month(request.query_params['end']) if request.query_params.get('end') else max(start, current_month)
+        except ValueError:
+            return Response({'error': 'Format de mois invalide (AAAA-MM attendu)'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start doit précéder end'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end.year - start.year) * 12 + end.month - start.month >= budgets.MAX_MONTHS:
+            return Response({'error': f'Plage limitée à {budgets.MAX_MONTHS} mois'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(budgets.budget_vs_actual(request.user, start, end, UNCATEGORIZED_LABEL))
 
 class TransactionListCreateView(APIView):
     """
@@ -324,23 +416,342 @@ class TransactionListCreateView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @cache_per_user
     def get(self, request):
-        """Récupérer toutes les transactions de l'utilisateur"""
-        transactions = Transaction.objects.filter(user=request.user)
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response(serializer.data)
+        """
+        Récupérer les transactions de l'utilisateur, paginées par curseur (?cursor=, ?limit=).
+        La liste complète non paginée reste disponible avec ?all=true.
+        """
+        try:
+            transactions = filter_transactions(Transaction.objects.filter(user=request.user), request.query_params)
+        except ValueError:
+            return Response({'error': 'Format de date invalide (AAAA-MM-JJ attendu)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('all') in ('1', 'true'):
+            serializer = TransactionSerializer(transactions, many=True)
+            return Response(serializer.data)
+
+        try:
+            limit = parse_limit(request.query_params.get('limit'))
+            rows, next_cursor = paginate_keyset(transactions, request.query_params.get('cursor'), limit)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': TransactionSerializer(rows, many=True).data,
+            'next_cursor': next_cursor,
+            'limit': limit,
+        })
     
     def post(self, request):
         """Créer une nouvelle transaction"""
-        print(f"[TRANSACTION] Données reçues: {request.data}")
+        logger.debug('event=transaction.received user=%s data=%s', request.user.pk, request.data)
         serializer = TransactionSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             transaction = serializer.save()
-            print(f"[TRANSACTION] Transaction créée avec succès: {transaction}")
+            logger.info('event=transaction.created user=%s transaction=%s', request.user.pk, transaction.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        print(f"[TRANSACTION] Erreurs de validation: {serializer.errors}")
+        logger.info('event=transaction.invalid user=%s errors=%s', request.user.pk, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class HistoryView(APIView):
+    """
+    Endpoint pour l'historique agrégé des transactions par mois et par catégorie
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @cache_per_user
+    @replica_reads
+    def get(self, request):
+        """
+        Totaux revenus / dépenses / épargne par mois et par catégorie.
+        Lus depuis MonthlyRollup quand les filtres le permettent (mois entiers, pas de moyen de paiement ni de category_id),
+        sinon calculés en base (GROUP BY mois, type, catégorie). Regroupement par catégorie liée (category_id).
+        """
+        params = request.query_params
+        try:
+            start_date, end_date = parse_date_range(params)
+        except ValueError:
+            return Response({'error': 'Format de date invalide (AAAA-MM-JJ attendu)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollup_condition = None
+        if not params.get('payment_method') and not params.get('category_id'):
+            categories = [name for name in params.getlist('category') if name]
+            rollup_condition = rollups.rollup_filter(start_date, end_date, categories, params.get('type'), UNCATEGORIZED_LABEL)
+
+        categories = CategoryIndex.for_user(Category, request.user.pk)
+        if rollup_condition is not None:
+            # MonthlyRollup est indexé par libellé : chaque ligne est rattachée à sa catégorie (nom, type)
+            rows = (
+                {**row, 'category_fk': categories.resolve(row['category'], row['type'])}
+                for row in MonthlyRollup.objects
+                .filter(rollup_condition, user=request.user)
+                .values('month', 'type', 'category', 'total', 'count')
+            )
+        else:
+            rows = (
+                filter_transactions(Transaction.objects.filter(user=request.user), params)
+                .annotate(month=TruncMonth('date'))
+                .values('month', 'type', 'category_fk', 'category')
+                .annotate(total=Sum(Abs('amount')), count=Count('id'))
+                .order_by()
+            )
+            # Les rollups couvrent les transactions archivées ; ici il faut relire les archives
+            matches = archived_filter(params)
+            rows = itertools.chain(rows, archived_history(
+                row for row in archive.archived_rows(request.user.pk, start_date, end_date) if matches(row)
+            ))
+        rows = group_history(rows, categories)
+
+        months = OrderedDict()
+        by_category = []
+        for row in rows:
+            month = row['month'].strftime('%Y-%m')
+            entry = months.setdefault(month, {
+                'month': month,
+                'income': Decimal('0'),
+                'expenses': Decimal('0'),
+                'savings': Decimal('0'),
+                'count': 0,
+            })
+            if row['type'] == 'income':
+                entry['income'] += row['total']
+            else:
+                entry['expenses'] += row['total']
+            entry['count'] += row['count']
+            by_category.append({
+                'month': month,
+                'type': row['type'],
+                'category_id': row['category_id'],
+                'category': row['category'] or UNCATEGORIZED_LABEL,
+                'total': row['total'],
+                'count': row['count'],
+            })
+
+        total_income = Decimal('0')
+        total_expenses = Decimal('0')
+        for entry in months.values():
+            entry['savings'] = entry['income'] - entry['expenses']
+            total_income += entry['income']
+            total_expenses += entry['expenses']
+
+        return Response({
+            'start': start_date,
+            'end': end_date,
+            'months': list(months.values()),
+            'categories': by_category,
+            'totals': {
+                'income': total_income,
+                'expenses': total_expenses,
+                'savings': total_income - total_expenses,
+            },
+        })
+
+class TransactionSearchView(APIView):
+    """
+    Endpoint de recherche plein texte / approchée dans les transactions
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @cache_per_user
+    def get(self, request):
+        """Résultats classés par pertinence ; q requis, cursor / limit, filtres communs (start, end, type, category...)"""
+        params = request.query_params
+        text = params.get('q', '').strip()
+        if not search.tokenize(text):
+            return Response({'error': 'Paramètre q requis'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            transactions = filter_transactions(Transaction.objects.filter(user=request.user), params)
+            limit = parse_limit(params.get('limit'))
+            rows, next_cursor = search.paginate(search.search_transactions(transactions, text), params.get('cursor'), limit)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = TransactionSerializer(rows, many=True).data
+        for result, row in zip(results, rows):
+            result['rank'] = row.rank
+
+        return Response({
+            'query': text,
+            'results': results,
+            'next_cursor': next_cursor,
+            'limit': limit,
+        })
+
+class TransactionImportView(APIView):
+    """
+    Endpoint d'import en masse de relevés bancaires (CSV, OFX/QFX, QIF)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        """Importer un fichier (champ `file`) ; options : file_format, encoding, batch_size, copy"""
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'error': 'Aucun fichier fourni (champ "file")'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            batch_size = int(request.data.get('batch_size') or importers.DEFAULT_BATCH_SIZE)
+        except ValueError:
+            return Response({'error': 'Le paramètre batch_size doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = importers.import_file(
+                request.user,
+                uploaded_file,
+                file_format=request.data.get('file_format'),
+                encoding=request.data.get('encoding') or 'utf-8-sig',
+                batch_size=batch_size,
+                use_copy=request.data.get('copy') not in ('0', 'false'),
+            )
+        except (importers.ImportFormatError, LookupError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response_status = status.HTTP_201_CREATED if report['imported'] else status.HTTP_200_OK
+        return Response(report, status=response_status)
+
+class TransactionExportView(APIView):
+    """
+    Endpoint d'export en flux des transactions (CSV ou NDJSON, gzip optionnel)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """Exporter les transactions ; options : output=csv|ndjson, gzip=1, start, end, type, category, payment_method"""
+        output = request.query_params.get('output', 'csv')
+        if output not in exporters.CONTENT_TYPES:
+            return Response({'error': 'Format d\'export non supporté (csv, ndjson)'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Flux itéré après la sortie de la vue : réplica fixé sur les querysets
+            alias = read_alias(request.user)
+            transactions = filter_transactions(
+                Transaction.objects.using(alias).filter(user=request.user), request.query_params
+            )
+            start_date, end_date = parse_date_range(request.query_params)
+        except ValueError:
+            return Response({'error': 'Format de date invalide (AAAA-MM-JJ attendu)'}, status=status.HTTP_400_BAD_REQUEST)
+        matches = archived_filter(request.query_params)
+        archived = (
+            row for row in archive.archived_rows(request.user.pk, start_date, end_date, using=alias) if matches(row)
+        )
+
+        gzip = request.query_params.get('gzip') in ('1', 'true')
+        filename = f'transactions.{output}' + ('.gz' if gzip else '')
+        response = StreamingHttpResponse(
+            exporters.export_stream(transactions, output=output, gzip=gzip, archived=archived),
+            content_type='application/gzip' if gzip else exporters.CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+class TransactionBatchView(APIView):
+    """
+    Endpoint de modifications en masse : créations, modifications et suppressions appliquées atomiquement
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_OPERATIONS = 1000
+
+    def post(self, request):
+        """
+        Appliquer une liste d'opérations :
+        {"operations": [{"op": "create", "data": {...}}, {"op": "update", "id": 1, "data": {...}}, {"op": "delete", "id": 2}]}
+        Tout est annulé si une seule opération est invalide.
+        """
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'Le champ "operations" doit être une liste non vide'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > self.MAX_OPERATIONS:
+            return Response({'error': f'Maximum {self.MAX_OPERATIONS} opérations par requête'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(operations)
+        errors = {}
+
+        # Vérification de propriété en une seule requête pour toutes les modifications et suppressions
+        target_ids = {}
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op not in ('create', 'update', 'delete'):
+                errors[index] = 'Opération inconnue (create, update, delete)'
+            elif op != 'create':
+                pk = operation.get('id')
+                if not isinstance(pk, int):
+                    errors[index] = 'Identifiant manquant ou invalide'
+                elif pk in target_ids:
+                    errors[index] = f'Transaction {pk} déjà ciblée par l\'opération {target_ids[pk]}'
+                else:
+                    target_ids[pk] = index
+        owned = {
+            instance.pk: instance
+            for instance in Transaction.objects.filter(pk__in=list(target_ids), user=request.user)
+        } if target_ids else {}
+
+        to_create, to_update, to_delete = [], [], []
+        update_fields = set()
+        # Contexte partagé : les catégories de l'utilisateur ne sont chargées qu'une fois pour tout le lot
+        context = {'request': request}
+        for index, operation in enumerate(operations):
+            if index in errors:
+                continue
+            op = operation['op']
+            if op == 'create':
+                serializer = TransactionSerializer(data=operation.get('data') or {}, context=context)
+                if serializer.is_valid():
+                    to_create.append((index, Transaction(user=request.user, **serializer.validated_data)))
+                else:
+                    errors[index] = serializer.errors
+                continue
+
+            instance = owned.get(operation['id'])
+            if instance is None:
+                errors[index] = 'Transaction not found'
+            elif op == 'delete':
+                to_delete.append((index, instance))
+            else:
+                serializer = TransactionSerializer(instance, data=operation.get('data') or {}, partial=True, context=context)
+                if serializer.is_valid():
+                    previous = copy.copy(instance)
+                    for field, value in serializer.validated_data.items():
+                        setattr(instance, field, value)
+                    update_fields.update(serializer.validated_data)
+                    to_update.append((index, previous, instance))
+                else:
+                    errors[index] = serializer.errors
+
+        if errors:
+            return Response({
+                'applied': False,
+                'errors': [{'index': index, 'error': error} for index, error in sorted(errors.items())],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        with db_transaction.atomic():
+            deltas = rollups.empty_deltas()
+            if to_create:
+                created = Transaction.objects.bulk_create([instance for _, instance in to_create])
+                rollups.add_transactions(deltas, created)
+            if to_update:
+                now = timezone.now()
+                for _, _, instance in to_update:
+                    instance.updated_at = now
+                Transaction.objects.bulk_update([instance for _, _, instance in to_update], [*update_fields, 'updated_at'])
+                rollups.add_transactions(deltas, [previous for _, previous, _ in to_update], sign=-1)
+                rollups.add_transactions(deltas, [instance for _, _, instance in to_update])
+            if to_delete:
+                rollups.add_transactions(deltas, [instance for _, instance in to_delete], sign=-1)
+                # DELETE direct : pas de post_delete (ni bump_data_version) par ligne, un seul bump ci-dessous
+                delete_rows(Transaction, 'id', [instance.pk for _, instance in to_delete])
+            rollups.apply_deltas(request.user.pk, deltas)
+            bump_data_version(request.user.pk)
+
+        for index, instance in to_create:
+            results[index] = {'index': index, 'op': 'create', 'status': 'created', 'data': TransactionSerializer(instance).data}
+        for index, _, instance in to_update:
+            results[index] = {'index': index, 'op': 'update', 'status': 'updated', 'data': TransactionSerializer(instance).data}
+        for index, instance in to_delete:
+            results[index] = {'index': index, 'op': 'delete', 'status': 'deleted', 'id': instance.pk}
+
+        return Response({'applied': True, 'results': results})
+
 class TransactionDetailView(APIView):
     """
     Endpoint pour récupérer, modifier ou supprimer une transaction spécifique
@@ -380,7 +791,9 @@ class TransactionDetailView(APIView):
         if not transaction:
             return Response({'error': 'Transaction not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        transaction.delete()
+        with db_transaction.atomic():
+            rollups.record_deleted(transaction.user_id, [transaction])
+            transaction.delete()
         return Response({'message': 'Transaction supprimée avec succès'}, status=status.HTTP_204_NO_CONTENT)
 
 class CategoryListCreateView(APIView):
@@ -389,6 +802,7 @@ class CategoryListCreateView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @cache_per_user
     def get(self, request):
         """Récupérer toutes les catégories de l'utilisateur"""
         categories = Category.objects.filter(user=request.user)
@@ -397,13 +811,13 @@ class CategoryListCreateView(APIView):
     
     def post(self, request):
         """Créer une nouvelle catégorie"""
-        print(f"[CATEGORY] Données reçues: {request.data}")
+        logger.debug('event=category.received user=%s data=%s', request.user.pk, request.data)
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
             category = serializer.save(user=request.user)
-            print(f"[CATEGORY] Catégorie créée avec succès: {category}")
+            logger.info('event=category.created user=%s category=%s', request.user.pk, category.pk)
             return Response(CategorySerializer(category).data, status=status.HTTP_201_CREATED)
-        print(f"[CATEGORY] Erreurs de validation: {serializer.errors}")
+        logger.info('event=category.invalid user=%s errors=%s', request.user.pk, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CategoryDetailView(APIView):
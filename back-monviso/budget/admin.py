@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import UserProfile, Category, Income, Expense, SavingsGoal, Transaction
+from django.db import transaction
+
+from . import rollups
+from .models import UserProfile, Category, Income, Expense, SavingsGoal, Transaction, MonthlyRollup, TransactionArchive
 
 # Register your models here.
 
@@ -48,3 +51,42 @@ class TransactionAdmin(admin.ModelAdmin):
     search_fields = ('name', 'user__username', 'category')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'date'
+
+    # Les modifications faites ici tiennent MonthlyRollup à jour, comme celles de l'API
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            previous = Transaction.objects.select_for_update().get(pk=obj.pk) if change else None
+            super().save_model(request, obj, form, change)
+            if previous is None:
+                rollups.record_created(obj.user_id, [obj])
+            elif previous.user_id == obj.user_id:
+                rollups.record_updated(obj.user_id, previous, obj)
+            else:
+                rollups.record_deleted(previous.user_id, [previous])
+                rollups.record_created(obj.user_id, [obj])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            rollups.record_deleted(obj.user_id, [obj])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for user_id in set(queryset.values_list('user_id', flat=True)):
+                rollups.record_queryset_deleted(user_id, queryset.filter(user_id=user_id))
+            super().delete_queryset(request, queryset)
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'month', 'type', 'category', 'total', 'count', 'updated_at')
+    list_filter = ('type', 'month')
+    search_fields = ('user__username', 'category')
+    readonly_fields = ('updated_at',)
+
+@admin.register(TransactionArchive)
+class TransactionArchiveAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'count', 'income_total', 'expense_total', 'first_date', 'last_date', 'archived_at')
+    list_filter = ('year',)
+    search_fields = ('user__username',)
+    exclude = ('data',)
+    readonly_fields = ('count', 'income_total', 'expense_total', 'first_date', 'last_date', 'archived_at')
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class BudgetConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'budget'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .partitions import on_post_migrate
+
+        # Table partitionnée : partitions à venir créées à chaque déploiement (en plus du cron)
+        post_migrate.connect(on_post_migrate, sender=self, dispatch_uid='transaction_partitions')
@@ -0,0 +1,176 @@
+"""
+Archivage des transactions anciennes (TransactionArchive) et restauration.
+
+Les transactions antérieures à TRANSACTION_ARCHIVE_AFTER_MONTHS mois sont déplacées, par
+utilisateur et par année, dans une ligne TransactionArchive : NDJSON compressé en gzip, plus
+les totaux revenus / dépenses de l'année. La table Transaction et ses index ne gardent que
+l'historique récent.
+
+- MonthlyRollup n'est pas modifié : synthèse, budgets et historique par mois entiers restent
+  exacts sans lire les archives ; expected_rollups / rebuild les incluent.
+- Historique (filtres hors rollup) et export fusionnent les lignes archivées (archived_rows) ;
+  les totaux du tableau de bord ajoutent ceux des archives. Liste, recherche et détail ne
+  portent que sur les transactions actives.
+- restore() réinsère les transactions d'une archive (mêmes id, dates de création, catégories
+  encore existantes sous leur nom actuel) et supprime l'archive.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import rollups
+from .deletion import delete_rows
+from .models import Category, Transaction, TransactionArchive
+
+ARCHIVE_FIELDS = (
+    'id', 'date', 'name', 'amount', 'type', 'category', 'category_fk_id', 'payment_method', 'frequency',
+    'created_at', 'updated_at',
+)
+COMPRESS_LEVEL = 6
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder tronque les microsecondes : created_at doit revenir à l'identique (ordre, curseurs)
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def archive_cutoff(today, months=None):
+    """Premier jour du mois `months` mois avant `today` : les transactions antérieures sont archivables"""
+    months = getattr(settings, 'TRANSACTION_ARCHIVE_AFTER_MONTHS', 36) if months is None else months
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def encode(rows):
+    encoder = ArchiveEncoder(ensure_ascii=False, separators=(',', ':'))
+    payload = ''.join(encoder.encode(dict(zip(ARCHIVE_FIELDS, row))) + '\n' for row in rows)
+    return gzip.compress(payload.encode('utf-8'), compresslevel=COMPRESS_LEVEL)
+
+
+def decode(data):
+    """Lignes d'une archive, types d'origine restaurés (Decimal, date, datetime)"""
+    rows = []
+    for line in gzip.decompress(bytes(data)).decode('utf-8').splitlines():
+        row = json.loads(line)
+        row['amount'] = Decimal(row['amount'])
+        row['date'] = parse_date(row['date'])
+        row['created_at'] = parse_datetime(row['created_at'])
+        row['updated_at'] = parse_datetime(row['updated_at'])
+        rows.append(row)
+    return rows
+
+
+def _totals(rows):
+    totals = {'income': Decimal('0'), 'expense': Decimal('0')}
+    for row in rows:
+        totals[row['type']] += abs(row['amount'])
+    return totals
+
+
+def archive_year(user_id, year, cutoff):
+    """
+    Déplace les transactions de `year` antérieures à `cutoff` dans l'archive de l'année
+    (fusionnée avec l'archive existante). Renvoie le nombre de transactions archivées.
+    """
+    start, end = date(year, 1, 1), min(date(year + 1, 1, 1), cutoff)
+    with transaction.atomic():
+        live = Transaction.objects.select_for_update().filter(user_id=user_id, date__gte=start, date__lt=end)
+        rows = [dict(zip(ARCHIVE_FIELDS, row)) for row in live.values_list(*ARCHIVE_FIELDS).order_by()]
+        moved = len(rows)
+        if not moved:
+            return 0
+        archive = TransactionArchive.objects.select_for_update().filter(user_id=user_id, year=year).first()
+        moved_ids = {row['id'] for row in rows}
+        if archive is not None:
+            rows += [row for row in decode(archive.data) if row['id'] not in moved_ids]
+        else:
+            archive = TransactionArchive(user_id=user_id, year=year)
+        rows.sort(key=lambda row: (row['date'], row['created_at'], row['id']), reverse=True)
+
+        totals = _totals(rows)
+        archive.data = encode([row[field] for field in ARCHIVE_FIELDS] for row in rows)
+        archive.count = len(rows)
+        archive.income_total = totals['income']
+        archive.expense_total = totals['expense']
+        archive.first_date = rows[-1]['date']
+        archive.last_date = rows[0]['date']
+        # post_save de l'archive : une seule invalidation du cache de l'utilisateur
+        archive.save()
+        # Les rollups ne sont pas touchés : les totaux mensuels de ces transactions restent valides.
+        # DELETE direct des lignes verrouillées, sans collecte ni signal post_delete par ligne
+        delete_rows(Transaction, 'id', moved_ids)
+    return moved
+
+
+def archive_user(user_id, cutoff):
+    """Archive, année par année, les transactions de l'utilisateur antérieures à `cutoff`"""
+    years = Transaction.objects.filter(user_id=user_id, date__lt=cutoff).dates('date', 'year')
+    return sum(archive_year(user_id, day.year, cutoff) for day in years)
+
+
+def restore(user_id, year=None):
+    """Réinsère les transactions archivées de l'utilisateur (d'une année ou toutes) ; renvoie leur nombre"""
+    archives = TransactionArchive.objects.filter(user_id=user_id)
+    if year is not None:
+        archives = archives.filter(year=year)
+    restored = 0
+    for archive_id in archives.values_list('pk', flat=True):
+        with transaction.atomic():
+            archive = TransactionArchive.objects.select_for_update().get(pk=archive_id)
+            rows = decode(archive.data)
+            names = dict(Category.objects.filter(user_id=user_id).values_list('pk', 'name'))
+            instances = []
+            deltas = rollups.empty_deltas()
+            for row in rows:
+                instance = Transaction(user_id=user_id, **row)
+                if instance.category_fk_id not in names:
+                    # Catégorie supprimée depuis l'archivage : lien retiré, comme le ferait SET_NULL
+                    instance.category_fk_id = None
+                elif instance.category != names[instance.category_fk_id]:
+                    # Catégorie renommée depuis l'archivage : libellé et rollups suivent, comme pour les lignes actives
+                    rollups.add_transactions(deltas, [Transaction(**row)], sign=-1)
+                    instance.category = names[instance.category_fk_id]
+                    rollups.add_transactions(deltas, [instance])
+                instances.append(instance)
+            Transaction.objects.bulk_create(instances, batch_size=1000)
+            # bulk_create réécrit created_at / updated_at (auto_now) : dates d'origine remises
+            for instance, row in zip(instances, rows):
+                instance.created_at, instance.updated_at = row['created_at'], row['updated_at']
+            Transaction.objects.bulk_update(instances, ['created_at', 'updated_at'], batch_size=1000)
+            rollups.apply_deltas(user_id, deltas)
+            archive.delete()
+        restored += len(rows)
+    return restored
+
+
+def archived_rows(user_id, start=None, end=None, using=None):
+    """
+    Lignes archivées de l'utilisateur entre `start` et `end` inclus, de la plus récente à la plus
+    ancienne (ordre de Transaction.Meta.ordering). Les archives sont lues et décompressées une à une.
+    """
+    archives = TransactionArchive.objects.using(using).filter(user_id=user_id).order_by('-year')
+    if start:
+        archives = archives.filter(last_date__gte=start)
+    if end:
+        archives = archives.filter(first_date__lte=end)
+    for data in archives.values_list('data', flat=True).iterator(chunk_size=1):
+        for row in decode(data):
+            if (start is None or row['date'] >= start) and (end is None or row['date'] <= end):
+                yield row
+
+
+def archived_totals(user_id):
+    """Totaux revenus / dépenses des transactions archivées (une requête)"""
+    return TransactionArchive.objects.filter(user_id=user_id).aggregate(
+        income=Sum('income_total'), expenses=Sum('expense_total'),
+    )
@@ -0,0 +1,107 @@
+"""
+Suivi budget / réalisé par catégorie et par mois.
+
+Les dépenses réelles sont lues depuis MonthlyRollup (une ligne par mois et par catégorie) et
+rattachées aux catégories de dépense de l'utilisateur : deux requêtes dont le coût dépend du
+nombre de mois demandés et de catégories, jamais du volume de transactions. Les montants sont
+regroupés par identifiant de catégorie ; le nom ne sert qu'à l'affichage.
+"""
+from datetime import date
+from decimal import Decimal
+
+from .models import Category, MonthlyRollup
+
+MAX_MONTHS = 120
+
+
+def parse_month(value):
+    """'AAAA-MM' -> premier jour du mois ; lève ValueError si invalide"""
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
+
+
+def month_range(start, end):
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def category_status(budget, spent):
+    if budget is None:
+        return {'budget': None, 'spent': spent, 'remaining': None, 'over_budget': False}
+    return {'budget': budget, 'spent': spent, 'remaining': budget - spent, 'over_budget': spent > budget}
+
+
+def budget_vs_actual(user, start, end, uncategorized_label):
+    months = month_range(start, end)
+    categories = list(
+        Category.objects.filter(user=user, type='expense')
+        .values('id', 'name', 'monthly_budget', 'color', 'icon')
+        .order_by('name')
+    )
+    # MonthlyRollup est indexé par libellé (suivi lors des renommages) : rattachement (nom, type) -> id
+    ids = {category['name']: category['id'] for category in categories}
+
+    spent = {}
+    unknown = set()
+    rows = MonthlyRollup.objects.filter(
+        user=user, type='expense', month__gte=months[0], month__lte=months[-1]
+    ).values_list('month', 'category', 'total')
+    for month, name, total in rows:
+        category_id = ids.get(name)
+        if category_id is None:
+            unknown.add(name)
+        key = (month, category_id, '' if category_id else name)
+        spent[key] = spent.get(key, Decimal('0')) + total
+
+    # Dépenses rattachées à une catégorie absente (supprimée ou jamais créée) : listées sans budget
+    columns = categories + [
+        {'id': None, 'name': name, 'monthly_budget': None, 'color': None, 'icon': None}
+        for name in sorted(unknown)
+    ]
+
+    periods = []
+    totals = {'budget': Decimal('0'), 'spent': Decimal('0')}
+    for month in months:
+        lines = []
+        month_budget = Decimal('0')
+        month_spent = Decimal('0')
+        for category in columns:
+            key = (month, category['id'], '' if category['id'] else category['name'])
+            amount = spent.get(key, Decimal('0'))
+            budget = category['monthly_budget']
+            month_spent += amount
+            if budget is not None:
+                month_budget += budget
+            lines.append({
+                'category_id': category['id'],
+                'category': category['name'] or uncategorized_label,
+                'color': category['color'],
+                'icon': category['icon'],
+                **category_status(budget, amount),
+            })
+        totals['budget'] += month_budget
+        totals['spent'] += month_spent
+        periods.append({
+            'month': month.strftime('%Y-%m'),
+            'budget': month_budget,
+            'spent': month_spent,
+            'remaining': month_budget - month_spent,
+            'over_budget_count': sum(1 for line in lines if line['over_budget']),
+            'categories': lines,
+        })
+
+    return {
+        'start': months[0].strftime('%Y-%m'),
+        'end': months[-1].strftime('%Y-%m'),
+        'months': periods,
+        'totals': {
+            'budget': totals['budget'],
+            'spent': totals['spent'],
+            'remaining': totals['budget'] - totals['spent'],
+            'over_budget_count': sum(period['over_budget_count'] for period in periods),
+        },
+    }
@@ -0,0 +1,73 @@
+"""
+Rattachement des transactions à leur Category (clé étrangère category_fk).
+
+Transaction.category reste le libellé texte (utilisé par les rollups et les anciens
+clients) ; category_fk est renseignée à partir du couple (nom, type) pour les
+regroupements et jointures par clé entière.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+class CategoryIndex:
+    """Catégories d'un utilisateur indexées par identifiant et par (nom, type)"""
+
+    def __init__(self, rows=()):
+        self.names = {}
+        self.by_name_type = {}
+        for pk, name, type_ in rows:
+            self.add(pk, name, type_)
+
+    @classmethod
+    def for_user(cls, category_model, user_id):
+        return cls(category_model.objects.filter(user_id=user_id).values_list('pk', 'name', 'type'))
+
+    def add(self, pk, name, type_):
+        self.names[pk] = name
+        self.by_name_type[(name, type_)] = pk
+
+    def resolve(self, name, type_):
+        if not name:
+            return None
+        return self.by_name_type.get((name, type_))
+
+
+def backfill_category_fk(transaction_model, category_model, batch_size=BACKFILL_BATCH_SIZE, user_ids=None):
+    """
+    Renseigne category_fk par lots de clés primaires croissantes, chaque lot dans sa propre
+    transaction : les verrous ne portent que sur les lignes du lot en cours.
+    Les modèles sont passés en paramètre pour être utilisable depuis une migration.
+    """
+    queryset = transaction_model.objects.filter(category_fk__isnull=True).exclude(category='')
+    if user_ids:
+        queryset = queryset.filter(user_id__in=user_ids)
+
+    indexes = {}
+    last_pk = 0
+    updated = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'user_id', 'category', 'type')[:batch_size]
+        )
+        if not rows:
+            return updated
+        last_pk = rows[-1][0]
+
+        missing = {user_id for _, user_id, _, _ in rows} - set(indexes)
+        for user_id in missing:
+            indexes[user_id] = CategoryIndex()
+        for pk, user_id, name, type_ in category_model.objects.filter(user_id__in=missing).values_list('pk', 'user_id', 'name', 'type'):
+            indexes[user_id].add(pk, name, type_)
+
+        targets = defaultdict(list)
+        for pk, user_id, name, type_ in rows:
+            category_id = indexes[user_id].resolve(name, type_)
+            if category_id:
+                targets[category_id].append(pk)
+        with transaction.atomic():
+            for category_id, pks in targets.items():
+                updated += transaction_model.objects.filter(pk__in=pks, category_fk__isnull=True).update(category_fk_id=category_id)
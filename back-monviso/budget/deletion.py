@@ -0,0 +1,31 @@
+"""
+Suppressions en masse sans signaux par ligne.
+
+QuerySet.delete() charge chaque ligne et envoie un post_delete par instance dès qu'un
+récepteur est branché (api.apps : invalidation du cache, un bump_data_version par ligne).
+delete_rows exécute un DELETE ... WHERE <colonne> IN (...) par paquets : l'appelant
+applique lui-même les effets attendus (deltas de rollups, un seul bump_data_version).
+
+Aucune relation en cascade n'est suivie : réservé aux modèles dont aucune clé étrangère
+contrainte ne dépend (Transaction, Income, Expense, SavingsGoal).
+"""
+from django.db import connections, router
+
+CHUNK_SIZE = 500
+
+
+def delete_rows(model, field, values, using=None):
+    """Supprime les lignes de `model` dont `field` vaut l'une des `values` ; renvoie le nombre supprimé"""
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table, column = quote(model._meta.db_table), quote(model._meta.get_field(field).column)
+    values = list(values)
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), CHUNK_SIZE):
+            chunk = values[start:start + CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', chunk)
+            deleted += cursor.rowcount
+    return deleted
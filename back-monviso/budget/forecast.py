@@ -0,0 +1,213 @@
+"""
+Projection de trésorerie à partir des éléments récurrents.
+
+Les transactions récurrentes (fréquence mensuel / trimestriel / annuel) et les revenus /
+dépenses d'onboarding sont développés paresseusement en occurrences datées sur l'horizon
+demandé : aucune ligne n'est créée. Les flux par période sont mis en cache sous une
+empreinte de l'ensemble récurrent, ils ne sont donc recalculés que lorsque celui-ci change.
+"""
+import calendar
+import hashlib
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import Abs
+
+from .models import Expense, Income, MonthlyRollup, Transaction
+
+MAX_HORIZON_MONTHS = 120
+GRANULARITIES = ('monthly', 'daily')
+CACHE_TIMEOUT = 24 * 60 * 60
+
+# Période en mois des fréquences connues (valeurs françaises des transactions, anglaises de l'onboarding)
+PERIOD_MONTHS = {
+    'mensuel': 1, 'monthly': 1,
+    'trimestriel': 3, 'quarterly': 3,
+    'semestriel': 6, 'biannual': 6,
+    'annuel': 12, 'yearly': 12, 'annual': 12,
+}
+PERIOD_DAYS = {'hebdomadaire': 7, 'weekly': 7}
+
+RecurringItem = namedtuple('RecurringItem', 'name type amount anchor months days')
+
+
+def add_months(day, months, anchor_day=None):
+    """Ajoute des mois en ramenant le jour au dernier jour du mois si besoin (31 janv. -> 28/29 févr.)"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(anchor_day or day.day, calendar.monthrange(year, month)[1]))
+
+
+def recurring_items(user):
+    """Ensemble récurrent de l'utilisateur (3 requêtes, colonnes utiles uniquement)"""
+    items = {}
+    recurring = (
+        Transaction.objects.filter(user=user).exclude(frequency='unique')
+        .values_list('name', 'type', 'amount', 'category', 'date', 'frequency')
+        .order_by('date')
+    )
+    for name, type_, amount, category, date, frequency in recurring:
+        # Une même opération récurrente saisie chaque mois ne compte qu'une fois, ancrée sur la plus récente
+        items[(name, type_, abs(amount), category, frequency)] = _item(name, type_, abs(amount), date, frequency)
+
+    for model, type_ in ((Income, 'income'), (Expense, 'expense')):
+        rows = model.objects.filter(user=user).values_list('id', 'name', 'amount', 'created_at', 'frequency')
+        for pk, name, amount, created_at, frequency in rows:
+            items[(model.__name__, pk)] = _item(name, type_, amount, created_at.date(), frequency)
+
+    return sorted(
+        (item for item in items.values() if item is not None),
+        key=lambda item: (item.anchor, item.type, item.name, item.amount),
+    )
+
+
+def _item(name, type_, amount, anchor, frequency):
+    frequency = (frequency or '').lower()
+    if frequency in PERIOD_MONTHS:
+        return RecurringItem(name, type_, amount, anchor, PERIOD_MONTHS[frequency], 0)
+    if frequency in PERIOD_DAYS:
+        return RecurringItem(name, type_, amount, anchor, 0, PERIOD_DAYS[frequency])
+    return None
+
+
+def occurrences(item, start, end):
+    """Générateur des dates d'occurrence de `item` dans [start, end]"""
+    if item.days:
+        step = timedelta(days=item.days)
+        skipped = max(0, (start - item.anchor).days)
+        current = item.anchor + step * -(-skipped // item.days)
+        while current <= end:
+            yield current
+            current += step
+        return
+
+    elapsed = (start.year - item.anchor.year) * 12 + start.month - item.anchor.month
+    index = max(0, elapsed // item.months)
+    while True:
+        current = add_months(item.anchor, index * item.months, item.anchor.day)
+        if current > end:
+            return
+        if current >= start:
+            yield current
+        index += 1
+
+
+def fingerprint(items):
+    raw = '|'.join(f'{item.type}:{item.amount}:{item.anchor}:{item.months}:{item.days}' for item in items)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def project_flows(items, start, end, granularity):
+    """
+    Flux {période: [revenus, dépenses]} ; période = 'AAAA-MM' ou date ISO.
+
+    Les éléments mensuels / trimestriels / annuels avancent d'index de mois en index de mois
+    et leur jour est calculé par simple arithmétique sur une table des mois de l'horizon :
+    aucune date n'est matérialisée. Les montants sont cumulés en centimes entiers.
+    """
+    first_month = start.year * 12 + start.month - 1
+    last_month = end.year * 12 + end.month - 1
+    month_offsets, month_lengths = [], []
+    for month_index in range(first_month, last_month + 1):
+        year, month = divmod(month_index, 12)
+        month_offsets.append((date(year, month + 1, 1) - start).days)
+        month_lengths.append(calendar.monthrange(year, month + 1)[1])
+    days = (end - start).days + 1
+    monthly = granularity == 'monthly'
+
+    size = len(month_offsets) if monthly else days
+    totals = {'income': [0] * size, 'expense': [0] * size}
+    for item in items:
+        column = totals[item.type]
+        cents = int(item.amount * 100)
+        if item.days:
+            for day in occurrences(item, start, end):
+                column[day.year * 12 + day.month - 1 - first_month if monthly else (day - start).days] += cents
+            continue
+        anchor_month = item.anchor.year * 12 + item.anchor.month - 1
+        first = anchor_month + max(0, -(-(first_month - anchor_month) // item.months)) * item.months
+        for month_index in range(first, last_month + 1, item.months):
+            offset = month_index - first_month
+            day_offset = month_offsets[offset] + min(item.anchor.day, month_lengths[offset]) - 1
+            if 0 <= day_offset < days:
+                column[offset if monthly else day_offset] += cents
+
+    if monthly:
+        def label(offset):
+            year, month = divmod(first_month + offset, 12)
+            return f'{year:04d}-{month + 1:02d}'
+    else:
+        def label(offset):
+            return (start + timedelta(days=offset)).isoformat()
+    return _to_flows(totals, label)
+
+
+def _to_flows(totals, label):
+    flows = {}
+    for offset, (income, expenses) in enumerate(zip(totals['income'], totals['expense'])):
+        if income or expenses:
+            flows[label(offset)] = [Decimal(income) / 100, Decimal(expenses) / 100]
+    return flows
+
+
+def current_balance(user, today):
+    """Solde réel à date : mois clos depuis MonthlyRollup, mois en cours depuis les transactions (index user/type/date)"""
+    month = today.replace(day=1)
+    closed = MonthlyRollup.objects.filter(user=user, month__lt=month).aggregate(
+        income=Sum('total', filter=Q(type='income')),
+        expenses=Sum('total', filter=Q(type='expense')),
+    )
+    running = Transaction.objects.filter(user=user, date__gte=month, date__lte=today).aggregate(
+        income=Sum(Abs('amount'), filter=Q(type='income')),
+        expenses=Sum(Abs('amount'), filter=Q(type='expense')),
+    )
+    return sum(
+        (totals['income'] or Decimal('0')) - (totals['expenses'] or Decimal('0'))
+        for totals in (closed, running)
+    )
+
+
+def forecast(user, today, months=12, granularity='monthly', start_balance=None):
+    start = today + timedelta(days=1)
+    end = add_months(today, months)
+    items = recurring_items(user)
+
+    key = f'monviso:forecast:{user.pk}:{fingerprint(items)}:{start}:{end}:{granularity}'
+    flows = cache.get(key)
+    if flows is None:
+        flows = dict(project_flows(items, start, end, granularity))
+        cache.set(key, flows, timeout=CACHE_TIMEOUT)
+
+    balance = current_balance(user, today) if start_balance is None else start_balance
+    opening_balance = balance
+    periods = []
+    if granularity == 'monthly':
+        keys, month = [], start.replace(day=1)
+        while month <= end:
+            keys.append(month.strftime('%Y-%m'))
+            month = add_months(month, 1)
+    else:
+        keys = [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+    for period in keys:
+        income, expenses = flows.get(period, (Decimal('0'), Decimal('0')))
+        balance += income - expenses
+        periods.append({
+            'period': period,
+            'income': income,
+            'expenses': expenses,
+            'net': income - expenses,
+            'balance': balance,
+        })
+
+    return {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'opening_balance': opening_balance,
+        'closing_balance': balance,
+        'recurring_items': len(items),
+        'periods': periods,
+    }
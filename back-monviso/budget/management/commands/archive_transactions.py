@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from budget import archive
+from budget.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les transactions plus anciennes que TRANSACTION_ARCHIVE_AFTER_MONTHS mois dans des "
+        "archives compressées par utilisateur et par année (les rollups mensuels sont conservés)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help="Âge minimal en mois (défaut TRANSACTION_ARCHIVE_AFTER_MONTHS)")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limiter à cet id utilisateur (répétable)")
+        parser.add_argument('--dry-run', action='store_true', help="Compter les transactions archivables sans rien modifier")
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff(date.today(), options['months'])
+        users = User.objects.filter(transactions__date__lt=cutoff).distinct()
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True).order_by('pk'))
+
+        if options['dry_run']:
+            count = Transaction.objects.filter(user_id__in=user_ids, date__lt=cutoff).count()
+            self.stdout.write(f'{count} transaction(s) antérieure(s) au {cutoff:%d/%m/%Y} pour {len(user_ids)} utilisateur(s)')
+            return
+
+        total = 0
+        for user_id in user_ids:
+            total += archive.archive_user(user_id, cutoff)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} transaction(s) antérieure(s) au {cutoff:%d/%m/%Y} archivée(s) pour {len(user_ids)} utilisateur(s)'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from budget.categories import BACKFILL_BATCH_SIZE, backfill_category_fk
+from budget.models import Category, Transaction
+
+
+class Command(BaseCommand):
+    help = "Rattache à leur Category (category_fk) les transactions qui n'ont qu'un libellé de catégorie."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limiter à cet id utilisateur (répétable)")
+        parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help="Lignes par lot (une transaction par lot)")
+
+    def handle(self, *args, **options):
+        updated = backfill_category_fk(Transaction, Category, batch_size=options['batch_size'], user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(f'{updated} transaction(s) rattachée(s) à leur catégorie'))
@@ -0,0 +1,135 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Sum
+
+from budget.deletion import delete_rows
+from budget.models import Transaction
+
+BENCH_USERNAME = 'bench_indexes'
+CATEGORIES = ['Courses', 'Loyer', 'Transport', 'Loisirs', 'Santé', 'Restaurants', 'Abonnements', 'Salaire', '']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les plans et latences des requêtes Transaction avant/après les index composites "
+        "sur un utilisateur de test (1M lignes par défaut). Supprime temporairement les index "
+        "de Transaction : à lancer sur une base dédiée (--database), ou avec --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Nombre de transactions à générer')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Taille des lots bulk_create')
+        parser.add_argument('--repeat', type=int, default=5, help='Nombre de mesures par requête')
+        parser.add_argument('--keep', action='store_true', help="Conserver l'utilisateur de test après la mesure")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Alias de la base de mesure (DATABASES)')
+        parser.add_argument('--force', action='store_true', help='Autoriser la mesure sur la base par défaut')
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        if self.using not in connections:
+            raise CommandError(f'Base inconnue : {self.using}')
+        if self.using == DEFAULT_DB_ALIAS and not options['force']:
+            raise CommandError(
+                'Cette mesure supprime les index de Transaction et insère des millions de lignes : '
+                'indiquez une base dédiée (--database) ou confirmez avec --force.'
+            )
+        self.connection = connections[self.using]
+
+        try:
+            user = self.seed(options['rows'], options['batch_size'])
+            removed = []
+            try:
+                with self.connection.schema_editor() as editor:
+                    for index in Transaction._meta.indexes:
+                        editor.remove_index(Transaction, index)
+                        removed.append(index)
+                self.analyze()
+                before = self.run_queries(user, options['repeat'], 'AVANT (index FK user_id seul)')
+            finally:
+                with self.connection.schema_editor() as editor:
+                    for index in removed:
+                        editor.add_index(Transaction, index)
+            self.analyze()
+            after = self.run_queries(user, options['repeat'], 'APRÈS (index composites)')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('\nRésumé (médiane, ms)'))
+            for name in before:
+                speedup = before[name] / after[name] if after[name] else float('inf')
+                self.stdout.write(f'  {name:<28} {before[name]:>10.2f} -> {after[name]:>10.2f}  (x{speedup:.1f})')
+        finally:
+            if not options['keep']:
+                self.cleanup()
+
+    def cleanup(self):
+        """Supprime les utilisateurs de test : transactions par un DELETE direct, sans signal post_delete par ligne"""
+        bench_users = User.objects.using(self.using).filter(username__startswith=BENCH_USERNAME)
+        delete_rows(Transaction, 'user', list(bench_users.values_list('pk', flat=True)), using=self.using)
+        bench_users.delete()
+
+    def seed(self, rows, batch_size):
+        self.cleanup()
+        users = User.objects.db_manager(self.using)
+        user = users.create_user(username=BENCH_USERNAME, email='bench_indexes@monviso.local')
+        # Un second utilisateur garde la sélectivité de user_id réaliste
+        other, _ = users.get_or_create(username=f'{BENCH_USERNAME}_other')
+
+        rng = random.Random(42)
+        first_day = date.today() - timedelta(days=365 * 10)
+        started = time.perf_counter()
+        created = 0
+        while created < rows:
+            size = min(batch_size, rows - created)
+            batch = []
+            for _ in range(size):
+                is_income = rng.random() < 0.15
+                batch.append(Transaction(
+                    user=user if rng.random() < 0.9 else other,
+                    name=f'Transaction {created}',
+                    amount=Decimal(rng.randint(100, 250_000)) / 100,
+                    type='income' if is_income else 'expense',
+                    category='Salaire' if is_income else rng.choice(CATEGORIES),
+                    date=first_day + timedelta(days=rng.randint(0, 3650)),
+                    payment_method=rng.choice(['card', 'transfer', 'cash']),
+                ))
+                created += 1
+            Transaction.objects.using(self.using).bulk_create(batch, batch_size=batch_size)
+        self.stdout.write(f'{rows} transactions générées en {time.perf_counter() - started:.1f}s')
+        return user
+
+    def analyze(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def queries(self, user):
+        year_start = date.today().replace(month=1, day=1)
+        transactions = Transaction.objects.using(self.using).filter(user=user)
+        return {
+            'liste (50 premières)': transactions.order_by('-date', '-created_at', '-id')[:50],
+            'somme par type (année)': transactions.filter(type='expense', date__gte=year_start).values('type').annotate(total=Sum('amount')).order_by(),
+            'somme par catégorie (année)': transactions.filter(category='Courses', date__gte=year_start).values('category').annotate(total=Sum('amount')).order_by(),
+        }
+
+    def run_queries(self, user, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}'))
+        results = {}
+        for name, queryset in self.queries(user).items():
+            if self.connection.vendor == 'postgresql':
+                plan = queryset.explain(analyze=True, buffers=True)
+            else:
+                plan = queryset.explain()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(self.style.SQL_FIELD(f'-- {name}: médiane {results[name]:.2f} ms, min {min(timings):.2f} ms'))
+            self.stdout.write(plan)
+        return results
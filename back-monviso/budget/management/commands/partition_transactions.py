@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from budget import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Partitionnement PostgreSQL de budget_transaction par mois ou par année : crée les partitions "
+        "à venir (à lancer chaque jour par cron), ou convertit la table existante avec --convert."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help="Convertir la table actuelle en table partitionnée (bloque les écritures pendant la copie)")
+        parser.add_argument('--interval', choices=partitions.INTERVALS, help="Intervalle des partitions (défaut TRANSACTION_PARTITION_INTERVAL)")
+        parser.add_argument('--ahead', type=int, help="Nombre de périodes futures à créer (défaut TRANSACTION_PARTITIONS_AHEAD)")
+        parser.add_argument('--keep-old', action='store_true', help="Avec --convert : conserver l'ancienne table (budget_transaction_unpartitioned)")
+        parser.add_argument('--list', action='store_true', help="Afficher les partitions existantes")
+        parser.add_argument('--dry-run', action='store_true', help="Afficher les instructions sans rien modifier")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Alias de base de données")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitionnement disponible uniquement sur PostgreSQL')
+
+        try:
+            if options['convert']:
+                self.convert(connection, options)
+            elif not partitions.is_partitioned(connection):
+                raise CommandError(f'{partitions.TABLE} n\'est pas partitionnée : lancer d\'abord --convert')
+            elif options['list']:
+                self.list(connection)
+            else:
+                created = partitions.ensure_partitions(
+                    connection, ahead=options['ahead'], interval=options['interval'], execute=not options['dry_run']
+                )
+                verb = 'à créer' if options['dry_run'] else 'créée(s)'
+                self.stdout.write(self.style.SUCCESS(f'{len(created)} partition(s) {verb} : {", ".join(created) or "-"}'))
+        except partitions.PartitioningError as exc:
+            raise CommandError(str(exc))
+
+    def convert(self, connection, options):
+        statements = partitions.convert(
+            connection, interval=options['interval'], ahead=options['ahead'],
+            keep_old=options['keep_old'], execute=not options['dry_run'],
+        )
+        if options['dry_run']:
+            for statement in statements:
+                self.stdout.write(f'{statement};')
+            return
+        self.stdout.write(self.style.SUCCESS(f'{partitions.TABLE} partitionnée'))
+        self.list(connection)
+
+    def list(self, connection):
+        for name, bounds, rows in partitions.list_partitions(connection):
+            self.stdout.write(f'  {name:<36} {bounds:<60} ~{max(rows, 0)} lignes')
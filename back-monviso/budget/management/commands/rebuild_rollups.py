@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from budget import rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcule la table MonthlyRollup depuis les transactions, ou vérifie sa dérive avec --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limiter à cet id utilisateur (répétable)")
+        parser.add_argument('--check', action='store_true', help="Signaler les écarts sans rien modifier")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(Q(transactions__isnull=False) | Q(monthly_rollups__isnull=False)).distinct()
+        if options['users']:
+            users = User.objects.filter(pk__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True).order_by('pk'))
+
+        if options['check']:
+            drifted = 0
+            for user_id in user_ids:
+                drift = self.compare(user_id)
+                if drift:
+                    drifted += 1
+                    for line in drift:
+                        self.stdout.write(self.style.WARNING(f'user {user_id}: {line}'))
+            if drifted:
+                raise CommandError(f'{drifted} utilisateur(s) avec des rollups incohérents')
+            self.stdout.write(self.style.SUCCESS(f'{len(user_ids)} utilisateur(s) vérifié(s), aucun écart'))
+            return
+
+        total = 0
+        for user_id in user_ids:
+            total += rollups.rebuild(user_id)
+        self.stdout.write(self.style.SUCCESS(f'{total} rollups reconstruits pour {len(user_ids)} utilisateur(s)'))
+
+    def compare(self, user_id):
+        expected = rollups.expected_rollups(user_id)
+        current = rollups.current_rollups(user_id)
+        drift = []
+        for key in sorted(set(expected) | set(current)):
+            if expected.get(key) != current.get(key):
+                month, type_, category = key
+                drift.append(
+                    f'{month:%Y-%m} {type_} {category or "-"}: '
+                    f'attendu {expected.get(key)}, trouvé {current.get(key)}'
+                )
+        return drift
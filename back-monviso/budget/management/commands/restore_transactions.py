@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from budget import archive
+from budget.models import TransactionArchive
+
+
+class Command(BaseCommand):
+    help = "Réinsère dans Transaction les transactions archivées d'un utilisateur (toutes ou d'une année)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', required=True, help="Id utilisateur (répétable)")
+        parser.add_argument('--year', type=int, help="Limiter à cette année")
+
+    def handle(self, *args, **options):
+        archives = TransactionArchive.objects.filter(user_id__in=options['users'])
+        if options['year'] is not None:
+            archives = archives.filter(year=options['year'])
+        if not archives.exists():
+            raise CommandError('Aucune archive correspondante')
+
+        total = 0
+        for user_id in options['users']:
+            total += archive.restore(user_id, options['year'])
+        self.stdout.write(self.style.SUCCESS(f'{total} transaction(s) restaurée(s)'))
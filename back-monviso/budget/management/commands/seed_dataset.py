@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from budget.seeding import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère N utilisateurs synthétiques avec transactions, catégories, revenus, dépenses "
+        "et objectifs d'épargne réalistes (insertions par lots)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help="Nombre d'utilisateurs à créer")
+        parser.add_argument('--transactions', type=int, default=1000, help='Transactions par utilisateur')
+        parser.add_argument('--months', type=int, default=24, help="Profondeur d'historique en mois")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Taille des lots bulk_create')
+        parser.add_argument('--prefix', default='seed_', help="Préfixe des noms d'utilisateur")
+        parser.add_argument('--seed', type=int, default=42, help='Graine aléatoire (jeux reproductibles)')
+        parser.add_argument('--reset', action='store_true', help='Supprimer au préalable les utilisateurs portant ce préfixe')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['reset']:
+            deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+            self.stdout.write(f'{deleted} ligne(s) supprimée(s)')
+
+        generator = DatasetGenerator(seed=options['seed'], months=options['months'], batch_size=options['batch_size'])
+        started = time.perf_counter()
+        users = generator.generate(options['users'], options['transactions'], prefix=prefix)
+        elapsed = time.perf_counter() - started
+
+        rows = len(users) * options['transactions']
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(users)} utilisateur(s), {rows} transactions en {elapsed:.1f}s ({rows / elapsed:.0f} lignes/s). '
+            f'Mot de passe : {DEFAULT_PASSWORD}'
+        ))
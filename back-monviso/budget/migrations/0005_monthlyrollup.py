@@ -0,0 +1,56 @@
+# Generated by Django 4.2.10 on 2026-10-17 20:38
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import Abs, TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('budget', 'Transaction')
+    MonthlyRollup = apps.get_model('budget', 'MonthlyRollup')
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'type', 'category')
+        .annotate(total=Sum(Abs('amount')), count=Count('id'))
+        .order_by()
+    )
+    MonthlyRollup.objects.bulk_create((
+        MonthlyRollup(
+            user_id=row['user_id'], month=row['month'], type=row['type'],
+            category=row['category'] or '', total=row['total'], count=row['count'],
+        )
+        for row in rows.iterator()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budget', '0004_transaction_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Revenu'), ('expense', 'Dépense')], max_length=10)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['month', 'type', 'category'],
+                'unique_together': {('user', 'month', 'type', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
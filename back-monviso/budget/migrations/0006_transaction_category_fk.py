@@ -0,0 +1,65 @@
+# Generated by Django 4.2.10 on 2026-10-17 20:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    AddIndexConcurrently de django.contrib.postgres sous PostgreSQL (CREATE INDEX CONCURRENTLY :
+    pas de verrou bloquant les écritures sur budget_transaction), AddIndex ailleurs (SQLite).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            from django.contrib.postgres.operations import AddIndexConcurrently
+
+            operation = AddIndexConcurrently(self.model_name, self.index)
+            return operation.database_forwards(app_label, schema_editor, from_state, to_state)
+        return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            from django.contrib.postgres.operations import AddIndexConcurrently
+
+            operation = AddIndexConcurrently(self.model_name, self.index)
+            return operation.database_backwards(app_label, schema_editor, from_state, to_state)
+        return super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    atomic = False
+
+    dependencies = [
+        ('budget', '0005_monthlyrollup'),
+    ]
+
+    operations = [
+        # Colonne nullable sans défaut : ajout immédiat. L'index simple de la clé étrangère est
+        # créé à part, en concurrent, au lieu de l'être par AddField dans la même instruction.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='transaction',
+                    name='category_fk',
+                    field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='budget.category'),
+                ),
+            ],
+            database_operations=[
+                migrations.AddField(
+                    model_name='transaction',
+                    name='category_fk',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='budget.category'),
+                ),
+                AddIndexConcurrently(
+                    model_name='transaction',
+                    index=models.Index(fields=['category_fk'], name='budget_transaction_category_fk_id'),
+                ),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category_fk', 'date'], name='txn_user_category_fk_date_idx'),
+        ),
+    ]
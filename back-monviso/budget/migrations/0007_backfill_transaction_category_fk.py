@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from budget.categories import backfill_category_fk
+
+
+def backfill(apps, schema_editor):
+    backfill_category_fk(apps.get_model('budget', 'Transaction'), apps.get_model('budget', 'Category'))
+
+
+def clear(apps, schema_editor):
+    apps.get_model('budget', 'Transaction').objects.update(category_fk=None)
+
+
+class Migration(migrations.Migration):
+    # Chaque lot du backfill est validé séparément au lieu d'une seule transaction sur toute la table
+    atomic = False
+
+    dependencies = [
+        ('budget', '0006_transaction_category_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
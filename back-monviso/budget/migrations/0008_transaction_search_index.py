@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Doit rester identique à l'expression utilisée par api/search.py pour que l'index soit employé
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(category, ''))"
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS txn_search_vector_idx ON budget_transaction USING gin (({SEARCH_VECTOR}))',
+    'CREATE INDEX IF NOT EXISTS txn_name_trgm_idx ON budget_transaction USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS txn_category_trgm_idx ON budget_transaction USING gin (category gin_trgm_ops)',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS txn_category_trgm_idx',
+    'DROP INDEX IF EXISTS txn_name_trgm_idx',
+    'DROP INDEX IF EXISTS txn_search_vector_idx',
+]
+
+# Repli SQLite (développement et tests) : table FTS5 à contenu externe, tenue à jour par triggers
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS budget_transaction_fts USING fts5(
+        name, category, content='budget_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS budget_transaction_fts_insert AFTER INSERT ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS budget_transaction_fts_delete AFTER DELETE ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts(budget_transaction_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS budget_transaction_fts_update AFTER UPDATE OF name, category ON budget_transaction BEGIN
+        INSERT INTO budget_transaction_fts(budget_transaction_fts, rowid, name, category) VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO budget_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END""",
+    "INSERT INTO budget_transaction_fts(budget_transaction_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_update',
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS budget_transaction_fts_insert',
+    'DROP TABLE IF EXISTS budget_transaction_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0007_backfill_transaction_category_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run({'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.10 on 2026-10-17 21:27
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('budget', '0008_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('count', models.IntegerField(default=0)),
+                ('income_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_archives', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'year'],
+                'unique_together': {('user', 'year')},
+            },
+        ),
+    ]
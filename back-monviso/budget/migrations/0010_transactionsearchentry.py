@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-17 21:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0009_transactionarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearchEntry',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='budget.transaction')),
+                ('name', models.TextField()),
+                ('category', models.TextField()),
+                ('document', models.TextField(db_column='budget_transaction_fts')),
+            ],
+            options={
+                'db_table': 'budget_transaction_fts',
+                'managed': False,
+            },
+        ),
+    ]
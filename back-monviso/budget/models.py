@@ -54,6 +54,11 @@ class Income(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type'], name='income_user_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.amount}€"
 
@@ -72,6 +77,11 @@ class Expense(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type'], name='expense_user_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.amount}€"
 
@@ -94,6 +104,11 @@ class SavingsGoal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type'], name='goal_user_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.current_amount}/{self.target_amount}€"
 
@@ -129,6 +144,8 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     category = models.CharField(max_length=100, blank=True)
+    # Catégorie liée (renseignée depuis le libellé `category`, qui reste la source des rollups)
+    category_fk = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
     date = models.DateField()
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS, blank=True)
     frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES, default='unique')
@@ -137,6 +154,74 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Liste / pagination : WHERE user_id = ? ORDER BY date DESC, created_at DESC, id DESC
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='txn_user_date_created_idx'),
+            # Dashboard et historique filtrés par type ou par catégorie sur une période
+            models.Index(fields=['user', 'type', 'date'], name='txn_user_type_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['user', 'category_fk', 'date'], name='txn_user_category_fk_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.amount}€ ({self.date})"
+
+class TransactionSearchEntry(models.Model):
+    """
+    Table FTS5 budget_transaction_fts (SQLite uniquement, créée par la migration 0008) : permet à
+    api/search.py de la joindre par l'ORM. `document` est la colonne cachée du même nom que la
+    table, cible de MATCH et de bm25().
+    """
+    transaction = models.OneToOneField(
+        Transaction, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='search_entry',
+    )
+    name = models.TextField()
+    category = models.TextField()
+    document = models.TextField(db_column='budget_transaction_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'budget_transaction_fts'
+
+class MonthlyRollup(models.Model):
+    """
+    Totaux mensuels des transactions par (utilisateur, mois, type, catégorie),
+    maintenus de façon incrémentale par budget.rollups.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField()  # Premier jour du mois
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    category = models.CharField(max_length=100, blank=True)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['month', 'type', 'category']
+        unique_together = ['user', 'month', 'type', 'category']
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.type} {self.category or '-'}: {self.total}€ ({self.count})"
+
+class TransactionArchive(models.Model):
+    """
+    Transactions d'une année archivées par budget.archive (NDJSON compressé en gzip) ;
+    leurs totaux restent dans MonthlyRollup.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_archives')
+    year = models.IntegerField()
+    data = models.BinaryField()
+    count = models.IntegerField(default=0)
+    income_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    expense_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    first_date = models.DateField()
+    last_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['user', 'year']
+        unique_together = ['user', 'year']
 
     def __str__(self):
-        return f"{self.name} - {self.amount}€ ({self.date})"
\ No newline at end of file
+        return f"{self.user_id} {self.year}: {self.count} transactions archivées"
@@ -0,0 +1,294 @@
+"""
+Partitionnement déclaratif (PostgreSQL) de budget_transaction par plage de dates, au mois ou à l'année.
+
+Optionnel : la table reste classique tant que `manage.py partition_transactions --convert` n'a
+pas été lancé ; le modèle Transaction et l'ORM ne changent pas.
+
+- Conversion : la table existante est renommée, une table partitionnée (PARTITION BY RANGE (date))
+  est créée à sa place avec les mêmes colonnes, séquence, index et clés étrangères, les lignes
+  sont copiées partition par partition, puis l'ancienne table est supprimée (ou conservée).
+  Le tout dans une transaction : les écritures sont bloquées pendant la copie.
+- La clé primaire devient (id, date) : PostgreSQL exige la clé de partitionnement dans toute
+  contrainte d'unicité. id reste unique en pratique (séquence).
+- Partitions futures : `partition_transactions` (cron) et après chaque `migrate` crée les
+  partitions manquantes jusqu'à TRANSACTION_PARTITIONS_AHEAD périodes après la période courante.
+  Une partition par défaut reçoit les dates hors plage ; les périodes qui y ont des lignes
+  (dates passées saisies ou importées) reçoivent aussi leur partition, où ces lignes sont déplacées.
+- Élagage (partition pruning) : seules les requêtes bornées par des comparaisons sur `date`
+  (filtres start / end, curseur de pagination, mois en cours) ne lisent que les partitions
+  concernées ; les lectures par clé primaire seule consultent l'index de chaque partition.
+
+Les migrations Django suivantes sur Transaction (AddIndex, AddField...) s'appliquent à la table
+parente et se propagent aux partitions ; CREATE INDEX CONCURRENTLY n'y est pas possible.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+TABLE = 'budget_transaction'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+INTERVALS = ('month', 'year')
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(?P<year>\d{{4}})(?:_(?P<month>\d{{2}}))?$')
+
+
+class PartitioningError(Exception):
+    pass
+
+
+def get_interval():
+    interval = getattr(settings, 'TRANSACTION_PARTITION_INTERVAL', 'month')
+    if interval not in INTERVALS:
+        raise PartitioningError(f'Intervalle de partition inconnu : {interval} (month, year)')
+    return interval
+
+
+def period_start(day, interval):
+    return day.replace(day=1) if interval == 'month' else day.replace(month=1, day=1)
+
+
+def next_period(start, interval):
+    if interval == 'year':
+        return start.replace(year=start.year + 1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(start, interval):
+    return f'{TABLE}_p{start:%Y_%m}' if interval == 'month' else f'{TABLE}_p{start:%Y}'
+
+
+def partition_ranges(first_day, last_day, interval):
+    """Périodes [début, fin[ couvrant first_day..last_day inclus"""
+    start = period_start(first_day, interval)
+    ranges = []
+    while start <= last_day:
+        end = next_period(start, interval)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def future_ranges(today, interval, ahead):
+    """Période courante et les `ahead` suivantes"""
+    last = period_start(today, interval)
+    for _ in range(ahead):
+        last = next_period(last, interval)
+    return partition_ranges(today, last, interval)
+
+
+def interval_of(names):
+    """Intervalle déduit du nom des partitions existantes (None si aucune)"""
+    intervals = {
+        'month' if match.group('month') else 'year'
+        for match in (PARTITION_NAME.match(name) for name in names) if match
+    }
+    if len(intervals) > 1:
+        raise PartitioningError('Partitions mensuelles et annuelles mélangées')
+    return intervals.pop() if intervals else None
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection):
+    """[(nom, bornes, lignes estimées)] des partitions de budget_transaction"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+            """,
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+def default_periods(connection, interval):
+    """Débuts des périodes ayant des lignes dans la partition par défaut"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT DISTINCT date_trunc(%s, date)::date FROM {DEFAULT_PARTITION}', [interval])
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def create_partition_sql(start, end, interval):
+    """
+    Crée la partition [start, end[ en y déplaçant les lignes de la partition par défaut :
+    ATTACH refuserait une plage déjà présente dans celle-ci.
+    """
+    name = partition_name(start, interval)
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    condition = f"date >= '{start.isoformat()}' AND date < '{end.isoformat()}'"
+    return [
+        f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE)',
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {condition} RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+        f'ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK ({condition})',
+        f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}',
+        # Redondante une fois attachée (elle évitait le parcours de vérification d'ATTACH)
+        f'ALTER TABLE {name} DROP CONSTRAINT {name}_range',
+    ]
+
+
+def ensure_partitions(connection, today=None, ahead=None, interval=None, execute=True):
+    """
+    Crée les partitions manquantes de la période courante aux `ahead` suivantes, et celles des
+    périodes dont des lignes sont restées dans la partition par défaut.
+    Renvoie les noms des partitions créées (ou à créer si execute=False).
+    """
+    today = today or date.today()
+    ahead = getattr(settings, 'TRANSACTION_PARTITIONS_AHEAD', 3) if ahead is None else ahead
+    existing = {row[0] for row in list_partitions(connection)}
+    current = interval_of(existing)
+    interval = interval or current or get_interval()
+    if current and interval != current:
+        raise PartitioningError(f'La table est partitionnée par {current}, pas par {interval}')
+
+    ranges = set(future_ranges(today, interval, ahead))
+    ranges.update((start, next_period(start, interval)) for start in default_periods(connection, interval))
+    created = []
+    for start, end in sorted(ranges):
+        name = partition_name(start, interval)
+        if name in existing:
+            continue
+        if execute:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                for statement in create_partition_sql(start, end, interval):
+                    cursor.execute(statement)
+        created.append(name)
+    return created
+
+
+def conversion_sql(connection, first_day, today, interval, ahead, keep_old=False):
+    """
+    Instructions de conversion de budget_transaction (table classique) en table partitionnée,
+    lues dans le catalogue : index, clés étrangères et séquence de la table actuelle.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(x.indexrelid), x.indisunique,
+                   ARRAY(SELECT a.attname FROM pg_attribute a WHERE a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey))
+            FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            ORDER BY i.relname
+            """,
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid), contype = 'u',
+                   ARRAY(SELECT a.attname FROM pg_attribute a WHERE a.attrelid = conrelid AND a.attnum = ANY(conkey))
+            FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype IN ('f', 'u') ORDER BY conname
+            """,
+            [TABLE],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [TABLE])
+        primary_key = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT conrelid::regclass::text FROM pg_constraint WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+
+    if referencing:
+        raise PartitioningError(f'Clés étrangères vers {TABLE} depuis : {", ".join(referencing)}')
+    # PostgreSQL exige la clé de partitionnement dans toute unicité : refus avant toute instruction
+    not_partitionable = [name for name, _, unique, columns in indexes + constraints if unique and 'date' not in columns]
+    if not_partitionable:
+        raise PartitioningError(
+            f"Index ou contrainte d'unicité sur {TABLE} sans la colonne date : {', '.join(not_partitionable)}"
+        )
+
+    statements = [
+        f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}',
+        # Les noms d'index sont uniques par schéma : ceux de l'ancienne table sont libérés
+        f'ALTER TABLE {UNPARTITIONED_TABLE} RENAME CONSTRAINT {primary_key} TO {UNPARTITIONED_TABLE}_pkey',
+    ]
+    statements += [f'ALTER INDEX {name} RENAME TO {name[:50]}_unpart' for name, *_ in indexes]
+    statements += [
+        f'CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY '
+        'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (date)',
+        f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT',
+    ]
+    last_day = future_ranges(today, interval, ahead)[-1][0]
+    ranges = partition_ranges(min(first_day, today), last_day, interval)
+    for start, end in ranges:
+        name = partition_name(start, interval)
+        statements.append(
+            f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    # Copie avant la création des index : une construction par partition plutôt qu'une insertion indexée par ligne
+    statements += [
+        f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE} WHERE date >= '{start.isoformat()}' AND date < '{end.isoformat()}'"
+        for start, end in ranges
+    ]
+    statements += [
+        f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE} "
+        f"WHERE date < '{ranges[0][0].isoformat()}' OR date >= '{ranges[-1][1].isoformat()}'",
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {primary_key} PRIMARY KEY (id, date)',
+    ]
+    statements += [definition for _, definition, *_ in indexes]
+    statements += [f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}' for name, definition, *_ in constraints]
+    if sequence:
+        # Colonne serial : la séquence suit la nouvelle table. Colonne identity : LIKE en a créé une neuve
+        statements += [
+            f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id' if _is_serial(connection, sequence) else
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {UNPARTITIONED_TABLE}), false)",
+        ]
+    if not keep_old:
+        statements.append(f'DROP TABLE {UNPARTITIONED_TABLE}')
+    statements.append(f'ANALYZE {TABLE}')
+    return statements
+
+
+def _is_serial(connection, sequence):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attidentity = '' FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'",
+            [TABLE],
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def convert(connection, today=None, interval=None, ahead=None, keep_old=False, execute=True):
+    """Convertit budget_transaction en table partitionnée ; renvoie les instructions exécutées"""
+    if connection.vendor != 'postgresql':
+        raise PartitioningError('Partitionnement disponible uniquement sur PostgreSQL')
+    if is_partitioned(connection):
+        raise PartitioningError(f'{TABLE} est déjà partitionnée')
+    today = today or date.today()
+    interval = interval or get_interval()
+    ahead = getattr(settings, 'TRANSACTION_PARTITIONS_AHEAD', 3) if ahead is None else ahead
+
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT min(date) FROM {TABLE}')
+            first_day = cursor.fetchone()[0] or today
+        statements = conversion_sql(connection, first_day, today, interval, ahead, keep_old)
+        if execute:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+    return statements
+
+
+def on_post_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    connection = connections[using]
+    if is_partitioned(connection):
+        ensure_partitions(connection)
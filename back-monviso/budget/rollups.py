@@ -0,0 +1,185 @@
+"""
+Maintenance incrémentale de la table MonthlyRollup.
+
+Chaque écriture de transactions (création, modification, suppression, chemins
+en masse) calcule des deltas (montant, nombre) par clé (mois, type, catégorie)
+puis les applique en une poignée de requêtes, dans la transaction SQL de
+l'appelant. Les lectures de synthèse coûtent alors O(mois) au lieu de
+O(transactions).
+
+Les chemins d'écriture (API, import, admin) appellent record_* explicitement ; une écriture
+ORM faite ailleurs (shell, script) doit en faire autant, ou être suivie de
+`manage.py rebuild_rollups`.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Abs, TruncMonth
+from django.utils import timezone
+
+from . import archive
+from .models import MonthlyRollup, Transaction
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def empty_deltas():
+    return defaultdict(lambda: [Decimal('0'), 0])
+
+
+def add_transactions(deltas, transactions, sign=1):
+    """Ajoute (sign=1) ou retire (sign=-1) des instances de transactions aux deltas"""
+    for item in transactions:
+        key = (month_start(item.date), item.type, item.category or '')
+        deltas[key][0] += sign * abs(Decimal(item.amount))
+        deltas[key][1] += sign
+    return deltas
+
+
+def add_queryset(deltas, queryset, sign=1):
+    """Ajoute ou retire un queryset de transactions aux deltas, agrégé en base en une requête"""
+    rows = (
+        queryset
+        .annotate(month=TruncMonth('date'))
+        .values('month', 'type', 'category')
+        .annotate(total=Sum(Abs('amount')), count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        key = (row['month'], row['type'], row['category'] or '')
+        deltas[key][0] += sign * row['total']
+        deltas[key][1] += sign * row['count']
+    return deltas
+
+
+def apply_deltas(user_id, deltas):
+    """
+    Applique les deltas aux lignes MonthlyRollup de l'utilisateur : un SELECT ... FOR UPDATE
+    des clés concernées, puis bulk_update / bulk_create / delete. À appeler dans un bloc atomic.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            _apply_deltas(user_id, deltas)
+    except IntegrityError:
+        # Une écriture concurrente a créé l'une des clés entre-temps : les lignes existent désormais
+        with transaction.atomic():
+            _apply_deltas(user_id, deltas)
+
+
+def _apply_deltas(user_id, deltas):
+    months = {key[0] for key in deltas}
+    existing = {
+        (rollup.month, rollup.type, rollup.category): rollup
+        for rollup in MonthlyRollup.objects.select_for_update().filter(user_id=user_id, month__in=months)
+    }
+
+    now = timezone.now()
+    to_create, to_update, to_delete = [], [], []
+    for key, (amount, count) in deltas.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            if count > 0:
+                month, type_, category = key
+                to_create.append(MonthlyRollup(
+                    user_id=user_id, month=month, type=type_, category=category, total=amount, count=count
+                ))
+            continue
+        rollup.total += amount
+        rollup.count += count
+        rollup.updated_at = now
+        if rollup.count <= 0:
+            to_delete.append(rollup.pk)
+        else:
+            to_update.append(rollup)
+
+    if to_update:
+        MonthlyRollup.objects.bulk_update(to_update, ['total', 'count', 'updated_at'])
+    if to_create:
+        MonthlyRollup.objects.bulk_create(to_create)
+    if to_delete:
+        MonthlyRollup.objects.filter(pk__in=to_delete).delete()
+
+
+def record_created(user_id, transactions):
+    apply_deltas(user_id, add_transactions(empty_deltas(), transactions))
+
+
+def record_updated(user_id, previous, current):
+    deltas = add_transactions(empty_deltas(), [previous], sign=-1)
+    apply_deltas(user_id, add_transactions(deltas, [current]))
+
+
+def record_deleted(user_id, transactions):
+    apply_deltas(user_id, add_transactions(empty_deltas(), transactions, sign=-1))
+
+
+def record_queryset_deleted(user_id, queryset):
+    """À appeler avant queryset.delete() pour les suppressions en masse"""
+    apply_deltas(user_id, add_queryset(empty_deltas(), queryset, sign=-1))
+
+
+def expected_rollups(user_id):
+    """Rollups recalculés depuis les transactions brutes, archivées comprises, indexés par clé"""
+    deltas = add_queryset(empty_deltas(), Transaction.objects.filter(user_id=user_id))
+    for row in archive.archived_rows(user_id):
+        key = (month_start(row['date']), row['type'], row['category'] or '')
+        deltas[key][0] += abs(row['amount'])
+        deltas[key][1] += 1
+    return {key: (amount, count) for key, (amount, count) in deltas.items()}
+
+
+def current_rollups(user_id):
+    return {
+        (rollup.month, rollup.type, rollup.category): (rollup.total, rollup.count)
+        for rollup in MonthlyRollup.objects.filter(user_id=user_id)
+    }
+
+
+def rebuild(user_id):
+    """
+    Recalcule entièrement les rollups d'un utilisateur. Ses lignes MonthlyRollup sont verrouillées
+    avant la lecture des transactions : une écriture concurrente (apply_deltas) attend la fin du
+    recalcul, ou a déjà été validée et figure dans le résultat.
+    """
+    with transaction.atomic():
+        list(MonthlyRollup.objects.select_for_update().filter(user_id=user_id).values_list('pk', flat=True))
+        expected = expected_rollups(user_id)
+        MonthlyRollup.objects.filter(user_id=user_id).delete()
+        MonthlyRollup.objects.bulk_create([
+            MonthlyRollup(user_id=user_id, month=month, type=type_, category=category, total=amount, count=count)
+            for (month, type_, category), (amount, count) in expected.items()
+        ])
+    return len(expected)
+
+
+def rollup_filter(start_date=None, end_date=None, categories=None, transaction_type=None, uncategorized_label=None):
+    """
+    Traduit des filtres de période / catégorie / type en filtre MonthlyRollup.
+    Renvoie None si la période ne tombe pas sur des mois entiers (le rollup ne peut pas y répondre).
+    """
+    if start_date and start_date.day != 1:
+        return None
+    if end_date and (end_date + timedelta(days=1)).day != 1:
+        return None
+
+    condition = Q()
+    if start_date:
+        condition &= Q(month__gte=start_date)
+    if end_date:
+        condition &= Q(month__lte=month_start(end_date))
+    if categories:
+        category_filter = Q(category__in=categories)
+        if uncategorized_label and uncategorized_label in categories:
+            category_filter |= Q(category='')
+        condition &= category_filter
+    if transaction_type:
+        condition &= Q(type=transaction_type)
+    return condition
@@ -0,0 +1,163 @@
+"""
+Génération de jeux de données synthétiques réalistes (développement, tests, benchmarks).
+
+Chaque utilisateur reçoit un profil, des catégories avec budgets, des revenus / dépenses
+d'onboarding, des objectifs d'épargne et un historique de transactions : salaire mensuel,
+loyer et abonnements récurrents, dépenses courantes aux montants log-normaux par catégorie.
+Les insertions passent par bulk_create par lots et les rollups sont reconstruits en une
+agrégation par utilisateur : des millions de lignes se génèrent en quelques minutes.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Category, Expense, Income, SavingsGoal, Transaction, UserProfile
+
+DEFAULT_PASSWORD = 'monviso-seed-password'
+DEFAULT_BATCH_SIZE = 5000
+
+# (nom, budget mensuel, moyenne log-normale du montant, poids dans les dépenses courantes, couleur, icône)
+EXPENSE_CATEGORIES = [
+    ('Courses', Decimal('450'), 3.4, 30, '#10B981', '🛒'),
+    ('Restaurants', Decimal('150'), 3.0, 14, '#F59E0B', '🍽️'),
+    ('Transport', Decimal('120'), 2.8, 14, '#3B82F6', '🚗'),
+    ('Loisirs', Decimal('100'), 3.1, 10, '#8B5CF6', '🎮'),
+    ('Santé', Decimal('60'), 3.2, 5, '#EF4444', '💊'),
+    ('Shopping', None, 3.6, 10, '#EC4899', '🛍️'),
+    ('Maison', Decimal('80'), 3.5, 6, '#6366F1', '🏠'),
+    ('', None, 2.9, 11, None, None),  # dépenses non catégorisées
+]
+INCOME_CATEGORIES = [('Salaire', '#22C55E', '💼'), ('Freelance', '#14B8A6', '💻')]
+RECURRING_EXPENSES = [
+    ('Loyer', 'Maison', (650, 1300)),
+    ('Abonnement téléphone', 'Loisirs', (10, 30)),
+    ('Streaming', 'Loisirs', (8, 18)),
+    ('Assurance', 'Maison', (20, 60)),
+]
+PAYMENT_METHODS = ['card', 'card', 'card', 'transfer', 'cash', 'check']
+MERCHANTS = {
+    'Courses': ['Carrefour', 'Leclerc', 'Monoprix', 'Lidl', 'Biocoop'],
+    'Restaurants': ['Brasserie du coin', 'Sushi Bar', 'Pizzeria', 'Boulangerie'],
+    'Transport': ['SNCF', 'RATP', 'Station essence', 'Uber'],
+    'Loisirs': ['Cinéma', 'Librairie', 'Concert', 'Salle de sport'],
+    'Santé': ['Pharmacie', 'Médecin', 'Dentiste'],
+    'Shopping': ['Amazon', 'Fnac', 'Zara', 'Decathlon'],
+    'Maison': ['Ikea', 'Leroy Merlin', 'Castorama'],
+    '': ['Retrait DAB', 'Paiement divers', 'Virement'],
+}
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, months=24, batch_size=DEFAULT_BATCH_SIZE, today=None):
+        self.rng = random.Random(seed)
+        self.months = months
+        self.batch_size = batch_size
+        self.today = today or timezone.localdate()
+        self.first_day = self.today - timedelta(days=30 * months)
+        self.password = make_password(DEFAULT_PASSWORD)  # haché une fois pour tous les utilisateurs
+
+    def create_users(self, prefix, count):
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}{index}', email=f'{prefix}{index}@monviso.local', password=self.password)
+            for index in range(count)
+        ], batch_size=self.batch_size)
+        if users and users[0].pk is None:
+            # Moteurs sans RETURNING : relecture des identifiants
+            users = list(User.objects.filter(username__in=[user.username for user in users]).order_by('pk'))
+        return users
+
+    def populate(self, user, transactions):
+        """Données complètes d'un utilisateur ; renvoie le nombre de transactions créées"""
+        rng = self.rng
+        salary = Decimal(rng.randrange(1800, 4500))
+        UserProfile.objects.create(user=user, monthly_income=salary, onboarding_completed=True)
+
+        categories = Category.objects.bulk_create(
+            [Category(user=user, name=name, type='expense', monthly_budget=budget, color=color, icon=icon)
+             for name, budget, _, _, color, icon in EXPENSE_CATEGORIES if name]
+            + [Category(user=user, name=name, type='income', color=color, icon=icon) for name, color, icon in INCOME_CATEGORIES]
+        )
+        if categories and categories[0].pk is None:
+            categories = list(Category.objects.filter(user=user))
+        category_ids = {(category.name, category.type): category.pk for category in categories}
+
+        Income.objects.bulk_create([
+            Income(user=user, name='Salaire', amount=salary, type='salary', is_primary=True),
+            Income(user=user, name='Missions freelance', amount=Decimal(rng.randrange(100, 800)), type='freelance'),
+        ])
+        Expense.objects.bulk_create([
+            Expense(user=user, name=name, amount=Decimal(rng.randrange(*bounds)), type='fixed',
+                    category_id=category_ids.get((category, 'expense')))
+            for name, category, bounds in RECURRING_EXPENSES
+        ])
+        SavingsGoal.objects.bulk_create([
+            SavingsGoal(user=user, name='Fonds d\'urgence', type='emergency', priority='high',
+                        target_amount=salary * 3, current_amount=Decimal(rng.randrange(0, int(salary * 3)))),
+            SavingsGoal(user=user, name='Vacances', type='vacation', target_date=self.today + timedelta(days=180),
+                        target_amount=Decimal('1500'), current_amount=Decimal(rng.randrange(0, 1500))),
+        ])
+
+        batch = []
+        created = 0
+        for item in self.transactions(user, transactions, salary, category_ids):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+                created += len(batch)
+                batch = []
+        if batch:
+            Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+            created += len(batch)
+        rollups.rebuild(user.pk)
+        return created
+
+    def transactions(self, user, count, salary, category_ids):
+        """Générateur de `count` transactions : récurrences mensuelles puis dépenses courantes"""
+        rng = self.rng
+        emitted = 0
+        month = self.first_day.replace(day=1)
+        recurring = [(name, category, Decimal(rng.randrange(*bounds))) for name, category, bounds in RECURRING_EXPENSES]
+        while month <= self.today and emitted < count:
+            yield self.transaction(user, 'Salaire', salary, 'income', 'Salaire', month.replace(day=25), 'transfer', 'mensuel', category_ids)
+            emitted += 1
+            for name, category, amount in recurring:
+                if emitted >= count:
+                    break
+                yield self.transaction(user, name, amount, 'expense', category, month.replace(day=rng.randint(1, 10)), 'transfer', 'mensuel', category_ids)
+                emitted += 1
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        names = [spec[0] for spec in EXPENSE_CATEGORIES]
+        weights = [spec[3] for spec in EXPENSE_CATEGORIES]
+        means = {spec[0]: spec[2] for spec in EXPENSE_CATEGORIES}
+        span = (self.today - self.first_day).days
+        for _ in range(count - emitted):
+            category = rng.choices(names, weights)[0]
+            amount = max(Decimal(str(round(min(rng.lognormvariate(means[category], 0.8), 5000), 2))), Decimal('0.50'))
+            day = self.first_day + timedelta(days=rng.randint(0, span))
+            yield self.transaction(
+                user, rng.choice(MERCHANTS[category]), amount, 'expense', category, day,
+                rng.choice(PAYMENT_METHODS), 'unique', category_ids,
+            )
+
+    def transaction(self, user, name, amount, type_, category, day, payment_method, frequency, category_ids):
+        return Transaction(
+            user=user, name=name, amount=amount, type=type_, category=category,
+            category_fk_id=category_ids.get((category, type_)), date=day,
+            payment_method=payment_method, frequency=frequency,
+        )
+
+    def generate(self, users, transactions, prefix='seed_'):
+        """Crée `users` utilisateurs de `transactions` transactions chacun ; renvoie les utilisateurs créés"""
+        created = []
+        for user in self.create_users(prefix, users):
+            with transaction.atomic():
+                self.populate(user, transactions)
+            created.append(user)
+        return created
@@ -1,3 +1,317 @@
-from django.test import TestCase
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import archive, partitions, rollups
+from .budgets import budget_vs_actual, parse_month
+from .categories import backfill_category_fk
+from .forecast import RecurringItem, occurrences, project_flows
+from .models import Category, MonthlyRollup, Transaction, TransactionArchive
+from .seeding import DEFAULT_PASSWORD, DatasetGenerator
+
+TODAY = date(2026, 6, 15)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SeedingTests(TestCase):
+
+    def test_populate_is_deterministic_and_consistent(self):
+        first, = DatasetGenerator(seed=3, months=12, today=TODAY).generate(1, 300, prefix='a_')
+        second, = DatasetGenerator(seed=3, months=12, today=TODAY).generate(1, 300, prefix='b_')
+
+        rows = lambda user: list(
+            Transaction.objects.filter(user=user).order_by('pk').values_list('name', 'amount', 'type', 'category', 'date')
+        )
+        self.assertEqual(len(rows(first)), 300)
+        self.assertEqual(rows(first), rows(second))
+        self.assertEqual(rollups.current_rollups(first.pk), rollups.expected_rollups(first.pk))
+        self.assertFalse(
+            Transaction.objects.filter(user=first, category_fk__isnull=True).exclude(category='').exists()
+        )
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='rollup')
+
+    def create(self, amount, day, category='Courses', type_='expense'):
+        item = Transaction.objects.create(user=self.user, name='T', amount=Decimal(amount), type=type_, category=category, date=day)
+        rollups.record_created(self.user.pk, [item])
+        return item
+
+    def test_incremental_updates_match_rebuild(self):
+        kept = self.create('10.00', date(2026, 1, 5))
+        moved = self.create('20.00', date(2026, 1, 20))
+        removed = self.create('5.50', date(2026, 2, 1), category='Loisirs')
+        self.create('1000.00', date(2026, 2, 25), category='Salaire', type_='income')
+
+        previous = Transaction.objects.get(pk=moved.pk)
+        moved.date, moved.category = date(2026, 3, 2), 'Transport'
+        moved.save()
+        rollups.record_updated(self.user.pk, previous, moved)
+
+        rollups.record_deleted(self.user.pk, [removed])
+        removed.delete()
+        rollups.record_queryset_deleted(self.user.pk, Transaction.objects.filter(pk=kept.pk))
+        Transaction.objects.filter(pk=kept.pk).delete()
+
+        self.assertEqual(rollups.current_rollups(self.user.pk), rollups.expected_rollups(self.user.pk))
+        self.assertFalse(MonthlyRollup.objects.filter(user=self.user, count__lte=0).exists())
+        self.assertEqual(rollups.rebuild(self.user.pk), 2)
+
+    def test_admin_writes_keep_rollups_in_sync(self):
+        model_admin = admin.site._registry[Transaction]
+        request = RequestFactory().post('/admin/')
+        item = Transaction(user=self.user, name='T', amount=Decimal('12.00'), type='expense', category='Courses', date=date(2026, 1, 5))
+        model_admin.save_model(request, item, None, False)
+        other = self.create('3.00', date(2026, 2, 5))
+
+        item = Transaction.objects.get(pk=item.pk)
+        item.amount, item.date, item.category = Decimal('15.00'), date(2026, 3, 1), 'Loisirs'
+        model_admin.save_model(request, item, None, True)
+        self.assertEqual(rollups.current_rollups(self.user.pk), rollups.expected_rollups(self.user.pk))
+
+        item.user = User.objects.create(username='rollup_other')
+        model_admin.save_model(request, item, None, True)
+        model_admin.delete_queryset(request, Transaction.objects.filter(pk=other.pk))
+        self.assertEqual(rollups.current_rollups(self.user.pk), {})
+        self.assertEqual(rollups.current_rollups(item.user_id), rollups.expected_rollups(item.user_id))
+
+        model_admin.delete_model(request, item)
+        self.assertEqual(rollups.current_rollups(item.user_id), {})
+
+
+class BudgetTests(TestCase):
+
+    def test_budget_vs_actual_query_count_is_constant(self):
+        generator = DatasetGenerator(seed=5, months=12, today=TODAY)
+        small, large = generator.create_users('budget_', 2)
+        generator.populate(small, 20)
+        generator.populate(large, 3000)
+        start, end = parse_month('2025-07'), parse_month('2026-06')
+
+        for user in (small, large):
+            with CaptureQueriesContext(connection) as queries:
+                report = budget_vs_actual(user, start, end, 'Non catégorisé')
+            self.assertEqual(len(queries), 2)
+
+        expected = sum(
+            rollup.total for rollup in MonthlyRollup.objects.filter(user=large, type='expense', month__gte=start, month__lte=end)
+        )
+        self.assertEqual(report['totals']['spent'], expected)
+        self.assertEqual(sum(line['spent'] for period in report['months'] for line in period['categories']), expected)
+
+
+class ForecastTests(TestCase):
+
+    def test_project_flows_matches_occurrences(self):
+        items = [
+            RecurringItem('Salaire', 'income', Decimal('2500.00'), date(2025, 1, 31), 1, 0),
+            RecurringItem('Assurance', 'expense', Decimal('120.35'), date(2024, 11, 15), 3, 0),
+            RecurringItem('Impôts', 'expense', Decimal('800.00'), date(2023, 2, 28), 12, 0),
+            RecurringItem('Marché', 'expense', Decimal('42.10'), date(2026, 5, 30), 0, 7),
+        ]
+        start, end = date(2026, 1, 10), date(2027, 3, 5)
+
+        for granularity in ('monthly', 'daily'):
+            expected = {}
+            for item in items:
+                for day in occurrences(item, start, end):
+                    key = f'{day:%Y-%m}' if granularity == 'monthly' else day.isoformat()
+                    flows = expected.setdefault(key, [Decimal('0'), Decimal('0')])
+                    flows[0 if item.type == 'income' else 1] += item.amount
+            self.assertEqual(project_flows(items, start, end, granularity), expected)
+
+    def test_occurrences_clamp_to_month_end(self):
+        item = RecurringItem('Loyer', 'expense', Decimal('900'), date(2026, 1, 31), 1, 0)
+        days = list(occurrences(item, date(2026, 2, 1), date(2026, 4, 30)))
+        self.assertEqual(days, [date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)])
+
+
+class CategoryBackfillTests(TestCase):
+
+    def test_backfill_links_matching_name_and_type(self):
+        user = User.objects.create(username='backfill')
+        groceries = Category.objects.create(user=user, name='Courses', type='expense')
+        Category.objects.create(user=user, name='Courses', type='income')
+        day = TODAY - timedelta(days=3)
+        linked = [
+            Transaction.objects.create(user=user, name=f'T{index}', amount=Decimal('9.99'), type='expense', category='Courses', date=day)
+            for index in range(5)
+        ]
+        orphan = Transaction.objects.create(user=user, name='X', amount=Decimal('1'), type='expense', category='Inconnue', date=day)
+
+        self.assertEqual(backfill_category_fk(Transaction, Category, batch_size=2), 5)
+        self.assertEqual(
+            set(Transaction.objects.filter(pk__in=[item.pk for item in linked]).values_list('category_fk', flat=True)),
+            {groceries.pk},
+        )
+        orphan.refresh_from_db()
+        self.assertIsNone(orphan.category_fk_id)
+        self.assertEqual(backfill_category_fk(Transaction, Category), 0)
+
+
+class PartitionTests(SimpleTestCase):
+
+    def test_ranges_cover_history_and_future_periods(self):
+        ranges = partitions.partition_ranges(date(2025, 11, 20), date(2026, 2, 1), 'month')
+        self.assertEqual(ranges, [
+            (date(2025, 11, 1), date(2025, 12, 1)), (date(2025, 12, 1), date(2026, 1, 1)),
+            (date(2026, 1, 1), date(2026, 2, 1)), (date(2026, 2, 1), date(2026, 3, 1)),
+        ])
+        self.assertEqual(
+            [partitions.partition_name(start, 'year') for start, _ in partitions.future_ranges(TODAY, 'year', 1)],
+            ['budget_transaction_p2026', 'budget_transaction_p2027'],
+        )
+        self.assertEqual(len(partitions.future_ranges(TODAY, 'month', 3)), 4)
+
+    def test_interval_is_read_from_partition_names(self):
+        self.assertEqual(partitions.interval_of(['budget_transaction_p2026_05', 'budget_transaction_default']), 'month')
+        self.assertEqual(partitions.interval_of(['budget_transaction_p2026']), 'year')
+        self.assertIsNone(partitions.interval_of(['budget_transaction_default']))
+        with self.assertRaises(partitions.PartitioningError):
+            partitions.interval_of(['budget_transaction_p2026', 'budget_transaction_p2027_01'])
+
+    def test_periods_left_in_default_partition_get_a_partition(self):
+        connection = CatalogConnection({
+            'FROM pg_inherits': [('budget_transaction_default', 'DEFAULT', 0), ('budget_transaction_p2026_06', '', 0)],
+            'date_trunc': [(date(2024, 3, 1),), (date(2027, 1, 1),)],
+        })
+        self.assertEqual(partitions.ensure_partitions(connection, today=TODAY, ahead=1, execute=False), [
+            'budget_transaction_p2024_03', 'budget_transaction_p2026_07', 'budget_transaction_p2027_01',
+        ])
+
+    def test_conversion_rejects_unique_index_without_date(self):
+        catalog = {
+            'FROM pg_index': [
+                ('txn_user_date_idx', 'CREATE INDEX txn_user_date_idx ON budget_transaction (user_id, date)', False, ['user_id', 'date']),
+                ('txn_ref_uniq', 'CREATE UNIQUE INDEX txn_ref_uniq ON budget_transaction (user_id, name)', True, ['user_id', 'name']),
+            ],
+            'contype IN': [],
+            "contype = 'p'": [('budget_transaction_pkey',)],
+            'confrelid': [],
+            'pg_get_serial_sequence': [('budget_transaction_id_seq',)],
+        }
+        with self.assertRaisesMessage(partitions.PartitioningError, 'txn_ref_uniq'):
+            partitions.conversion_sql(CatalogConnection(catalog), TODAY, TODAY, 'month', 1)
+
+        # Unicité incluant date : acceptée et recréée sur la table partitionnée
+        catalog['FROM pg_index'][1] = ('txn_ref_uniq', 'CREATE UNIQUE INDEX txn_ref_uniq ON budget_transaction (user_id, name, date)', True, ['user_id', 'name', 'date'])
+        catalog['attidentity'] = [(True,)]
+        statements = partitions.conversion_sql(CatalogConnection(catalog), TODAY, TODAY, 'month', 1)
+        self.assertIn(catalog['FROM pg_index'][1][1], statements)
+
+
+class CatalogConnection:
+    """Connexion PostgreSQL simulée : résultats du catalogue choisis par fragment de requête"""
+    vendor = 'postgresql'
+
+    def __init__(self, results):
+        self.results = results
+
+    def cursor(self):
+        return CatalogCursor(self.results)
+
+
+class CatalogCursor:
+    def __init__(self, results):
+        self.results = results
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        self.rows = next(list(rows) for fragment, rows in self.results.items() if fragment in sql)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], API_CACHE_TTL=0)
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.user, = DatasetGenerator(seed=9, months=36, today=TODAY).generate(1, 600, prefix='archive_')
+        self.cutoff = archive.archive_cutoff(TODAY, 12)
+        self.client = Client()
+        token = self.client.post('/api/auth/login/', {'email': self.user.username, 'password': DEFAULT_PASSWORD}, content_type='application/json').json()
+        self.headers = {'Authorization': f'Bearer {token["access"]}'}
+
+    def snapshot(self):
+        history = self.client.get('/api/history/?start=2023-06-02&end=2026-06-15&payment_method=card', headers=self.headers).json()
+        export = self.client.get('/api/transactions/export/?output=ndjson&type=expense', headers=self.headers)
+        dashboard = self.client.get('/api/financial-data/', headers=self.headers).json()
+        # Sommes SQLite en virgule flottante : totaux comparés au centime
+        totals = tuple(round(float(dashboard[key]), 2) for key in ('total_income', 'total_expenses'))
+        return history, b''.join(export.streaming_content), totals
+
+    def test_archive_is_transparent_and_restorable(self):
+        before = self.snapshot()
+        rows = list(Transaction.objects.filter(user=self.user).order_by('pk').values_list('pk', 'date', 'created_at', 'category_fk'))
+        old = Transaction.objects.filter(user=self.user, date__lt=self.cutoff).count()
+
+        self.assertEqual(archive.archive_user(self.user.pk, self.cutoff), old)
+        self.assertFalse(Transaction.objects.filter(user=self.user, date__lt=self.cutoff).exists())
+        self.assertEqual(sum(TransactionArchive.objects.filter(user=self.user).values_list('count', flat=True)), old)
+        self.assertEqual(rollups.current_rollups(self.user.pk), rollups.expected_rollups(self.user.pk))
+        self.assertEqual(self.snapshot(), before)
+
+        self.assertEqual(archive.restore(self.user.pk), old)
+        self.assertFalse(TransactionArchive.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            list(Transaction.objects.filter(user=self.user).order_by('pk').values_list('pk', 'date', 'created_at', 'category_fk')), rows
+        )
+
+    def test_archive_invalidates_once_and_restore_follows_renames(self):
+        with mock.patch('api.cache.bump_data_version') as bump, self.captureOnCommitCallbacks(execute=True):
+            archive.archive_year(self.user.pk, 2024, self.cutoff)
+        self.assertEqual(bump.call_count, 1)
+
+        category = Category.objects.get(pk=next(row['category_fk_id'] for row in archive.archived_rows(self.user.pk) if row['category_fk_id']))
+        archived = [row for row in archive.archived_rows(self.user.pk) if row['category_fk_id'] == category.pk]
+        response = self.client.put(
+            f'/api/categories/{category.pk}/', {'name': 'Renommée', 'type': category.type}, content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        archive.restore(self.user.pk)
+        self.assertEqual(
+            set(Transaction.objects.filter(pk__in=[row['id'] for row in archived]).values_list('category', flat=True)), {'Renommée'}
+        )
+        self.assertEqual(rollups.current_rollups(self.user.pk), rollups.expected_rollups(self.user.pk))
+
+
+class BenchIndexesCommandTests(TransactionTestCase):
+
+    def test_refuses_default_database_without_force(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_transaction_indexes', rows=10, stdout=io.StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_restores_indexes_and_cleans_up_without_per_row_signals(self):
+        with mock.patch('api.cache.bump_data_version') as bump:
+            call_command('bench_transaction_indexes', rows=300, batch_size=100, repeat=1, force=True, stdout=io.StringIO())
+        bump.assert_not_called()
+        self.assertFalse(User.objects.filter(username__startswith='bench_indexes').exists())
+        self.assertFalse(Transaction.objects.exists())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Transaction._meta.db_table)
+        for index in Transaction._meta.indexes:
+            self.assertIn(index.name, constraints)
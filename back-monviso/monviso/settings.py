@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Added 'whitenoise.middleware.WhiteNoiseMiddleware'
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,17 +84,74 @@ WSGI_APPLICATION = 'monviso.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('DB_NAME'),
-        'USER': os.getenv('DB_USER'),
-        'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT'),
+# DB_ENGINE=sqlite : base SQLite locale (développement, tests sans PostgreSQL)
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME') or os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USER'),
+            'PASSWORD': os.getenv('DB_PASSWORD'),
+            'HOST': os.getenv('DB_HOST'),
+            'PORT': os.getenv('DB_PORT'),
+        }
     }
-}
 
+# Recherche PostgreSQL (api/search.py) : lookups trigram_* et champs de recherche plein texte
+if not DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Réutilisation des connexions :
+# - par défaut, connexions persistantes par thread (DB_CONN_MAX_AGE secondes, vérifiées avant
+#   réutilisation si DB_CONN_HEALTH_CHECKS) au lieu d'une connexion par requête ;
+# - DB_POOL=True : pool borné par processus (api/db/pool.py), partagé entre threads et lectures
+#   parallèles des vues async ; la connexion est rendue au pool à la fin de chaque requête.
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DATABASES['default'].update({
+    'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+})
+if DB_POOL:
+    DATABASES['default']['ENGINE'] = DATABASES['default']['ENGINE'].replace('django.db.backends.', 'api.db.')
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+        'CHECK_IDLE': float(os.getenv('DB_POOL_CHECK_IDLE', 30)),
+    }
+
+# Réplicas en lecture (api/db/router.py) : DB_REPLICAS liste des hôtes host[:port] (PostgreSQL)
+# ou des fichiers (SQLite), séparés par des virgules. Alias replica_1, replica_2... avec les
+# mêmes réglages que 'default' ; en test ils pointent sur la base de test de 'default'.
+# Exige un CACHE_BACKEND partagé (épingle au primaire), vérifié au démarrage.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        host, _, port = replica.strip().partition(':')
+        DATABASES[alias].update({'HOST': host, 'PORT': port or DATABASES['default']['PORT']})
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.db.router.ReplicaRouter']
+# Durée pendant laquelle un utilisateur qui vient d'écrire lit sur le primaire
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
+# Partitionnement PostgreSQL de budget_transaction (budget/partitions.py, manage.py partition_transactions) :
+# intervalle des partitions (month, year) et nombre de périodes créées à l'avance
+TRANSACTION_PARTITION_INTERVAL = os.getenv('DB_PARTITION_INTERVAL', 'month')
+TRANSACTION_PARTITIONS_AHEAD = int(os.getenv('DB_PARTITIONS_AHEAD', 3))
+
+# Archivage des transactions anciennes (budget/archive.py, manage.py archive_transactions) : âge en mois
+TRANSACTION_ARCHIVE_AFTER_MONTHS = int(os.getenv('TRANSACTION_ARCHIVE_AFTER_MONTHS', 36))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,15 +198,82 @@ STATICFILES_DIRS = [
 # WhiteNoise configuration
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'  # Added WhiteNoise configuration
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_BACKEND : locmem (défaut), file, redis ou chemin complet d'un backend Django
+# locmem est propre à chaque processus : utiliser file ou redis avec plusieurs workers gunicorn
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = CACHE_BACKENDS.get(os.getenv('CACHE_BACKEND', 'locmem'), os.getenv('CACHE_BACKEND'))
+CACHE_DEFAULT_LOCATIONS = {
+    CACHE_BACKENDS['locmem']: 'monviso',
+    CACHE_BACKENDS['file']: os.path.join(BASE_DIR, '.cache'),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION') or CACHE_DEFAULT_LOCATIONS.get(CACHE_BACKEND, ''),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
+    }
+}
+if CACHE_BACKEND in (CACHE_BACKENDS['locmem'], CACHE_BACKENDS['file']):
+    # Éviction bornée en nombre d'entrées (les backends partagés gèrent leur propre mémoire)
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 5000))}
+
+# Cache des réponses API par utilisateur (api/cache.py) ; API_CACHE_TTL=0 le désactive
+API_CACHE_ALIAS = 'default'
+API_CACHE_TTL = int(os.getenv('API_CACHE_TTL', 300))
+# Nombre de workers gunicorn (WEB_CONCURRENCY, lu aussi par gunicorn) : au-delà d'un, le démarrage
+# échoue si le cache des réponses est actif sur un backend propre au processus (locmem)
+SERVER_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Métriques Prometheus (api/metrics.py) : avec plusieurs workers gunicorn, METRICS_MULTIPROC_DIR doit
+# pointer vers un répertoire partagé et vidé au démarrage ; METRICS_TOKEN protège api/metrics/ (Bearer).
+# Sans jeton, api/metrics/ n'est servi qu'aux comptes staff (et aux appels loopback avec METRICS_ALLOW_LOCAL)
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1.0))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Accès sans jeton depuis loopback : seulement hors proxy (derrière nginx, toute requête vient de 127.0.0.1)
+METRICS_ALLOW_LOCAL = os.getenv('METRICS_ALLOW_LOCAL', 'False') == 'True'
+
+# Journalisation : une ligne clé=valeur par événement, niveau réglable par LOG_LEVEL
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Configuration REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -156,7 +281,15 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Claim de version (empreinte du hash de mot de passe) : un changement de mot de passe révoque les tokens
+    'CHECK_REVOKE_TOKEN': True,
 }
+# Tokens émis sans ce claim (avant son activation) : refusés, sauf jusqu'à cette date ISO 8601 (transition)
+JWT_UNVERSIONED_TOKENS_UNTIL = os.getenv('JWT_UNVERSIONED_TOKENS_UNTIL', '')
+
+# Cache des utilisateurs authentifiés par processus (api/authentication.py) ; AUTH_USER_CACHE_TTL=0 le désactive
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
 
 # Configuration CORS
 CORS_ALLOW_ALL_ORIGINS = True  # En développement seulement, à restreindre en production
@@ -88,13 +88,29 @@ export const categoryService = {
 
 // Fonctions pour les transactions
 export const transactionService = {
+  // Liste complète non paginée (opt-in explicite côté API)
   getAll: async () => {
-    return await api.get('transactions/');
+    return await api.get('transactions/', { params: { all: true } });
+  },
+
+  // Page de transactions paginée par curseur
+  getPage: async (params?: { cursor?: string; limit?: number; type?: string; category?: string; category_id?: number; payment_method?: string; start?: string; end?: string }) => {
+    return await api.get('transactions/', { params });
   },
   
+  // Recherche plein texte classée par pertinence, paginée par curseur (next_cursor)
+  search: async (q: string, params?: { cursor?: string; limit?: number; type?: string; start?: string; end?: string }) => {
+    return await api.get('transactions/search/', { params: { q, ...params } });
+  },
+
   getById: async (id: number) => {
     return await api.get(`transactions/${id}/`);
   },
+
+  // Export en flux (CSV ou NDJSON) téléchargé sous forme de Blob
+  export: async (params?: { output?: 'csv' | 'ndjson'; gzip?: boolean; type?: string; start?: string; end?: string }) => {
+    return await api.get('transactions/export/', { params, responseType: 'blob' });
+  },
   
   create: async (transaction: any) => {
     return await api.post('transactions/', transaction);
@@ -106,6 +122,18 @@ export const transactionService = {
   
   delete: async (id: number) => {
     return await api.delete(`transactions/${id}/`);
+  },
+
+  // Créations / modifications / suppressions groupées, appliquées atomiquement
+  batch: async (operations: Array<{ op: 'create' | 'update' | 'delete'; id?: number; data?: any }>) => {
+    return await api.post('transactions/batch/', { operations });
+  }
+};
+
+// Historique agrégé par mois et par catégorie (calculé côté serveur)
+export const historyService = {
+  get: async (params?: { start?: string; end?: string; category?: string[]; type?: string }) => {
+    return await api.get('history/', { params, paramsSerializer: { indexes: null } });
   }
 };
 
@@ -124,6 +152,11 @@ export const budgetService = {
   getSummary: async () => {
     return await api.get('summary/');
   },
+
+  // Budget / réalisé par catégorie et par mois (start / end au format AAAA-MM)
+  get: async (params?: { start?: string; end?: string }) => {
+    return await api.get('budgets/', { params });
+  },
   
   getUserProfile: async () => {
     return await api.get('profile/');